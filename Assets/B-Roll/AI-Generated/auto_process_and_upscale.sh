@@ -6,6 +6,7 @@ WATCH_DIR="$(cd "$(dirname "$0")" && pwd)"
 FOUR_K_DIR="$WATCH_DIR/4K"
 VENV_PATH="/Users/iamjohndass/Documents/John Ellison Show/E1 - The Vibe Coding Revolution/Claude E1/venv"
 UPSCALE_SCRIPT="/Users/iamjohndass/Documents/John Ellison Show/E1 - The Vibe Coding Revolution/Claude E1/upscale_to_4k.py"
+CROP_SCRIPT="/Users/iamjohndass/Documents/John Ellison Show/E1 - The Vibe Coding Revolution/Claude E1/crop_1080p.py"
 LOG_FILE="$WATCH_DIR/auto_process.log"
 
 # Create 4K directory if it doesn't exist
@@ -35,16 +36,11 @@ process_video() {
 
     log "🎬 Processing: $FILENAME"
 
-    # Step 1: Crop to 1080p
+    source "$VENV_PATH/bin/activate"
+
+    # Step 1: Crop to 1080p (lossless crop window, or a chunked multi-core re-encode)
     log "  📐 Cropping to 1080p..."
-    ffmpeg -i "$INPUT" \
-        -vf "crop=1920:1080:0:4" \
-        -c:v libx264 \
-        -preset fast \
-        -crf 18 \
-        -c:a copy \
-        "$TEMP_1080P" \
-        -y &>/dev/null
+    python3 "$CROP_SCRIPT" "$INPUT" -o "$TEMP_1080P" --preset fast >> "$LOG_FILE" 2>&1
 
     if [ $? -ne 0 ]; then
         log "  ❌ Error cropping: $FILENAME"
@@ -57,7 +53,6 @@ process_video() {
     # Step 2: Upscale to 4K using Fal.ai
     log "  🚀 Upscaling to 4K (this may take 1-3 minutes)..."
 
-    source "$VENV_PATH/bin/activate"
     python3 "$UPSCALE_SCRIPT" "$TEMP_1080P" bytedance >> "$LOG_FILE" 2>&1
 
     if [ $? -eq 0 ]; then
@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+"""
+Append-only journal for fal batch runs
+Lets an interrupted batch pick up where it stopped
+
+Every submitted request ID, finished output and failure is appended as
+one JSON line and flushed immediately, so the journal survives the laptop
+sleeping or the process being killed. Re-running the same batch command
+replays the journal into a dict: finished items whose output is still on
+disk are skipped with an O(1) lookup, and items that were submitted but
+never finished re-attach to their fal request instead of paying for a
+second one.
+
+Journals live in ~/.cache/vibe-coding/journals/ next to the fal cache, one
+file per (command, input directory, model).
+"""
+
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+from pathlib import Path
+from typing import Optional
+
+import fal_cache
+
+
+def job_key(job) -> str:
+    """Identity of one batch item: input file version, endpoint, arguments and output"""
+    try:
+        stat = os.stat(job.input_path)
+        version = [stat.st_size, stat.st_mtime_ns]
+    except OSError:
+        version = None
+    payload = json.dumps([
+        str(Path(job.input_path).resolve()), version, job.endpoint, job.arguments,
+        job.output_options, str(Path(job.output_path).resolve()),
+    ], sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode()).hexdigest()[:32]
+
+
+class JsonlJournal:
+    """
+    Append-only JSONL record log replayed into {key: merged record}
+
+    Each record is a dict with a 'key'; later records for a key update the
+    earlier ones. Subclasses add the events they record.
+
+    Args:
+        path: JSONL file (created if missing)
+    """
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.entries = {}
+        self._lock = threading.Lock()
+        self._torn = False
+        self._replay()
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._file = open(self.path, 'a')
+        if self._torn:
+            # Finish the torn line so the next record starts on a line of its own
+            self._file.write("\n")
+            self._file.flush()
+
+    def _replay(self):
+        try:
+            text = self.path.read_text()
+        except OSError:
+            return
+        self._torn = bool(text) and not text.endswith("\n")
+        for line in text.splitlines():
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue  # torn last line from a crash mid-write
+            entry = self.entries.setdefault(record['key'], {})
+            entry.update(record)
+
+    def _append(self, record: dict):
+        record['time'] = time.time()
+        with self._lock:
+            entry = self.entries.setdefault(record['key'], {})
+            entry.update(record)
+            self._file.write(json.dumps(record) + "\n")
+            self._file.flush()
+            os.fsync(self._file.fileno())
+
+    def lookup(self, key: str) -> Optional[dict]:
+        with self._lock:
+            entry = self.entries.get(key)
+            return dict(entry) if entry else None
+
+    def close(self):
+        with self._lock:
+            self._file.close()
+
+
+class BatchJournal(JsonlJournal):
+    """
+    Replayed state plus an append handle for one batch
+
+    Args:
+        path: JSONL journal file (created if missing)
+    """
+
+    @classmethod
+    def for_batch(cls, command: str, input_dir, model: str, fresh: bool = False) -> "BatchJournal":
+        """Journal for a batch command run over input_dir; fresh=True starts a new one"""
+        directory = str(Path(input_dir).resolve())
+        digest = hashlib.sha256(f"{command}\0{directory}\0{model}".encode()).hexdigest()[:12]
+        slug = re.sub(r'[^A-Za-z0-9_-]+', '_', Path(directory).name)[:40]
+        path = fal_cache.cache_path().parent / "journals" / f"{command}_{slug}_{model}_{digest}.jsonl"
+        if fresh:
+            path.unlink(missing_ok=True)
+        return cls(path)
+
+    def is_done(self, key: str, output_path: str) -> bool:
+        """Finished in an earlier run and the output is still on disk"""
+        entry = self.lookup(key)
+        return bool(entry and entry.get('event') == 'done' and os.path.exists(output_path))
+
+    def pending_request(self, key: str) -> Optional[dict]:
+        """The fal request submitted for key that never finished, if any"""
+        entry = self.lookup(key)
+        if entry and entry.get('event') == 'submitted':
+            return entry
+        return None
+
+    def submitted(self, key: str, job):
+        self._append({"key": key, "event": "submitted", "input": job.input_path,
+                      "endpoint": job.endpoint, "request_id": job.request_id})
+
+    def done(self, key: str, job):
+        self._append({"key": key, "event": "done", "input": job.input_path,
+                      "output_path": job.output_path, "output_url": job.output_url})
+
+    def failed(self, key: str, job):
+        # A failed request is not re-attached to; the next run starts it over
+        self._append({"key": key, "event": "failed", "input": job.input_path,
+                      "error": job.error, "retryable": job.retryable})
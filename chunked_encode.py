@@ -0,0 +1,259 @@
+#!/usr/bin/env python3
+"""
+GOP-chunked multi-core H.264 encoding
+Splits inputs at keyframes, encodes the chunks in a process pool, joins them losslessly
+
+A single x264 process stops scaling well long before 32 cores, so long
+inputs are cut into keyframe-aligned chunks with stream copy (no decode),
+each chunk is encoded by its own ffmpeg process with a few threads, and the
+encoded chunks are rejoined with the concat demuxer before the source audio
+is copied back in. Chunks from every file in a batch share one pool, so a
+batch of short clips keeps the machine as busy as one long recording.
+
+Every chunk reports frames, encode fps and speed (media seconds per wall
+second) as it finishes.
+
+Usage:
+  python chunked_encode.py <videos...> [-o DIR] [--vf crop=1920:1080:0:4] [--workers N]
+"""
+
+import argparse
+import os
+import re
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from ffmpeg_utils import (FFmpegError, FFmpegInterrupted, concat_copy, killed_by_signal, require_ffmpeg,
+                          split_at_keyframes)
+
+# Target chunk length; cuts snap to the next keyframe
+CHUNK_SECONDS = 20.0
+
+# x264 threads per chunk encode; the pool gets cores / this many workers
+THREADS_PER_CHUNK = 4
+
+_PROGRESS_LINE = re.compile(r"^(frame|out_time_us)=(\d+)$", re.MULTILINE)
+
+
+def default_workers(threads_per_chunk: int = THREADS_PER_CHUNK) -> int:
+    """Chunk encodes to run at once on this machine"""
+    return max(1, (os.cpu_count() or 1) // threads_per_chunk)
+
+
+def encode_chunk(input_path: str, output_path: str, vf: Optional[str], preset: str, crf: int,
+                 threads: int) -> dict:
+    """
+    Encode one chunk (video only) with libx264; runs in a pool worker
+
+    Returns:
+        dict with frames, media seconds and wall seconds
+    """
+    cmd = ["ffmpeg", "-hide_banner", "-nostdin", "-loglevel", "error", "-nostats",
+           "-progress", "pipe:1", "-y", "-i", input_path, "-an"]
+    if vf:
+        cmd += ["-vf", vf]
+    cmd += ["-c:v", "libx264", "-preset", preset, "-crf", str(crf), "-threads", str(threads), output_path]
+    start = time.time()
+    try:
+        result = subprocess.run(cmd, capture_output=True, text=True)
+    except KeyboardInterrupt:
+        # Ctrl+C reaches the pool workers too; report it like a killed ffmpeg
+        raise FFmpegInterrupted(f"Encode of {Path(input_path).name} was interrupted") from None
+    wall = time.time() - start
+    if killed_by_signal(result.returncode):
+        raise FFmpegInterrupted(f"Encode of {Path(input_path).name} was interrupted")
+    if result.returncode != 0:
+        raise FFmpegError(f"ffmpeg failed on {Path(input_path).name}: {result.stderr.strip()[-2000:]}")
+    stats = {}
+    for key, value in _PROGRESS_LINE.findall(result.stdout):
+        stats[key] = int(value)  # last report wins
+    return {
+        "frames": stats.get("frame", 0),
+        "media_seconds": stats.get("out_time_us", 0) / 1e6,
+        "wall_seconds": wall,
+    }
+
+
+def format_chunk_stats(stats: dict) -> str:
+    wall = max(stats["wall_seconds"], 1e-6)
+    return (f"{stats['frames']} frames in {stats['wall_seconds']:.1f}s - "
+            f"{stats['frames'] / wall:.0f} fps, {stats['media_seconds'] / wall:.2f}x")
+
+
+def encode_files(files: List[Tuple[str, str]], vf: Optional[str] = None, preset: str = "medium",
+                 crf: int = 18, chunk_seconds: float = CHUNK_SECONDS, workers: Optional[int] = None,
+                 threads_per_chunk: int = THREADS_PER_CHUNK) -> Dict[str, Optional[dict]]:
+    """
+    Re-encode a batch of videos through one shared chunk pool
+
+    Args:
+        files: (input_path, output_path) pairs
+        vf: ffmpeg video filter applied to every chunk, e.g. "crop=1920:1080:0:4"
+        preset: x264 preset
+        crf: x264 CRF
+        chunk_seconds: Approximate chunk length; cuts snap to keyframes
+        workers: Concurrent chunk encodes (default: cores / threads_per_chunk)
+        threads_per_chunk: x264 threads given to each chunk encode
+
+    Returns:
+        {input_path: summary dict, or None if that file failed}
+    """
+    workers = workers or default_workers(threads_per_chunk)
+    results = {}
+    work_dirs = []
+    chunks = {}  # input -> [(source chunk, encoded chunk)]
+    outputs = dict(files)
+
+    try:
+        for input_path, output_path in files:
+            output_path = Path(output_path)
+            output_path.parent.mkdir(parents=True, exist_ok=True)
+            # Work next to the output so chunks don't cross filesystems
+            work = tempfile.TemporaryDirectory(prefix=f".{Path(input_path).stem}_chunks_",
+                                               dir=output_path.parent)
+            work_dirs.append(work)
+            try:
+                sources = split_at_keyframes(input_path, Path(work.name) / "source", chunk_seconds)
+            except FFmpegInterrupted:
+                raise
+            except FFmpegError as e:
+                print(f"✗ Split failed: {Path(input_path).name} ({e})")
+                results[input_path] = None
+                continue
+            encoded_dir = Path(work.name) / "encoded"
+            encoded_dir.mkdir()
+            chunks[input_path] = [(source, str(encoded_dir / Path(source).name)) for source in sources]
+            print(f"Split {Path(input_path).name} into {len(sources)} chunk(s) at keyframes")
+
+        total = sum(len(c) for c in chunks.values())
+        print(f"Encoding {total} chunk(s), {workers} at a time x {threads_per_chunk} threads "
+              f"(libx264 {preset}, crf {crf})")
+
+        start = time.time()
+        remaining = {input_path: len(c) for input_path, c in chunks.items()}
+        stats = {input_path: [] for input_path in chunks}
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = {}
+            for input_path, file_chunks in chunks.items():
+                for index, (source, encoded) in enumerate(file_chunks):
+                    future = pool.submit(encode_chunk, source, encoded, vf, preset, crf, threads_per_chunk)
+                    futures[future] = (input_path, index)
+
+            for future in as_completed(futures):
+                input_path, index = futures[future]
+                name = Path(input_path).name
+                if results.get(input_path, True) is None:
+                    continue  # an earlier chunk of this file already failed
+                try:
+                    chunk_stats = future.result()
+                except (FFmpegInterrupted, BrokenProcessPool) as e:
+                    # Ctrl+C (or a killed worker); don't start the queued chunks on the way out
+                    pool.shutdown(wait=False, cancel_futures=True)
+                    if isinstance(e, BrokenProcessPool):
+                        raise FFmpegInterrupted(f"Encode of {name} was interrupted: {e}") from e
+                    raise
+                except FFmpegError as e:
+                    print(f"✗ {name} chunk {index + 1}: {e}")
+                    results[input_path] = None
+                    for other, (other_input, _) in futures.items():
+                        if other_input == input_path:
+                            other.cancel()
+                    continue
+                stats[input_path].append(chunk_stats)
+                print(f"  {name} chunk {index + 1}/{len(chunks[input_path])}: {format_chunk_stats(chunk_stats)}")
+
+                remaining[input_path] -= 1
+                if remaining[input_path] == 0:
+                    results[input_path] = _join(input_path, outputs[input_path], chunks[input_path],
+                                                stats[input_path])
+
+        elapsed = time.time() - start
+        frames = sum(s["frames"] for file_stats in stats.values() for s in file_stats)
+        print(f"Encoded {frames} frames in {elapsed:.1f}s ({frames / max(elapsed, 1e-6):.0f} fps overall)")
+    finally:
+        for work in work_dirs:
+            work.cleanup()
+    return results
+
+
+def _join(input_path, output_path, file_chunks, file_stats) -> Optional[dict]:
+    """Concatenate a file's encoded chunks and copy the source audio back in"""
+    name = Path(input_path).name
+    try:
+        concat_copy([encoded for _, encoded in file_chunks], output_path, audio_from=input_path)
+    except FFmpegInterrupted:
+        raise
+    except FFmpegError as e:
+        print(f"✗ Join failed: {name} ({e})")
+        return None
+    summary = {
+        "chunks": len(file_stats),
+        "frames": sum(s["frames"] for s in file_stats),
+        "media_seconds": sum(s["media_seconds"] for s in file_stats),
+        "encode_seconds": sum(s["wall_seconds"] for s in file_stats),
+    }
+    print(f"✓ {name} -> {output_path} ({summary['chunks']} chunks, {summary['frames']} frames)")
+    return summary
+
+
+def encode_chunked(input_path, output_path, vf: Optional[str] = None, **options) -> dict:
+    """
+    Re-encode one video across all cores
+
+    Takes the same options as encode_files; raises FFmpegError on failure.
+    """
+    result = encode_files([(str(input_path), str(output_path))], vf=vf, **options)[str(input_path)]
+    if result is None:
+        raise FFmpegError(f"Chunked encode failed for {input_path}")
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Re-encode videos with keyframe-chunked parallel x264")
+    parser.add_argument("inputs", nargs="+", help="Videos to encode")
+    parser.add_argument("-o", "--output-dir", help="Output folder (default: next to each input)")
+    parser.add_argument("--vf", help="Video filter, e.g. crop=1920:1080:0:4")
+    parser.add_argument("--suffix", default="_encoded", help="Output name suffix (default: _encoded)")
+    parser.add_argument("--preset", default="medium", help="x264 preset (default: medium)")
+    parser.add_argument("--crf", type=int, default=18, help="x264 CRF (default: 18)")
+    parser.add_argument("--chunk-seconds", type=float, default=CHUNK_SECONDS,
+                        help=f"Approximate chunk length (default: {CHUNK_SECONDS:g})")
+    parser.add_argument("--workers", type=int, help="Concurrent chunk encodes (default: cores / threads)")
+    parser.add_argument("--threads", type=int, default=THREADS_PER_CHUNK,
+                        help=f"x264 threads per chunk (default: {THREADS_PER_CHUNK})")
+    args = parser.parse_args()
+
+    try:
+        require_ffmpeg()
+    except FFmpegError as e:
+        print(f"Error: {e}")
+        sys.exit(1)
+
+    files = []
+    for name in args.inputs:
+        path = Path(name)
+        if not path.is_file():
+            print(f"⚠ Skipping missing file: {path}")
+            continue
+        folder = Path(args.output_dir) if args.output_dir else path.parent
+        files.append((str(path), str(folder / f"{path.stem}{args.suffix}.mp4")))
+    if not files:
+        sys.exit(1)
+
+    results = encode_files(files, vf=args.vf, preset=args.preset, crf=args.crf,
+                           chunk_seconds=args.chunk_seconds, workers=args.workers,
+                           threads_per_chunk=args.threads)
+    failed = [name for name, result in results.items() if result is None]
+    if failed:
+        print(f"✗ {len(failed)} of {len(files)} file(s) failed")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,285 @@
+#!/usr/bin/env python3
+"""
+Crop 1920x1088 recordings to 1920x1080
+Losslessly when possible, by rewriting the crop window in the video headers
+
+The 8 extra rows are encoder padding, so rather than decoding and
+re-encoding every frame we set the SPS frame-cropping window (H.264) or
+conformance window (HEVC) with the h264_metadata / hevc_metadata bitstream
+filter and stream-copy everything else. Decoders then output 1920x1080 and
+no generation loss is added before upscaling. A second stream-copy pass
+lets the MP4 muxer pick up the new dimensions for the container headers.
+
+Re-encoding is only used when the crop can't be expressed in the
+bitstream: other codecs, crop edges that aren't multiples of the chroma
+(or field) crop unit, or a stream that already carries a crop window.
+A quick sampled cropdetect pass confirms the rows being dropped really
+are padding.
+
+Re-encodes go through chunked_encode, which splits each file at
+keyframes and encodes the chunks across every core.
+
+Usage:
+  python crop_1080p.py <input.mp4> [-o output.mp4] [--reencode]
+  python crop_1080p.py *.mp4 [--workers N]
+"""
+
+import argparse
+import re
+import subprocess
+import sys
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+from chunked_encode import CHUNK_SECONDS, encode_files
+from ffmpeg_utils import CROP_1080P, FFmpegError, FFmpegInterrupted, probe_video, require_ffmpeg, run_ffmpeg
+
+BITSTREAM_FILTERS = {"h264": "h264_metadata", "hevc": "hevc_metadata"}
+
+# Crop window granularity (horizontal, vertical) by chroma subsampling
+CHROMA_UNITS = {"420": (2, 2), "nv12": (2, 2), "422": (2, 1), "444": (1, 1), "gray": (1, 1)}
+
+# Frames sampled by the cropdetect probe
+PROBE_SAMPLES = 5
+
+_CROP_LINE = re.compile(r"crop=(\d+):(\d+):(\d+):(\d+)")
+
+
+def parse_crop(spec: str) -> Tuple[int, int, int, int]:
+    """'1920:1080:0:4' -> (width, height, x, y)"""
+    width, height, x, y = (int(v) for v in spec.split(":"))
+    return width, height, x, y
+
+
+def detect_crop(input_path, duration: float, samples: int = PROBE_SAMPLES) -> Optional[Tuple[int, int, int, int]]:
+    """
+    Bounding box of non-black content over a few frames spread through the video
+
+    Each sample seeks straight to its timestamp and decodes a few frames
+    (cropdetect ignores the first two), so the probe costs about the same
+    for a 10s or a 1h file.
+    """
+    boxes = []
+    for i in range(samples):
+        at = duration * (i + 0.5) / samples
+        cmd = ["ffmpeg", "-hide_banner", "-nostdin", "-ss", f"{at:.3f}", "-i", str(input_path),
+               "-frames:v", "4", "-vf", "cropdetect=round=2:reset=1", "-an", "-f", "null", "-"]
+        result = subprocess.run(cmd, capture_output=True, text=True)
+        found = _CROP_LINE.findall(result.stderr)
+        if found:
+            box = tuple(int(v) for v in found[-1])
+            if box[0] > 0 and box[1] > 0:
+                boxes.append(box)
+    if not boxes:
+        return None
+    left = min(b[2] for b in boxes)
+    top = min(b[3] for b in boxes)
+    right = max(b[2] + b[0] for b in boxes)
+    bottom = max(b[3] + b[1] for b in boxes)
+    return right - left, bottom - top, left, top
+
+
+def padding_confirmed(detected, crop) -> bool:
+    """True if all detected content lies inside the crop window"""
+    width, height, x, y = crop
+    d_width, d_height, d_x, d_y = detected
+    return d_x >= x and d_y >= y and d_x + d_width <= x + width and d_y + d_height <= y + height
+
+
+def crop_units(info: dict) -> Optional[Tuple[int, int]]:
+    """Horizontal/vertical granularity of the bitstream crop window, None if unknown"""
+    pix_fmt = info.get("pix_fmt") or ""
+    units = next((value for key, value in CHROMA_UNITS.items() if key in pix_fmt), None)
+    if units is None:
+        return None
+    # Interlaced H.264 crops in units of two field rows
+    if info.get("codec") == "h264" and info.get("field_order") not in (None, "progressive", "unknown"):
+        units = (units[0], units[1] * 2)
+    return units
+
+
+def bitstream_filter(info: dict, crop) -> Tuple[Optional[str], str]:
+    """
+    -bsf:v argument that applies crop losslessly
+
+    Returns (filter, "") or (None, reason it can't be done).
+    """
+    name = BITSTREAM_FILTERS.get(info.get("codec"))
+    if name is None:
+        return None, f"{info.get('codec')} has no metadata bitstream filter"
+    width, height = info["width"], info["height"]
+    if (info.get("coded_width"), info.get("coded_height")) != (width, height):
+        return None, "stream already has a crop window"
+    units = crop_units(info)
+    if units is None:
+        return None, f"unknown chroma layout {info.get('pix_fmt')}"
+
+    crop_w, crop_h, x, y = crop
+    edges = {"left": x, "right": width - crop_w - x, "top": y, "bottom": height - crop_h - y}
+    if min(edges.values()) < 0:
+        return None, f"crop {crop_w}x{crop_h}+{x}+{y} is outside the {width}x{height} frame"
+    for edge, value in edges.items():
+        unit = units[0] if edge in ("left", "right") else units[1]
+        if value % unit:
+            return None, f"{edge} crop of {value}px is not a multiple of {unit}"
+    options = ":".join(f"crop_{edge}={value}" for edge, value in edges.items() if value)
+    return f"{name}={options}", ""
+
+
+def crop_lossless(input_path, output_path, bsf: str, expected_size):
+    """Stream-copy through the bitstream filter, then remux so the container headers match"""
+    output_path = Path(output_path)
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    stage_path = output_path.with_name(output_path.stem + ".bsf.part" + output_path.suffix)
+    temp_path = output_path.with_name(output_path.stem + ".part" + output_path.suffix)
+    try:
+        run_ffmpeg(["-i", input_path, "-map", "0", "-c", "copy", "-bsf:v", bsf, stage_path])
+        run_ffmpeg(["-i", stage_path, "-map", "0", "-c", "copy", "-movflags", "+faststart", temp_path])
+        info = probe_video(temp_path)
+        if (info["width"], info["height"]) != tuple(expected_size):
+            raise FFmpegError(f"Bitstream crop produced {info['width']}x{info['height']}")
+        temp_path.replace(output_path)
+    finally:
+        stage_path.unlink(missing_ok=True)
+        temp_path.unlink(missing_ok=True)
+
+
+def try_lossless(input_path, output_path, window, check_padding: bool = True) -> bool:
+    """Crop via the bitstream crop window; False if the file needs a re-encode"""
+    info = probe_video(input_path)
+
+    if check_padding:
+        detected = detect_crop(input_path, info["duration"])
+        if detected is None:
+            print("⚠ cropdetect found no content to measure; cropping anyway")
+        elif padding_confirmed(detected, window):
+            print(f"✓ Padding confirmed (content {detected[0]}x{detected[1]} at {detected[2]},{detected[3]})")
+        else:
+            print(f"⚠ Content detected outside the crop window "
+                  f"({detected[0]}x{detected[1]} at {detected[2]},{detected[3]}); cropping anyway")
+
+    bsf, reason = bitstream_filter(info, window)
+    if not bsf:
+        print(f"⚠ Can't crop losslessly: {reason}; re-encoding")
+        return False
+    try:
+        crop_lossless(input_path, output_path, bsf, window[:2])
+        return True
+    except FFmpegInterrupted:
+        raise
+    except FFmpegError as e:
+        print(f"⚠ Lossless crop failed ({e}); re-encoding")
+        return False
+
+
+def crop_batch(files, crop: str = CROP_1080P, reencode: bool = False, check_padding: bool = True,
+               preset: str = "slow", crf: int = 18, **encode_options) -> Dict[str, Optional[str]]:
+    """
+    Crop a batch of videos, losslessly where the bitstream allows it
+
+    Files that need a real re-encode all go through one shared
+    chunked_encode pool, split at keyframes across every core.
+
+    Args:
+        files: (input_path, output_path) pairs
+        crop: ffmpeg crop spec width:height:x:y
+        reencode: Skip the lossless path and re-encode everything
+        check_padding: Run the sampled cropdetect probe first
+        preset, crf: x264 settings for re-encodes
+        encode_options: Passed to chunked_encode.encode_files (workers, chunk_seconds, ...)
+
+    Returns:
+        {input_path: "bitstream", "reencode", or None if it failed}
+    """
+    window = parse_crop(crop)
+    results = {}
+    to_encode = []
+    for input_path, output_path in files:
+        input_path, output_path = str(input_path), str(output_path)
+        try:
+            if not reencode and try_lossless(input_path, output_path, window, check_padding):
+                results[input_path] = "bitstream"
+                continue
+        except FFmpegInterrupted:
+            raise
+        except FFmpegError as e:
+            print(f"✗ {Path(input_path).name}: {e}")
+            results[input_path] = None
+            continue
+        to_encode.append((input_path, output_path))
+
+    if to_encode:
+        encoded = encode_files(to_encode, vf=f"crop={crop}", preset=preset, crf=crf, **encode_options)
+        for input_path, summary in encoded.items():
+            results[input_path] = "reencode" if summary is not None else None
+    return results
+
+
+def crop_to_1080p(input_path, output_path, crop: str = CROP_1080P, reencode: bool = False,
+                  check_padding: bool = True, **options) -> str:
+    """
+    Crop one video, losslessly if the bitstream allows it
+
+    Takes the same options as crop_batch.
+
+    Returns:
+        "bitstream" or "reencode" (the method used); raises FFmpegError on
+        failure, FFmpegInterrupted if ffmpeg was stopped by a signal
+    """
+    method = crop_batch([(input_path, output_path)], crop, reencode, check_padding,
+                        **options)[str(input_path)]
+    if method is None:
+        raise FFmpegError(f"Crop failed for {input_path}")
+    return method
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Crop 1920x1088 recordings to 1080p (losslessly when possible)")
+    parser.add_argument("inputs", nargs="+", help="Videos to crop")
+    parser.add_argument("-o", "--output", help="Output file for a single input "
+                                               "(default: <name>_1080p.mp4 in the current folder)")
+    parser.add_argument("--crop", default=CROP_1080P, help=f"Crop window w:h:x:y (default {CROP_1080P})")
+    parser.add_argument("--reencode", action="store_true", help="Always re-encode instead of the lossless crop")
+    parser.add_argument("--no-probe", action="store_true", help="Skip the cropdetect padding check")
+    parser.add_argument("--preset", default="slow", help="x264 preset for re-encodes (default: slow)")
+    parser.add_argument("--workers", type=int, help="Concurrent chunk encodes for re-encodes (default: cores / 4)")
+    parser.add_argument("--chunk-seconds", type=float, default=CHUNK_SECONDS,
+                        help=f"Re-encode chunk length in seconds (default: {CHUNK_SECONDS:g})")
+    args = parser.parse_args()
+
+    if args.output and len(args.inputs) > 1:
+        parser.error("-o/--output only works with a single input")
+
+    files = []
+    for name in args.inputs:
+        input_path = Path(name)
+        if not input_path.is_file():
+            print(f"Error: File '{input_path}' not found")
+            sys.exit(1)
+        output = Path(args.output) if args.output else Path(f"{input_path.stem}_1080p.mp4")
+        print(f"Processing: {input_path}")
+        print(f"Output: {output}")
+        files.append((str(input_path), str(output)))
+
+    try:
+        require_ffmpeg()
+    except FFmpegError as e:
+        print(f"✗ Error processing video: {e}")
+        sys.exit(1)
+    results = crop_batch(files, args.crop, reencode=args.reencode, check_padding=not args.no_probe,
+                         preset=args.preset, workers=args.workers, chunk_seconds=args.chunk_seconds)
+
+    failed = False
+    for input_path, output in files:
+        method = results.get(input_path)
+        if method is None:
+            print(f"✗ Error processing video: {input_path}")
+            failed = True
+        else:
+            print(f"✓ Successfully created: {output} ({'lossless' if method == 'bitstream' else 're-encoded'})")
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
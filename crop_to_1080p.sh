@@ -29,23 +29,7 @@ if [[ "$FILENAME" =~ _4K_ ]]; then
     fi
 fi
 
-OUTPUT="${FILENAME}_1080p.mp4"
-
-echo "Processing: $INPUT"
-echo "Output: $OUTPUT"
-
-# Crop from center: 1920x1088 -> 1920x1080 (remove 4 pixels from top and bottom)
-ffmpeg -i "$INPUT" \
-    -vf "crop=1920:1080:0:4" \
-    -c:v libx264 \
-    -preset slow \
-    -crf 18 \
-    -c:a copy \
-    "$OUTPUT"
-
-if [ $? -eq 0 ]; then
-    echo "✓ Successfully created: $OUTPUT"
-else
-    echo "✗ Error processing video"
-    exit 1
-fi
+# crop_1080p.py trims the 8 padding rows losslessly (H.264/HEVC crop window,
+# stream copy) and only re-encodes when the bitstream can't express the crop
+SCRIPT_DIR="$(cd "$(dirname "$0")" && pwd)"
+exec python3 "$SCRIPT_DIR/crop_1080p.py" "$INPUT" "${@:2}"
@@ -0,0 +1,240 @@
+#!/usr/bin/env python3
+"""
+Persistent local cache for Fal.ai uploads and results
+
+Uploads: maps file content (SHA-256) to an uploaded fal URL and its expiry.
+Uploading the same file twice (retries, running one image through several
+models, one video through bytedance then topaz) reuses the earlier URL as
+long as it is still valid. Hashes are memoised by (path, size, mtime) so an
+unchanged file is only read once.
+
+Results: maps (input hash, endpoint, arguments) to the result URL and the
+local output file it was saved as. A batch can skip work whose output is
+still on disk unchanged, re-download from a live result URL instead of
+paying for inference again, and redo work whenever the input or any
+argument changes.
+
+The cache lives in ~/.cache/vibe-coding/fal_cache.sqlite (override with
+FAL_CACHE_DIR). Each thread keeps one connection to it, and expired
+uploads and hashes of deleted files are pruned about once a day.
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Optional
+
+# How long uploaded files are kept by fal; requested explicitly on upload
+UPLOAD_TTL_SECONDS = int(float(os.getenv('FAL_UPLOAD_TTL_HOURS', '24')) * 3600)
+
+# How long fal keeps result files; we HEAD-check before relying on one anyway
+RESULT_TTL_SECONDS = int(float(os.getenv('FAL_RESULT_TTL_HOURS', '24')) * 3600)
+
+# Don't hand out a URL that would expire before a queued job reads it
+MIN_REMAINING_SECONDS = 2 * 3600
+
+HASH_CHUNK_SIZE = 1024 * 1024
+
+# Seconds between automatic prune() runs
+PRUNE_INTERVAL_SECONDS = 24 * 3600
+
+# Reentrant: connect() may prune while a caller holds it
+_lock = threading.RLock()
+_local = threading.local()
+
+
+def cache_path() -> Path:
+    """Location of the SQLite cache file"""
+    base = os.getenv('FAL_CACHE_DIR') or Path.home() / ".cache" / "vibe-coding"
+    return Path(base) / "fal_cache.sqlite"
+
+
+def connect() -> sqlite3.Connection:
+    """
+    This thread's connection to the cache database, opened (and the tables
+    created) on first use; also prunes the cache if it's due
+
+    Use it as `with connect() as conn:` for a transaction; don't close it.
+    """
+    path = cache_path()
+    conn = getattr(_local, 'conn', None)
+    if conn is not None and _local.path == path:
+        return conn
+    if conn is not None:
+        conn.close()  # FAL_CACHE_DIR changed
+    path.parent.mkdir(parents=True, exist_ok=True)
+    conn = sqlite3.connect(str(path), timeout=30)
+    _local.conn, _local.path = conn, path
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.executescript("""
+        CREATE TABLE IF NOT EXISTS file_hashes (
+            path TEXT PRIMARY KEY,
+            size INTEGER NOT NULL,
+            mtime_ns INTEGER NOT NULL,
+            sha256 TEXT NOT NULL
+        );
+        CREATE TABLE IF NOT EXISTS uploads (
+            sha256 TEXT PRIMARY KEY,
+            url TEXT NOT NULL,
+            size INTEGER NOT NULL,
+            uploaded_at REAL NOT NULL,
+            expires_at REAL NOT NULL
+        );
+        CREATE TABLE IF NOT EXISTS results (
+            key TEXT PRIMARY KEY,
+            input_sha256 TEXT NOT NULL,
+            endpoint TEXT NOT NULL,
+            arguments TEXT NOT NULL,
+            output_url TEXT NOT NULL,
+            output_path TEXT NOT NULL,
+            output_size INTEGER NOT NULL,
+            output_mtime_ns INTEGER NOT NULL,
+            created_at REAL NOT NULL,
+            url_expires_at REAL NOT NULL
+        );
+        CREATE TABLE IF NOT EXISTS meta (
+            name TEXT PRIMARY KEY,
+            value REAL NOT NULL
+        );
+    """)
+    with _lock:
+        row = conn.execute("SELECT value FROM meta WHERE name = 'last_prune'").fetchone()
+        if row is None or time.time() - row[0] >= PRUNE_INTERVAL_SECONDS:
+            _prune(conn)
+    return conn
+
+
+def file_sha256(path: str) -> str:
+    """Content hash of a file, memoised by (path, size, mtime)"""
+    path = str(Path(path).resolve())
+    stat = os.stat(path)
+
+    with _lock, connect() as conn:
+        row = conn.execute(
+            "SELECT sha256 FROM file_hashes WHERE path = ? AND size = ? AND mtime_ns = ?",
+            (path, stat.st_size, stat.st_mtime_ns),
+        ).fetchone()
+    if row:
+        return row[0]
+
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b''):
+            digest.update(chunk)
+    sha256 = digest.hexdigest()
+
+    with _lock, connect() as conn:
+        conn.execute(
+            "INSERT OR REPLACE INTO file_hashes (path, size, mtime_ns, sha256) VALUES (?, ?, ?, ?)",
+            (path, stat.st_size, stat.st_mtime_ns, sha256),
+        )
+    return sha256
+
+
+def lookup_upload(sha256: str) -> Optional[str]:
+    """Return a still-valid uploaded URL for this content, if any"""
+    with _lock, connect() as conn:
+        row = conn.execute(
+            "SELECT url, expires_at FROM uploads WHERE sha256 = ?", (sha256,)
+        ).fetchone()
+    if row and row[1] - time.time() > MIN_REMAINING_SECONDS:
+        return row[0]
+    return None
+
+
+def record_upload(sha256: str, url: str, size: int, ttl_seconds: int = UPLOAD_TTL_SECONDS):
+    """Remember that this content is available at url until now + ttl"""
+    now = time.time()
+    with _lock, connect() as conn:
+        conn.execute(
+            "INSERT OR REPLACE INTO uploads (sha256, url, size, uploaded_at, expires_at) "
+            "VALUES (?, ?, ?, ?, ?)",
+            (sha256, url, size, now, now + ttl_seconds),
+        )
+
+
+def forget_upload(sha256: Optional[str] = None, url: Optional[str] = None):
+    """Drop a cached URL, by content hash or by URL (e.g. fal rejected it as expired)"""
+    with _lock, connect() as conn:
+        if sha256:
+            conn.execute("DELETE FROM uploads WHERE sha256 = ?", (sha256,))
+        if url:
+            conn.execute("DELETE FROM uploads WHERE url = ?", (url,))
+
+
+def _prune(conn: sqlite3.Connection):
+    with conn:
+        conn.execute("DELETE FROM uploads WHERE expires_at < ?", (time.time(),))
+        stale = [
+            (path,) for (path,) in conn.execute("SELECT path FROM file_hashes")
+            if not os.path.exists(path)
+        ]
+        conn.executemany("DELETE FROM file_hashes WHERE path = ?", stale)
+        conn.execute("INSERT OR REPLACE INTO meta (name, value) VALUES ('last_prune', ?)", (time.time(),))
+
+
+def prune():
+    """Delete expired uploads and hashes of files that no longer exist"""
+    with _lock:
+        _prune(connect())
+
+
+def result_key(input_sha256: str, endpoint: str, arguments: dict,
+               output_options: Optional[dict] = None) -> str:
+    """Stable key for one unit of work; any change to inputs or arguments changes it"""
+    parts = [input_sha256, endpoint, arguments]
+    if output_options:
+        parts.append(output_options)
+    canonical = json.dumps(parts, sort_keys=True, separators=(',', ':'))
+    return hashlib.sha256(canonical.encode()).hexdigest()
+
+
+def lookup_result(key: str) -> Optional[dict]:
+    """Return the recorded result for this key, if any"""
+    with _lock, connect() as conn:
+        cursor = conn.cursor()
+        cursor.row_factory = sqlite3.Row  # only here; the connection is shared
+        row = cursor.execute("SELECT * FROM results WHERE key = ?", (key,)).fetchone()
+    return dict(row) if row else None
+
+
+def output_is_current(entry: dict) -> bool:
+    """True if the recorded output file is still on disk, unmodified"""
+    try:
+        stat = os.stat(entry['output_path'])
+    except OSError:
+        return False
+    return stat.st_size == entry['output_size'] and stat.st_mtime_ns == entry['output_mtime_ns']
+
+
+def result_url_is_live(entry: dict) -> bool:
+    """True if the recorded result URL has not passed its expected expiry"""
+    return entry['url_expires_at'] > time.time()
+
+
+def record_result(key: str, input_sha256: str, endpoint: str, arguments: dict,
+                  output_url: str, output_path: str, output_options: Optional[dict] = None,
+                  ttl_seconds: int = RESULT_TTL_SECONDS):
+    """Remember a finished job and the output file it produced"""
+    if output_options:
+        arguments = {**arguments, '_output': output_options}
+    stat = os.stat(output_path)
+    now = time.time()
+    with _lock, connect() as conn:
+        conn.execute(
+            "INSERT OR REPLACE INTO results (key, input_sha256, endpoint, arguments, output_url, "
+            "output_path, output_size, output_mtime_ns, created_at, url_expires_at) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (key, input_sha256, endpoint, json.dumps(arguments, sort_keys=True), output_url,
+             str(Path(output_path).resolve()), stat.st_size, stat.st_mtime_ns, now, now + ttl_seconds),
+        )
+
+
+def forget_result(key: str):
+    """Drop a recorded result (e.g. its URL turned out to be dead)"""
+    with _lock, connect() as conn:
+        conn.execute("DELETE FROM results WHERE key = ?", (key,))
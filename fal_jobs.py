@@ -0,0 +1,634 @@
+#!/usr/bin/env python3
+"""
+Shared Fal.ai job engine
+Runs upload -> submit/wait -> download -> postprocess as pipelined stages
+
+Each stage has its own worker pool and the stages are connected by bounded
+queues, so while image N is uploading, image N-1 can be waiting in the fal
+queue and image N-2 can be downloading. A full downstream queue blocks the
+stage feeding it, which keeps memory and in-flight uploads bounded.
+Postprocessing (e.g. image transcoding) runs on its own pool so CPU-bound
+work overlaps with the network-bound stages of other jobs.
+
+Requests are followed through fal's status events rather than a silent
+blocking get(), so queue position, time in queue vs inference and a batch
+ETA are reported as they happen (see fal_progress). Optional per-job and
+per-batch deadlines cancel overdue requests through fal's cancel API so a
+wedged job can't stall a batch (or keep billing); such jobs are marked
+retryable instead of failed.
+
+Transient errors (network failures, 429/5xx) are retried with jittered
+exponential backoff. With a batch journal (see batch_journal), finished
+items are skipped and requests submitted by an interrupted run are
+re-attached to rather than submitted again.
+
+Used by remove_background.py, upscale_image_to_4k.py and upscale_to_4k.py.
+"""
+
+import os
+import queue
+import random
+import threading
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Callable, Optional
+
+import batch_journal
+import fal_cache
+import fal_progress
+import http_download
+import image_probe
+
+try:
+    import fal_client
+except ImportError:
+    print("Installing fal_client...")
+    os.system("pip install fal-client")
+    import fal_client
+
+_print_lock = threading.Lock()
+_STOP = object()
+
+# Seconds between fal status polls per request
+POLL_INTERVAL = 1.0
+
+# Seconds between batch status lines
+PROGRESS_INTERVAL = 15.0
+
+# Attempts per stage for transient errors, and the backoff envelope
+RETRY_ATTEMPTS = 4
+RETRY_BASE_SECONDS = 2.0
+RETRY_MAX_SECONDS = 60.0
+
+
+class JobCancelled(Exception):
+    """A job passed its deadline and its fal request was cancelled"""
+
+
+def is_transient(error: Exception) -> bool:
+    """Errors worth retrying: network failures, timeouts, rate limits and 5xx responses"""
+    import httpx
+    if isinstance(error, (httpx.TransportError, ConnectionError, TimeoutError)):
+        return True
+    status = getattr(error, 'status_code', None)
+    if status is None and isinstance(error, httpx.HTTPStatusError):
+        status = error.response.status_code
+    return status is not None and (status == 429 or status >= 500)
+
+
+def is_rejected_input(error: Exception, url_field: str) -> bool:
+    """
+    fal couldn't download the input file (e.g. an upload it already deleted):
+    a 422 whose error type is file_download_error on the input URL argument
+    """
+    if getattr(error, 'status_code', None) != 422:
+        return False
+    if getattr(error, 'error_type', None) == 'file_download_error':
+        return True
+    # FalClientHTTPError.message holds the response's parsed 'detail' list
+    details = getattr(error, 'message', None)
+    if not isinstance(details, list):
+        return False
+    return any(
+        isinstance(detail, dict) and detail.get('type') == 'file_download_error'
+        and (detail.get('loc') or [url_field])[-1] == url_field
+        for detail in details
+    )
+
+
+def backoff_delay(attempt: int) -> float:
+    """Full-jitter exponential backoff: uniform in [0, base * 2^(attempt-1)], capped"""
+    return random.uniform(0, min(RETRY_MAX_SECONDS, RETRY_BASE_SECONDS * 2 ** (attempt - 1)))
+
+
+def log(message: str):
+    """Print a line without interleaving output from worker threads"""
+    with _print_lock:
+        print(message, flush=True)
+
+
+def configure_api_key() -> bool:
+    """Copy FAL_API_KEY from .env.local into FAL_KEY for fal_client"""
+    api_key = os.getenv('FAL_API_KEY')
+    if not api_key:
+        print("Error: FAL_API_KEY not found in .env.local")
+        return False
+    os.environ['FAL_KEY'] = api_key
+    return True
+
+
+def upload_file(path: str, use_cache: bool = True) -> str:
+    """
+    Upload a local file to Fal.ai and return its URL
+
+    Content already uploaded (by any script) and not yet expired is served
+    from the local upload cache without touching the network.
+    """
+    if not use_cache:
+        return fal_client.upload_file(path)
+
+    sha256 = fal_cache.file_sha256(path)
+    url = fal_cache.lookup_upload(sha256)
+    if url:
+        return url
+
+    # Ask fal to keep the file for as long as the cache will hand it out
+    if hasattr(fal_client, 'StorageSettings'):
+        lifecycle = fal_client.StorageSettings(expires_in=fal_cache.UPLOAD_TTL_SECONDS)
+        url = fal_client.upload_file(path, lifecycle=lifecycle)
+    else:
+        url = fal_client.upload_file(path)
+
+    fal_cache.record_upload(sha256, url, os.path.getsize(path))
+    return url
+
+
+def find_output_url(result: dict) -> Optional[str]:
+    """Locate the output file URL in a fal result payload"""
+    for key in ('image', 'video', 'output'):
+        value = result.get(key)
+        if isinstance(value, dict) and 'url' in value:
+            return value['url']
+        if isinstance(value, str) and value.startswith('http'):
+            return value
+    for key in ('output_url', 'url'):
+        if isinstance(result.get(key), str):
+            return result[key]
+    # Fall back to the first URL-looking value anywhere at the top level
+    for value in result.values():
+        if isinstance(value, str) and value.startswith('http'):
+            return value
+        if isinstance(value, dict) and 'url' in value:
+            return value['url']
+    return None
+
+
+def url_is_live(url: str) -> bool:
+    """Cheap HEAD check that a result URL can still be downloaded"""
+    try:
+        return http_download.get_client().head(url).status_code == 200
+    except Exception:
+        return False
+
+
+def download_file(url: str, output_path: str, on_data=None) -> http_download.DownloadResult:
+    """Download a result URL to output_path, raising on failure"""
+    return http_download.download(url, output_path, on_data=on_data)
+
+
+def download_bytes(url: str, on_data=None) -> bytes:
+    """Download a result URL into memory, raising on failure"""
+    return http_download.fetch_bytes(url, on_data=on_data)
+
+
+@dataclass
+class FalJob:
+    """One input file travelling through the pipeline"""
+    input_path: str
+    endpoint: str
+    output_path: str
+    arguments: dict = field(default_factory=dict)
+    url_field: str = "image_url"
+    # File to upload instead of input_path (e.g. a downscaled proxy); the
+    # result cache is still keyed on input_path's content
+    upload_path: Optional[str] = None
+    # Called in an upload worker before uploading (e.g. to build the proxy)
+    prepare: Optional[Callable[["FalJob"], None]] = None
+    # Uploads the input itself and returns its URL, replacing upload_file
+    # (e.g. to stream an ffmpeg encode straight into fal storage)
+    upload: Optional[Callable[["FalJob"], str]] = None
+    # Called in a postprocess worker once the output has been downloaded
+    postprocess: Optional[Callable[["FalJob"], None]] = None
+    # Keep the download in job.extra['data'] instead of writing output_path;
+    # postprocess is then responsible for writing the output file
+    in_memory: bool = False
+    # Local settings that change the output file (codec, quality...); not
+    # sent to fal but part of the result cache key
+    output_options: dict = field(default_factory=dict)
+
+    upload_url: Optional[str] = None
+    request_id: Optional[str] = None
+    result: Optional[dict] = None
+    output_url: Optional[str] = None
+    error: Optional[str] = None
+    # 'output' when the output on disk is already current, 'url' when an
+    # earlier result URL is re-downloaded instead of running inference again
+    cached: Optional[str] = None
+    timings: dict = field(default_factory=dict)
+    extra: dict = field(default_factory=dict)
+    # Set when the job was cancelled at a deadline; running it again may succeed
+    retryable: bool = False
+
+    @property
+    def name(self) -> str:
+        return Path(self.input_path).name
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None and self.output_url is not None
+
+
+class FalPipeline:
+    """
+    Four-stage upload -> fal -> download -> postprocess pipeline
+
+    Args:
+        upload_workers: Concurrent uploads
+        fal_workers: Concurrent fal requests (submitted and waiting on results)
+        download_workers: Concurrent downloads
+        postprocess_workers: Concurrent postprocess calls (default: CPU count)
+        queue_size: Capacity of each queue between stages
+        verbose: Print per-stage progress for every job
+        use_cache: Reuse earlier uploads and results of identical work (see fal_cache)
+        job_timeout: Seconds a request may spend in fal (queue + inference)
+                     before it is cancelled
+        batch_timeout: Seconds from the start of run() after which every
+                       outstanding request is cancelled and unsent jobs skipped
+        journal: batch_journal.BatchJournal to resume from and append to
+        retries: Attempts per stage for transient errors
+    """
+
+    def __init__(self, upload_workers=1, fal_workers=1, download_workers=1,
+                 postprocess_workers=None, queue_size=None, verbose=True, use_cache=True,
+                 job_timeout=None, batch_timeout=None, journal=None, retries=RETRY_ATTEMPTS):
+        self.upload_workers = max(1, upload_workers)
+        self.fal_workers = max(1, fal_workers)
+        self.download_workers = max(1, download_workers)
+        self.postprocess_workers = max(1, postprocess_workers or os.cpu_count() or 1)
+        self.queue_size = queue_size or max(self.fal_workers, 2)
+        self.verbose = verbose
+        self.use_cache = use_cache
+        self.job_timeout = job_timeout
+        self.batch_timeout = batch_timeout
+        self.batch_deadline = None
+        self.journal = journal
+        self.retries = max(1, retries)
+        self.progress = None
+
+    @classmethod
+    def for_jobs(cls, jobs: int, **kwargs) -> "FalPipeline":
+        """Size the pipeline from a single --jobs value (in-flight fal requests)"""
+        jobs = max(1, jobs)
+        side = min(jobs, 4)
+        return cls(upload_workers=side, fal_workers=jobs, download_workers=side, **kwargs)
+
+    def _log(self, job: FalJob, message: str):
+        if self.verbose:
+            log(f"  [{job.name}] {message}")
+
+    def _state(self, job: FalJob, state: str):
+        if self.progress:
+            self.progress.update(job, state)
+
+    # --- stages -----------------------------------------------------------
+
+    def _check_result_cache(self, job: FalJob) -> bool:
+        """Look up earlier results of this exact work; True if inference can be skipped"""
+        sha256 = fal_cache.file_sha256(job.input_path)
+        key = fal_cache.result_key(sha256, job.endpoint, job.arguments, job.output_options)
+        job.extra['input_sha256'] = sha256
+        job.extra['result_key'] = key
+
+        entry = fal_cache.lookup_result(key)
+        if not entry:
+            return False
+
+        same_path = Path(entry['output_path']) == Path(job.output_path).resolve()
+        if same_path and fal_cache.output_is_current(entry):
+            job.output_url = entry['output_url']
+            job.cached = 'output'
+            self._log(job, "Up to date, skipping")
+            return True
+
+        if fal_cache.result_url_is_live(entry) and url_is_live(entry['output_url']):
+            job.output_url = entry['output_url']
+            job.cached = 'url'
+            self._log(job, "Re-downloading earlier result (no inference needed)")
+            return True
+
+        fal_cache.forget_result(key)
+        return False
+
+    def _record_result(self, job: FalJob):
+        fal_cache.record_result(
+            job.extra['result_key'], job.extra['input_sha256'], job.endpoint,
+            job.arguments, job.output_url, job.output_path, job.output_options,
+        )
+
+    def _check_batch_deadline(self):
+        if self.batch_deadline is not None and time.time() >= self.batch_deadline:
+            raise JobCancelled("Batch deadline reached before the job was sent")
+
+    def _cancel(self, job: FalJob, handler, reason: str):
+        """Cancel the remote request (best effort) and abandon the job"""
+        try:
+            handler.cancel()
+        except Exception as e:
+            self._log(job, f"Cancel request failed: {e}")
+        job.timings['fal'] = time.time() - job.extra['submitted_at']
+        raise JobCancelled(f"{reason} after {job.timings['fal']:.0f}s; request {job.request_id} cancelled")
+
+    def _check_journal(self, job: FalJob) -> bool:
+        """Skip items finished by an earlier run; note requests to re-attach to"""
+        key = job.extra['journal_key'] = batch_journal.job_key(job)
+        entry = self.journal.lookup(key)
+        if self.journal.is_done(key, job.output_path):
+            job.output_url = entry.get('output_url')
+            job.cached = 'output'
+            job.extra['journal_skip'] = True
+            self._log(job, "Finished in an earlier run, skipping")
+            return True
+        pending = self.journal.pending_request(key)
+        if pending and pending.get('request_id'):
+            job.request_id = pending['request_id']
+        return False
+
+    def _reattach(self, job: FalJob):
+        """Handle for an already-submitted request, or None if it can't be resumed"""
+        sync_client = getattr(fal_client, 'sync_client', None)
+        if sync_client is None or not hasattr(sync_client, 'get_handle'):
+            return None
+        try:
+            handler = sync_client.get_handle(job.endpoint, job.request_id)
+            handler.status()
+        except Exception as e:
+            if is_transient(e):
+                raise
+            self._log(job, f"Request {job.request_id} can't be resumed ({e}); resubmitting")
+            return None
+        self._log(job, f"Re-attached to request {job.request_id}")
+        return handler
+
+    def _upload(self, job: FalJob):
+        if self.journal and self._check_journal(job):
+            return
+        if self.use_cache and self._check_result_cache(job):
+            return
+        if job.request_id:
+            return  # re-attaching in the fal stage; nothing to upload yet
+        self._upload_input(job)
+
+    def _upload_input(self, job: FalJob):
+        self._check_batch_deadline()
+        if job.prepare:
+            job.prepare(job)
+        self._state(job, "uploading")
+        self._log(job, "Uploading...")
+        start = time.time()
+        if job.upload:
+            job.upload_url = job.upload(job)
+        else:
+            job.upload_url = upload_file(job.upload_path or job.input_path, use_cache=self.use_cache)
+        job.timings['upload'] = time.time() - start
+        self._log(job, f"Uploaded in {job.timings['upload']:.1f}s: {job.upload_url}")
+
+    def _run_fal(self, job: FalJob):
+        if job.cached:
+            return
+        self._check_batch_deadline()
+        # A request ID here comes from the journal or an earlier attempt
+        handler = self._reattach(job) if job.request_id else None
+        if handler is None:
+            job.request_id = None
+            if job.upload_url is None:
+                self._upload_input(job)
+            arguments = {job.url_field: job.upload_url, **job.arguments}
+            job.extra['submitted_at'] = time.time()
+            try:
+                handler = fal_client.submit(job.endpoint, arguments=arguments)
+            except Exception as e:
+                self._check_rejected_input(job, e)
+                raise
+            job.request_id = handler.request_id
+            if self.journal:
+                self.journal.submitted(job.extra['journal_key'], job)
+            self._log(job, f"Job ID: {handler.request_id}")
+        start = job.extra.setdefault('submitted_at', time.time())
+        self._state(job, "queued")
+
+        try:
+            if hasattr(handler, 'iter_events'):
+                self._follow_events(job, handler, start)
+            job.result = handler.get()
+        except Exception as e:
+            self._check_rejected_input(job, e)
+            raise
+        job.timings['fal'] = time.time() - start
+        if 'queue' in job.timings:
+            job.timings.setdefault('inference', job.timings['fal'] - job.timings['queue'])
+
+        job.output_url = find_output_url(job.result)
+        if not job.output_url:
+            raise ValueError(f"No output URL in result: {job.result}")
+        timing = f"Processed in {job.timings['fal']:.1f} seconds"
+        if 'queue' in job.timings:
+            timing += f" ({job.timings['queue']:.1f}s queued, {job.timings['inference']:.1f}s inference)"
+        self._log(job, timing)
+
+    def _check_rejected_input(self, job: FalJob, error: Exception):
+        """Stop handing out a cached upload URL that fal couldn't read"""
+        if self.use_cache and job.upload_url and is_rejected_input(error, job.url_field):
+            fal_cache.forget_upload(url=job.upload_url)
+            self._log(job, "fal couldn't read the uploaded input; it will be uploaded again next time")
+
+    def _follow_events(self, job: FalJob, handler, submitted: float):
+        """Consume status events: queue position, start of inference, logs, completion"""
+        running_since = None
+        seen_logs = 0
+        job_deadline = submitted + self.job_timeout if self.job_timeout else None
+        for event in handler.iter_events(with_logs=self.verbose, interval=POLL_INTERVAL):
+            now = time.time()
+            if not isinstance(event, fal_client.Completed):
+                if job_deadline is not None and now >= job_deadline:
+                    self._cancel(job, handler, "Job deadline reached")
+                if self.batch_deadline is not None and now >= self.batch_deadline:
+                    self._cancel(job, handler, "Batch deadline reached")
+            if isinstance(event, fal_client.Queued):
+                positions = job.extra.setdefault('queue_positions', [])
+                if not positions or positions[-1] != event.position:
+                    positions.append(event.position)
+                    self._log(job, f"Queued at position {event.position}")
+            elif isinstance(event, fal_client.InProgress):
+                if running_since is None:
+                    running_since = time.time()
+                    job.timings['queue'] = running_since - submitted
+                    self._state(job, "running")
+                    self._log(job, f"Running after {job.timings['queue']:.1f}s in queue")
+                # Each status carries the full log so far; print only new lines
+                logs = event.logs or []
+                for entry in logs[seen_logs:]:
+                    self._log(job, f"fal: {entry.get('message', entry)}")
+                seen_logs = len(logs)
+            elif isinstance(event, fal_client.Completed):
+                if getattr(event, 'error', None):
+                    raise RuntimeError(f"fal request failed: {event.error}")
+                metrics = getattr(event, 'metrics', None) or {}
+                job.extra['fal_metrics'] = metrics
+                if 'inference_time' in metrics:
+                    # Server-side figure is exact even if the job ran between polls
+                    job.timings['inference'] = float(metrics['inference_time'])
+                    job.timings['queue'] = max(0.0, time.time() - submitted - job.timings['inference'])
+                elif running_since is None:
+                    job.timings['queue'] = time.time() - submitted
+
+    def _download(self, job: FalJob):
+        if job.cached == 'output':
+            return
+        self._state(job, "downloading")
+        Path(job.output_path).parent.mkdir(parents=True, exist_ok=True)
+        start = time.time()
+        # Output image dimensions are read from the header bytes as they arrive
+        probe = image_probe.StreamProbe()
+        if job.in_memory:
+            job.extra['data'] = download_bytes(job.output_url, on_data=probe.feed)
+            size = len(job.extra['data'])
+        else:
+            download = download_file(job.output_url, job.output_path, on_data=probe.feed)
+            job.extra['download'] = download
+            size = download.size
+        job.extra['output_dimensions'] = probe.dimensions
+        job.timings['download'] = time.time() - start
+        rate = size / job.timings['download'] if job.timings['download'] > 0 else 0.0
+        self._log(job, f"Downloaded {size / (1024 * 1024):.1f} MB at {http_download.format_rate(rate)}")
+
+    def _postprocess(self, job: FalJob):
+        if job.cached == 'output':
+            return
+        if job.postprocess:
+            self._state(job, "postprocessing")
+            start = time.time()
+            job.postprocess(job)
+            job.timings['postprocess'] = time.time() - start
+        job.extra.pop('data', None)
+        # Jobs consumed purely in memory (e.g. tiles) leave no file to index
+        if self.use_cache and os.path.exists(job.output_path):
+            self._record_result(job)
+        self._log(job, f"Saved: {job.output_path}")
+
+    # --- plumbing ---------------------------------------------------------
+
+    def _worker(self, stage: Callable[[FalJob], None], inbox: queue.Queue,
+                outbox: queue.Queue, done: queue.Queue):
+        while True:
+            item = inbox.get()
+            if item is _STOP:
+                inbox.put(_STOP)  # let sibling workers see it too
+                return
+            index, job = item
+            if job.error is None:
+                try:
+                    self._run_stage(stage, job)
+                except JobCancelled as e:
+                    job.error = f"Cancelled: {e}"
+                    job.retryable = True
+                    self._log(job, job.error)
+                except Exception as e:
+                    job.error = f"{type(e).__name__}: {e}"
+                    self._log(job, f"Error: {job.error}")
+            if job.error is not None or outbox is None:
+                done.put((index, job))
+            else:
+                outbox.put((index, job))
+
+    def _run_stage(self, stage: Callable[[FalJob], None], job: FalJob):
+        """Run one stage, retrying transient errors with jittered exponential backoff"""
+        for attempt in range(1, self.retries + 1):
+            try:
+                return stage(job)
+            except JobCancelled:
+                raise
+            except Exception as e:
+                if attempt >= self.retries or not is_transient(e):
+                    raise
+                delay = backoff_delay(attempt)
+                self._log(job, f"Transient error ({type(e).__name__}: {e}); "
+                               f"retry {attempt}/{self.retries - 1} in {delay:.1f}s")
+                time.sleep(delay)
+
+    def _start_stage(self, count, stage, inbox, outbox, done):
+        threads = [
+            threading.Thread(target=self._worker, args=(stage, inbox, outbox, done), daemon=True)
+            for _ in range(count)
+        ]
+        for t in threads:
+            t.start()
+        return threads
+
+    def _journal_result(self, job: FalJob):
+        key = job.extra.get('journal_key')
+        if not self.journal or not key or job.extra.get('journal_skip'):
+            return
+        if job.ok:
+            self.journal.done(key, job)
+        elif job.error is not None:
+            self.journal.failed(key, job)
+
+    def run(self, jobs: list, on_result: Optional[Callable[[int, FalJob], Any]] = None) -> list:
+        """
+        Push jobs through the pipeline and return them in input order
+
+        on_result(index, job) is called from the calling thread, in input
+        order, as soon as each job and all jobs before it have finished.
+        """
+        uploads = queue.Queue(maxsize=self.queue_size)
+        submits = queue.Queue(maxsize=self.queue_size)
+        downloads = queue.Queue(maxsize=self.queue_size)
+        postprocesses = queue.Queue(maxsize=self.queue_size)
+        done = queue.Queue()
+        self.progress = fal_progress.ProgressTracker(len(jobs), self.fal_workers)
+        self.batch_deadline = time.time() + self.batch_timeout if self.batch_timeout else None
+
+        stages = [
+            self._start_stage(self.upload_workers, self._upload, uploads, submits, done),
+            self._start_stage(self.fal_workers, self._run_fal, submits, downloads, done),
+            self._start_stage(self.download_workers, self._download, downloads, postprocesses, done),
+            self._start_stage(self.postprocess_workers, self._postprocess, postprocesses, None, done),
+        ]
+
+        def feed():
+            for index, job in enumerate(jobs):
+                uploads.put((index, job))
+            uploads.put(_STOP)
+
+        threading.Thread(target=feed, daemon=True).start()
+
+        # Reorder buffer: emit results in input order as they become ready
+        finished = {}
+        next_index = 0
+        last_status = time.time()
+        while len(finished) < len(jobs):
+            try:
+                index, job = done.get(timeout=PROGRESS_INTERVAL)
+            except queue.Empty:
+                index = None
+            if len(jobs) > 1 and time.time() - last_status >= PROGRESS_INTERVAL:
+                log(self.progress.status_line())
+                last_status = time.time()
+            if index is None:
+                continue
+            finished[index] = job
+            self.progress.finish(job)
+            self._journal_result(job)
+            while next_index in finished:
+                if on_result:
+                    on_result(next_index, finished[next_index])
+                next_index += 1
+
+        # All jobs are accounted for; release the idle downstream workers
+        submits.put(_STOP)
+        downloads.put(_STOP)
+        postprocesses.put(_STOP)
+        for threads in stages:
+            for t in threads:
+                t.join()
+
+        self.progress.close()
+        if len(jobs) > 1:
+            log(self.progress.status_line())
+        return jobs
+
+
+def run_single(job: FalJob, **pipeline_options) -> FalJob:
+    """Run one job through the pipeline and return it"""
+    return FalPipeline(**pipeline_options).run([job])[0]
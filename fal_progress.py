@@ -0,0 +1,191 @@
+#!/usr/bin/env python3
+"""
+Batch progress, ETA and structured metrics for fal jobs
+
+FalPipeline reports every job's state changes here (uploading, queued at
+position N, running, downloading, finished). The tracker keeps live
+counts, estimates the time left from the rolling throughput of recent
+completions, and appends one JSON line per finished job (plus one per
+batch) with queue vs inference time, so concurrency can be sized against
+real queue behaviour.
+
+Records go to ~/.cache/vibe-coding/fal_metrics.jsonl next to the fal cache
+(override with FAL_METRICS_FILE; set it empty to disable).
+"""
+
+import json
+import os
+import threading
+import time
+import uuid
+from collections import deque
+from pathlib import Path
+from typing import Optional
+
+import fal_cache
+
+# Completions used for the rolling throughput estimate
+THROUGHPUT_WINDOW = 10
+
+STATES = ("uploading", "queued", "running", "downloading", "postprocessing")
+
+
+def metrics_path() -> Optional[Path]:
+    """JSONL file metrics are appended to, or None if disabled"""
+    override = os.getenv('FAL_METRICS_FILE')
+    if override is not None:
+        return Path(override) if override else None
+    return fal_cache.cache_path().parent / "fal_metrics.jsonl"
+
+
+def format_duration(seconds: float) -> str:
+    seconds = int(round(seconds))
+    if seconds < 60:
+        return f"{seconds}s"
+    if seconds < 3600:
+        return f"{seconds // 60}m{seconds % 60:02d}s"
+    return f"{seconds // 3600}h{seconds % 3600 // 60:02d}m"
+
+
+class ProgressTracker:
+    """
+    Thread-safe live view of one pipeline run
+
+    Args:
+        total: Number of jobs in the batch
+        concurrency: fal requests allowed in flight (recorded with metrics)
+        path: JSONL metrics file (default: metrics_path())
+    """
+
+    def __init__(self, total: int, concurrency: int = 1, path: Optional[Path] = None):
+        self.total = total
+        self.concurrency = concurrency
+        self.path = path if path is not None else metrics_path()
+        self.batch_id = uuid.uuid4().hex[:12]
+        self.started = time.time()
+        self.finished = 0
+        self.failed = 0
+        self.cancelled = 0
+        self.states = {}
+        self.completions = deque(maxlen=THROUGHPUT_WINDOW + 1)
+        self.queue_times = []
+        self.inference_times = []
+        self._lock = threading.Lock()
+
+    def update(self, job, state: str):
+        """Record that job moved to state (one of STATES)"""
+        with self._lock:
+            self.states[id(job)] = state
+
+    def finish(self, job):
+        """Record a finished (or failed) job and append its metrics record"""
+        now = time.time()
+        with self._lock:
+            self.states.pop(id(job), None)
+            self.finished += 1
+            if job.retryable:
+                self.cancelled += 1
+            elif job.error is not None:
+                self.failed += 1
+            elif not job.cached:
+                self.completions.append(now)
+            if 'queue' in job.timings:
+                self.queue_times.append(job.timings['queue'])
+            if 'inference' in job.timings:
+                self.inference_times.append(job.timings['inference'])
+        positions = job.extra.get('queue_positions') or []
+        self._write({
+            "type": "job",
+            "batch_id": self.batch_id,
+            "time": now,
+            "endpoint": job.endpoint,
+            "input": job.name,
+            "request_id": job.request_id,
+            "status": self._status(job),
+            "retryable": job.retryable,
+            "error": job.error,
+            "concurrency": self.concurrency,
+            "first_queue_position": positions[0] if positions else None,
+            "max_queue_position": max(positions) if positions else None,
+            **{f"{name}_seconds": round(value, 3) for name, value in job.timings.items()},
+        })
+
+    @staticmethod
+    def _status(job) -> str:
+        if job.retryable:
+            return "cancelled"
+        if job.error is not None:
+            return "error"
+        return f"cached_{job.cached}" if job.cached else "ok"
+
+    def counts(self) -> dict:
+        with self._lock:
+            counts = {state: 0 for state in STATES}
+            for state in self.states.values():
+                counts[state] += 1
+            return counts
+
+    def throughput(self) -> Optional[float]:
+        """Jobs per second over the last THROUGHPUT_WINDOW completions"""
+        with self._lock:
+            times = list(self.completions)
+        if not times:
+            return None
+        if len(times) > THROUGHPUT_WINDOW and times[-1] > times[0]:
+            return (len(times) - 1) / (times[-1] - times[0])
+        # Until the window fills, average over the whole batch so far
+        return len(times) / max(times[-1] - self.started, 1e-6)
+
+    def eta(self) -> Optional[float]:
+        """Seconds until the batch is done, from the rolling throughput"""
+        rate = self.throughput()
+        if not rate:
+            return None
+        return (self.total - self.finished) / rate
+
+    def status_line(self) -> str:
+        counts = self.counts()
+        eta = self.eta()
+        rate = self.throughput()
+        parts = [f"{self.finished}/{self.total} done"]
+        if self.failed:
+            parts.append(f"{self.failed} failed")
+        if self.cancelled:
+            parts.append(f"{self.cancelled} cancelled")
+        parts.append(f"{counts['queued']} queued")
+        parts.append(f"{counts['running']} running")
+        if rate:
+            parts.append(f"{rate * 60:.1f}/min")
+        parts.append(f"ETA {format_duration(eta)}" if eta is not None else "ETA estimating...")
+        return "Batch: " + ", ".join(parts)
+
+    def close(self):
+        """Append the batch summary record"""
+        elapsed = time.time() - self.started
+
+        def mean(values):
+            return round(sum(values) / len(values), 3) if values else None
+
+        self._write({
+            "type": "batch",
+            "batch_id": self.batch_id,
+            "time": time.time(),
+            "jobs": self.total,
+            "failed": self.failed,
+            "cancelled": self.cancelled,
+            "concurrency": self.concurrency,
+            "wall_seconds": round(elapsed, 3),
+            "jobs_per_minute": round(self.finished / elapsed * 60, 3) if elapsed > 0 else None,
+            "mean_queue_seconds": mean(self.queue_times),
+            "mean_inference_seconds": mean(self.inference_times),
+        })
+
+    def _write(self, record: dict):
+        if self.path is None:
+            return
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            with self._lock, open(self.path, 'a') as f:
+                f.write(json.dumps(record) + "\n")
+        except OSError:
+            pass  # metrics are best-effort; never fail a batch over them
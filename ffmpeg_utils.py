@@ -0,0 +1,223 @@
+#!/usr/bin/env python3
+"""
+Thin ffmpeg/ffprobe helpers for the video scripts
+Probing, keyframe-aligned stream-copy splitting and lossless concatenation
+
+Everything here shells out to the ffmpeg and ffprobe binaries (brew install
+ffmpeg). Splits and joins use stream copy, so no generation loss is added
+and they run at disk speed.
+"""
+
+import json
+import shutil
+import subprocess
+from pathlib import Path
+from typing import List, Optional
+
+
+class FFmpegError(RuntimeError):
+    """ffmpeg/ffprobe is missing or a command failed"""
+
+
+class FFmpegInterrupted(FFmpegError):
+    """ffmpeg was stopped by a signal (e.g. Ctrl+C), not by a problem with its input"""
+
+
+def killed_by_signal(returncode: int) -> bool:
+    """True for a process killed by a signal, or ffmpeg's exit code after handling SIGINT/SIGTERM"""
+    return returncode < 0 or returncode == 255
+
+
+def require_ffmpeg():
+    """Raise FFmpegError unless both ffmpeg and ffprobe are on PATH"""
+    missing = [tool for tool in ("ffmpeg", "ffprobe") if shutil.which(tool) is None]
+    if missing:
+        raise FFmpegError(f"{' and '.join(missing)} not found (install with: brew install ffmpeg)")
+
+
+def run_ffmpeg(args: List[str]):
+    """Run ffmpeg quietly, overwriting outputs; raises FFmpegError with its stderr"""
+    cmd = ["ffmpeg", "-hide_banner", "-nostdin", "-loglevel", "error", "-y"] + [str(a) for a in args]
+    result = subprocess.run(cmd, capture_output=True, text=True)
+    if killed_by_signal(result.returncode):
+        raise FFmpegInterrupted("ffmpeg was interrupted")
+    if result.returncode != 0:
+        raise FFmpegError(f"ffmpeg failed: {result.stderr.strip()[-2000:]}")
+
+
+def ffprobe_json(path, *args) -> dict:
+    """Run ffprobe with JSON output"""
+    cmd = ["ffprobe", "-v", "error", "-of", "json"] + list(args) + [str(path)]
+    result = subprocess.run(cmd, capture_output=True, text=True)
+    if result.returncode != 0:
+        raise FFmpegError(f"ffprobe failed on {path}: {result.stderr.strip()}")
+    return json.loads(result.stdout or "{}")
+
+
+def _rate(value: Optional[str]) -> float:
+    """'30000/1001' -> 29.97"""
+    if not value or value == "0/0":
+        return 0.0
+    num, _, den = value.partition("/")
+    return float(num) / float(den or 1)
+
+
+def probe_video(path) -> dict:
+    """
+    Basic facts about the first video stream
+
+    Returns:
+        dict with width, height, coded_width, coded_height, codec,
+        pix_fmt, field_order, fps, duration (seconds) and has_audio
+    """
+    info = ffprobe_json(path, "-show_entries",
+                        "format=duration:stream=index,codec_type,codec_name,width,height,coded_width,"
+                        "coded_height,pix_fmt,field_order,avg_frame_rate,r_frame_rate")
+    streams = info.get("streams", [])
+    video = next((s for s in streams if s.get("codec_type") == "video"), None)
+    if video is None:
+        raise FFmpegError(f"No video stream in {path}")
+    return {
+        "width": video.get("width"),
+        "height": video.get("height"),
+        "coded_width": video.get("coded_width"),
+        "coded_height": video.get("coded_height"),
+        "codec": video.get("codec_name"),
+        "pix_fmt": video.get("pix_fmt"),
+        "field_order": video.get("field_order"),
+        "fps": _rate(video.get("avg_frame_rate")) or _rate(video.get("r_frame_rate")),
+        "duration": float(info.get("format", {}).get("duration") or 0.0),
+        "has_audio": any(s.get("codec_type") == "audio" for s in streams),
+    }
+
+
+def video_packets(path) -> List[dict]:
+    """Video packets (pts_time, dts_time, flags) read from the container, no decoding"""
+    info = ffprobe_json(path, "-select_streams", "v:0", "-show_entries",
+                        "packet=pts_time,dts_time,flags")
+    return info.get("packets", [])
+
+
+def keyframe_times(path) -> List[float]:
+    """Presentation times of the video keyframes"""
+    return sorted(float(p["pts_time"]) for p in video_packets(path)
+                  if "K" in p.get("flags", "") and p.get("pts_time") not in (None, "N/A"))
+
+
+def count_frames(path) -> int:
+    """Number of video frames (one packet per frame for the codecs we handle)"""
+    return len(video_packets(path))
+
+
+def check_timestamps(path) -> int:
+    """
+    Verify that video decode timestamps strictly increase
+
+    Returns the frame count; raises FFmpegError on a duplicate or
+    backwards timestamp (the usual symptom of a bad join).
+    """
+    packets = video_packets(path)
+    previous = None
+    for number, packet in enumerate(packets):
+        dts = packet.get("dts_time")
+        if dts in (None, "N/A"):
+            continue
+        dts = float(dts)
+        if previous is not None and dts <= previous:
+            raise FFmpegError(f"Non-monotonic timestamp at frame {number} of {path}: "
+                              f"{dts:.6f} after {previous:.6f}")
+        previous = dts
+    return len(packets)
+
+
+def split_at_keyframes(input_path, output_dir, segment_seconds: float, audio: bool = False) -> List[str]:
+    """
+    Split a video into roughly segment_seconds pieces with stream copy
+
+    Cuts land on the first keyframe at or after each boundary, so every
+    segment starts with a keyframe and decodes on its own. Timestamps are
+    reset per segment. Audio is dropped unless audio=True (it is muxed back
+    from the source after a join, which avoids priming gaps at the seams).
+
+    Returns:
+        Segment paths in playback order
+    """
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    pattern = output_dir / f"{Path(input_path).stem}_seg%04d.mp4"
+    args = ["-i", input_path, "-map", "0:v:0"]
+    if audio:
+        args += ["-map", "0:a?"]
+    else:
+        args += ["-an"]
+    args += ["-c", "copy", "-f", "segment", "-segment_time", f"{segment_seconds:.3f}",
+             "-reset_timestamps", "1", "-segment_format", "mp4", pattern]
+    run_ffmpeg(args)
+    return sorted(str(p) for p in output_dir.glob(f"{Path(input_path).stem}_seg*.mp4"))
+
+
+def concat_copy(segment_paths: List[str], output_path, audio_from=None):
+    """
+    Join segments with the concat demuxer (no re-encode)
+
+    All segments must share codec parameters. If audio_from is given, its
+    audio track (if any) is copied into the output alongside the joined
+    video.
+    """
+    output_path = Path(output_path)
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    list_path = output_path.with_name(output_path.name + ".concat.txt")
+    temp_path = output_path.with_name(output_path.stem + ".part" + output_path.suffix)
+
+    with open(list_path, "w") as f:
+        for segment in segment_paths:
+            escaped = str(Path(segment).resolve()).replace("'", "'\\''")
+            f.write(f"file '{escaped}'\n")
+
+    args = ["-f", "concat", "-safe", "0", "-i", list_path]
+    if audio_from:
+        args += ["-i", audio_from, "-map", "0:v:0", "-map", "1:a?"]
+    args += ["-c", "copy", "-movflags", "+faststart", temp_path]
+    try:
+        run_ffmpeg(args)
+        temp_path.replace(output_path)
+    finally:
+        list_path.unlink(missing_ok=True)
+        temp_path.unlink(missing_ok=True)
+
+
+def extract_frame(input_path, time_seconds: float, output_path):
+    """Write the frame at time_seconds as a full-resolution PNG"""
+    Path(output_path).parent.mkdir(parents=True, exist_ok=True)
+    run_ffmpeg(["-ss", f"{time_seconds:.3f}", "-i", input_path, "-frames:v", "1",
+                "-update", "1", output_path])
+
+
+def encode_clip(input_path, start: float, duration: float, output_path, crf: int = 12):
+    """
+    Cut [start, start + duration) frame-accurately as a near-lossless H.264 clip
+
+    Stream copy can only cut on keyframes, which screen recordings have
+    few of, so the clip is re-encoded (video only) at a low CRF.
+    """
+    Path(output_path).parent.mkdir(parents=True, exist_ok=True)
+    run_ffmpeg(["-ss", f"{start:.3f}", "-i", input_path, "-t", f"{duration:.3f}", "-an",
+                "-c:v", "libx264", "-preset", "veryfast", "-crf", str(crf),
+                "-pix_fmt", "yuv420p", output_path])
+
+
+# 1920x1088 screen recordings -> 1920x1080 (4 rows off top and bottom)
+CROP_1080P = "1920:1080:0:4"
+
+
+def crop_video(input_path, output_path, crop: str = CROP_1080P, preset: str = "medium", crf: int = 18):
+    """Crop and re-encode the video (audio copied), writing atomically via a .part file"""
+    output_path = Path(output_path)
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    temp_path = output_path.with_name(output_path.stem + ".part" + output_path.suffix)
+    try:
+        run_ffmpeg(["-i", input_path, "-vf", f"crop={crop}", "-c:v", "libx264",
+                    "-preset", preset, "-crf", str(crf), "-c:a", "copy", temp_path])
+        temp_path.replace(output_path)
+    finally:
+        temp_path.unlink(missing_ok=True)
@@ -0,0 +1,254 @@
+#!/usr/bin/env python3
+"""
+Fused crop -> upload: stream ffmpeg's output straight into a fal multipart upload
+
+The two-step flow writes *_1080p.mp4 to disk and then reads it back to
+upload it. Here ffmpeg writes fragmented MP4 (moov up front, then
+self-contained fragments) to a pipe, and fixed-size parts are PUT to fal
+storage as soon as they fill, a few in flight at a time. The cropped bytes
+never touch the disk, and the upload runs while ffmpeg is still working.
+
+The crop is the same as crop_1080p.py: the lossless SPS crop window when
+the bitstream allows it (stream copied through a Matroska pipe into a
+second ffmpeg, so the MP4 headers pick up the cropped size), otherwise a
+single libx264 re-encode. Chunked encoding can't stream in order, so fused
+re-encodes use one ffmpeg process.
+
+Memory is bounded to (UPLOAD_CONCURRENCY + 1) parts. Uploads are cached
+like upload_file's, keyed on the source file's content plus the crop
+settings, so re-running skips both the crop and the upload.
+
+Streaming needs fal_client's private multipart-upload internals, which
+only FalMultipart touches. With a fal_client outside FAL_CLIENT_VERSIONS,
+or one that can't stream for any other reason (e.g. no FAL_KEY yet), the
+recording is cropped to a temporary file and uploaded with upload_file.
+"""
+
+import hashlib
+import os
+import subprocess
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import List, Tuple
+
+import fal_cache
+from crop_1080p import bitstream_filter, crop_to_1080p, parse_crop
+from ffmpeg_utils import CROP_1080P, FFmpegError, probe_video
+
+try:
+    import fal_client
+except ImportError:
+    print("Installing fal_client...")
+    os.system("pip install fal-client")
+    import fal_client
+
+# Multipart part size (fal's own multipart uploads use 10 MB parts)
+PART_SIZE = 10 * 1024 * 1024
+
+# Parts being PUT at once
+UPLOAD_CONCURRENCY = 4
+
+# fal_client releases (from, up to) whose private multipart API FalMultipart uses
+FAL_CLIENT_VERSIONS = ((1, 0), (2, 0))
+
+FRAGMENTED_MP4 = ["-movflags", "frag_keyframe+empty_moov+default_base_moof", "-f", "mp4", "pipe:1"]
+
+
+class FalMultipart:
+    """
+    One fal storage multipart upload
+
+    The only code that touches fal_client's private API: the sync client's
+    CDN client and token manager, client.MultipartUpload and
+    client._normalize_upload_lifecycle. Check supported() first.
+    """
+
+    def __init__(self, file_name: str, content_type: str, part_size: int, concurrency: int):
+        sync_client = fal_client.sync_client
+        self._upload = fal_client.client.MultipartUpload(
+            file_name=file_name,
+            client=sync_client._get_cdn_client(),
+            token_manager=sync_client._token_manager,
+            chunk_size=part_size,
+            content_type=content_type,
+            max_concurrency=concurrency,
+        )
+        self._upload.create(object_lifecycle_preference=self._lifecycle())
+
+    @staticmethod
+    def supported() -> bool:
+        """True if this fal_client is a release we know the internals of, with credentials set"""
+        try:
+            version = tuple(fal_client.version_tuple[:2])
+            if not FAL_CLIENT_VERSIONS[0] <= version < FAL_CLIENT_VERSIONS[1]:
+                return False
+            # A cached_property that raises MissingCredentialsError without FAL_KEY
+            fal_client.sync_client._token_manager
+            return (callable(getattr(fal_client.sync_client, "_get_cdn_client", None))
+                    and callable(getattr(fal_client.client, "MultipartUpload", None)))
+        except Exception:
+            return False
+
+    @staticmethod
+    def _lifecycle():
+        """fal storage lifecycle matching the upload cache TTL, if this fal_client supports it"""
+        normalize = getattr(fal_client.client, "_normalize_upload_lifecycle", None)
+        if normalize is None or not hasattr(fal_client, "StorageSettings"):
+            return None
+        return normalize(fal_client.StorageSettings(expires_in=fal_cache.UPLOAD_TTL_SECONDS))
+
+    def upload_part(self, part_number: int, data: bytes):
+        self._upload.upload_part(part_number, data)
+
+    def complete(self) -> str:
+        return self._upload.complete()
+
+
+def streaming_supported() -> bool:
+    """True if crops can be streamed into fal storage (else they go through a temp file)"""
+    return FalMultipart.supported()
+
+
+def crop_commands(input_path, crop: str = CROP_1080P, reencode: bool = False, preset: str = "medium",
+                  crf: int = 18) -> List[List[str]]:
+    """
+    ffmpeg command(s) that write the cropped video as fragmented MP4 to stdout
+
+    Two commands are a pipeline (the first feeds the second's stdin).
+    """
+    base = ["ffmpeg", "-hide_banner", "-nostdin", "-loglevel", "error"]
+    streams = ["-map", "0:v:0", "-map", "0:a?"]
+    if not reencode:
+        bsf, reason = bitstream_filter(probe_video(input_path), parse_crop(crop))
+        if bsf:
+            return [
+                base + ["-i", str(input_path)] + streams + ["-c", "copy", "-bsf:v", bsf, "-f", "matroska", "pipe:1"],
+                base + ["-f", "matroska", "-i", "pipe:0", "-map", "0", "-c", "copy"] + FRAGMENTED_MP4,
+            ]
+        print(f"⚠ Can't crop losslessly: {reason}; re-encoding")
+    return [base + ["-i", str(input_path)] + streams + ["-vf", f"crop={crop}", "-c:v", "libx264",
+                                                         "-preset", preset, "-crf", str(crf), "-c:a", "copy"]
+            + FRAGMENTED_MP4]
+
+
+def stream_upload(stream, file_name: str, content_type: str = "video/mp4", part_size: int = PART_SIZE,
+                  concurrency: int = UPLOAD_CONCURRENCY) -> Tuple[str, int]:
+    """
+    Upload everything read from stream as one fal file
+
+    Parts are read in order and PUT concurrently; reading blocks once
+    `concurrency` parts are in flight, which also back-pressures ffmpeg.
+
+    Returns:
+        (access URL, bytes uploaded); (None, 0) if stream was empty
+    """
+    multipart = FalMultipart(file_name, content_type, part_size, concurrency)
+
+    slots = threading.Semaphore(concurrency)
+    futures = []
+    size = 0
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        part_number = 0
+        while True:
+            data = stream.read(part_size)
+            if not data:
+                break
+            part_number += 1
+            size += len(data)
+            slots.acquire()
+            future = executor.submit(multipart.upload_part, part_number, data)
+            future.add_done_callback(lambda _: slots.release())
+            futures.append(future)
+            # Surface a failed part now rather than after streaming everything
+            for done in [f for f in futures if f.done()]:
+                done.result()
+        for future in futures:
+            future.result()
+    if size == 0:
+        return None, 0  # nothing to complete; the caller reports why
+    return multipart.complete(), size
+
+
+def crop_then_upload(input_path: Path, crop: str, reencode: bool, preset: str, crf: int) -> Tuple[str, int]:
+    """Crop to a temporary file and upload that; for fal_clients that can't stream"""
+    from fal_jobs import upload_file
+
+    with tempfile.TemporaryDirectory(prefix="fused_crop_") as temp_dir:
+        output_path = Path(temp_dir) / f"{input_path.stem}_1080p.mp4"
+        crop_to_1080p(input_path, output_path, crop, reencode, preset=preset, crf=crf)
+        # Cached by the caller under the source's key, not the temp file's
+        return upload_file(str(output_path), use_cache=False), output_path.stat().st_size
+
+
+def stream_crop(input_path: Path, crop: str, reencode: bool, preset: str, crf: int) -> Tuple[str, int]:
+    """Crop through ffmpeg pipes straight into a multipart upload"""
+    commands = crop_commands(input_path, crop, reencode, preset, crf)
+    processes = []
+    # stderr goes to files: an unread pipe that fills up would stall ffmpeg mid-stream
+    logs = [tempfile.TemporaryFile() for _ in commands]
+    try:
+        stdin = None
+        for command, stderr in zip(commands, logs):
+            process = subprocess.Popen(command, stdin=stdin, stdout=subprocess.PIPE, stderr=stderr)
+            if stdin is not None:
+                stdin.close()  # the next process owns the read end now
+            stdin = process.stdout
+            processes.append(process)
+        url, size = stream_upload(processes[-1].stdout, f"{input_path.stem}_1080p.mp4")
+    except BaseException:
+        for process in processes:
+            process.kill()
+        for stderr in logs:
+            stderr.close()
+        raise
+    finally:
+        for process in processes:
+            process.wait()
+
+    errors = []
+    for process, stderr in zip(processes, logs):
+        if process.returncode != 0:
+            stderr.seek(0)
+            errors.append(stderr.read().decode(errors="replace").strip())
+    for stderr in logs:
+        stderr.close()
+    if errors:
+        raise FFmpegError(f"ffmpeg failed: {' / '.join(errors)[-2000:]}")
+    if url is None:
+        raise FFmpegError(f"ffmpeg produced no output for {input_path.name}")
+    return url, size
+
+
+def crop_and_upload(input_path, crop: str = CROP_1080P, reencode: bool = False, preset: str = "medium",
+                    crf: int = 18, use_cache: bool = True) -> str:
+    """
+    Crop a recording and upload the result, without writing it to disk
+    where fal_client allows (see FalMultipart)
+
+    Returns:
+        fal URL of the cropped MP4
+    """
+    input_path = Path(input_path)
+    cache_key = None
+    if use_cache:
+        settings = f"fused-crop:{crop}:{'reencode' if reencode else 'auto'}:{preset}:{crf}"
+        cache_key = hashlib.sha256(f"{fal_cache.file_sha256(str(input_path))}\0{settings}".encode()).hexdigest()
+        url = fal_cache.lookup_upload(cache_key)
+        if url:
+            return url
+
+    start = time.time()
+    if streaming_supported():
+        url, size = stream_crop(input_path, crop, reencode, preset, crf)
+        how = "streamed"
+    else:
+        url, size = crop_then_upload(input_path, crop, reencode, preset, crf)
+        how = "uploaded"
+    elapsed = time.time() - start
+    print(f"✓ Cropped and {how} {size / 1e6:.1f} MB in {elapsed:.1f}s ({size / 1e6 / max(elapsed, 1e-6):.1f} MB/s)")
+    if cache_key:
+        fal_cache.record_upload(cache_key, url, size)
+    return url
@@ -0,0 +1,249 @@
+#!/usr/bin/env python3
+"""
+In-process, parallel downloads from Google Cloud Storage
+
+Replaces forking `gsutil cp` per clip and `gsutil -m cp -r` per sync.
+One storage client (and its connection pool) is shared by every download,
+and objects of PARALLEL_THRESHOLD or more are fetched as byte ranges
+written in place into a .part file, all ranges of all objects going
+through one thread pool. Each finished file is checked against the object's CRC32C
+before it replaces the local copy.
+
+An object is skipped when the local file already has the same size and
+CRC32C. Sync keeps the CRC32C of files it has checked in .gcs_sync.json
+(keyed on size and mtime), so repeating a sync lists the prefix, stats
+the files and downloads nothing.
+
+Set STORAGE_EMULATOR_HOST (e.g. http://localhost:9023) to run against a
+local GCS emulator; the client then needs no credentials.
+
+Usage:
+  python gcs_download.py gs://bucket/prefix <local_dir> [--workers N]
+"""
+
+import argparse
+import base64
+import json
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Optional, Tuple
+
+try:
+    from google.cloud import storage
+    import google_crc32c
+except ImportError:
+    print("Installing google-cloud-storage...")
+    os.system("pip install google-cloud-storage")
+    from google.cloud import storage
+    import google_crc32c
+
+CHUNK_SIZE = 1024 * 1024
+
+# Objects at least this big are fetched with parallel range reads
+PARALLEL_THRESHOLD = 64 * 1024 * 1024
+PARALLEL_PART_SIZE = 32 * 1024 * 1024
+
+# Range reads in flight at once (across all objects)
+DOWNLOAD_WORKERS = 8
+
+MEMO_NAME = ".gcs_sync.json"
+
+_client = None
+_client_lock = threading.Lock()
+
+
+class DownloadError(Exception):
+    """Download failed or produced a file that doesn't match the object's metadata"""
+
+
+def get_client():
+    """The shared storage client (emulator-aware through STORAGE_EMULATOR_HOST)"""
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = storage.Client(project=os.getenv('GOOGLE_CLOUD_PROJECT'))
+        return _client
+
+
+def parse_gs_uri(uri: str) -> Tuple[str, str]:
+    """'gs://bucket/path/to/object' -> ('bucket', 'path/to/object')"""
+    if not uri.startswith("gs://"):
+        raise ValueError(f"Not a gs:// URI: {uri}")
+    bucket, _, name = uri[len("gs://"):].partition("/")
+    return bucket, name
+
+
+def file_crc32c(path) -> str:
+    """CRC32C of a file, base64-encoded the way GCS reports it"""
+    checksum = google_crc32c.Checksum()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), b''):
+            checksum.update(chunk)
+    return base64.b64encode(checksum.digest()).decode()
+
+
+def _download_slice(blob, temp_path: Path, start: int, end: int):
+    with open(temp_path, 'r+b') as f:
+        f.seek(start)
+        # Whole-file CRC32C is checked once all ranges are in
+        blob.download_to_file(f, start=start, end=end, raw_download=True, checksum=None)
+
+
+def _finish(blob, temp_path: Path, local_path: Path) -> str:
+    """Verify a downloaded .part file and move it into place; returns its CRC32C"""
+    size = temp_path.stat().st_size
+    if size != blob.size:
+        raise DownloadError(f"got {size} bytes, expected {blob.size}")
+    crc = file_crc32c(temp_path)
+    if blob.crc32c and crc != blob.crc32c:
+        raise DownloadError(f"CRC32C mismatch ({crc} != {blob.crc32c})")
+    temp_path.replace(local_path)
+    return crc
+
+
+def download_blobs(pairs, workers: int = DOWNLOAD_WORKERS, part_size: int = PARALLEL_PART_SIZE,
+                   threshold: int = PARALLEL_THRESHOLD) -> dict:
+    """
+    Download (blob, local_path) pairs through one pool of range reads
+
+    Returns:
+        {local_path: CRC32C, or None if that object failed}
+    """
+    results = {}
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        slices = {}
+        for blob, local_path in pairs:
+            local_path = Path(local_path)
+            local_path.parent.mkdir(parents=True, exist_ok=True)
+            temp_path = local_path.with_name(local_path.name + ".part")
+            with open(temp_path, 'wb') as f:
+                f.truncate(blob.size)
+            step = part_size if blob.size >= threshold else max(blob.size, 1)
+            ranges = [(start, min(start + step, blob.size) - 1) for start in range(0, blob.size, step)]
+            slices[local_path] = (blob, temp_path, [pool.submit(_download_slice, blob, temp_path, start, end)
+                                                    for start, end in ranges])
+
+        for local_path, (blob, temp_path, futures) in slices.items():
+            try:
+                for future in futures:
+                    future.result()
+                results[local_path] = _finish(blob, temp_path, local_path)
+            except Exception as e:
+                print(f"   ❌ {blob.name}: {e}")
+                results[local_path] = None
+            finally:
+                temp_path.unlink(missing_ok=True)
+    return results
+
+
+def download(uri: str, local_path, workers: int = DOWNLOAD_WORKERS) -> bool:
+    """
+    Download one gs:// object, unless local_path already matches it
+
+    Raises on failure; returns False if the local file was already current.
+    """
+    bucket, name = parse_gs_uri(uri)
+    blob = get_client().bucket(bucket).get_blob(name)
+    if blob is None:
+        raise DownloadError(f"{uri} does not exist")
+    local_path = Path(local_path)
+    if local_path.exists() and local_path.stat().st_size == blob.size and file_crc32c(local_path) == blob.crc32c:
+        return False
+    if download_blobs([(blob, local_path)], workers)[local_path] is None:
+        raise DownloadError(f"Download failed: {uri}")
+    return True
+
+
+def _load_memo(path: Path) -> dict:
+    try:
+        return json.loads(path.read_text())
+    except (OSError, ValueError):
+        return {}
+
+
+def _local_crc(memo: dict, name: str, path: Path) -> Optional[str]:
+    """CRC32C of a local file, reusing the memo while size and mtime are unchanged"""
+    stat = path.stat()
+    cached = memo.get(name)
+    if cached and cached[:2] == [stat.st_size, stat.st_mtime_ns]:
+        return cached[2]
+    crc = file_crc32c(path)
+    memo[name] = [stat.st_size, stat.st_mtime_ns, crc]
+    return crc
+
+
+def sync(uri: str, local_dir, workers: int = DOWNLOAD_WORKERS, part_size: int = PARALLEL_PART_SIZE,
+         threshold: int = PARALLEL_THRESHOLD) -> dict:
+    """
+    Mirror every object under a gs:// prefix into local_dir
+
+    Returns:
+        {"downloaded": n, "current": n, "failed": n, "bytes": n}
+    """
+    bucket, prefix = parse_gs_uri(uri.rstrip("/"))
+    prefix = f"{prefix}/" if prefix else ""
+    local_dir = Path(local_dir)
+    local_dir.mkdir(parents=True, exist_ok=True)
+    memo_path = local_dir / MEMO_NAME
+    memo = _load_memo(memo_path)
+
+    todo = []
+    current = 0
+    for blob in get_client().list_blobs(bucket, prefix=prefix):
+        name = blob.name[len(prefix):]
+        if not name or name.endswith("/"):
+            continue  # folder placeholder
+        local_path = local_dir / name
+        if (local_path.is_file() and local_path.stat().st_size == blob.size
+                and _local_crc(memo, name, local_path) == blob.crc32c):
+            current += 1
+            continue
+        todo.append((blob, local_path))
+
+    start = time.time()
+    results = download_blobs(todo, workers, part_size, threshold) if todo else {}
+    elapsed = time.time() - start
+    size = 0
+    for blob, local_path in todo:
+        if results.get(local_path):
+            name = blob.name[len(prefix):]
+            stat = local_path.stat()
+            memo[name] = [stat.st_size, stat.st_mtime_ns, results[local_path]]
+            size += stat.st_size
+            print(f"   📁 {name}")
+
+    temp_memo = memo_path.with_name(memo_path.name + ".part")
+    temp_memo.write_text(json.dumps(memo))
+    temp_memo.replace(memo_path)
+
+    failed = sum(1 for crc in results.values() if crc is None)
+    downloaded = len(todo) - failed
+    if downloaded:
+        print(f"   📥 {downloaded} downloaded ({size / 1e6:.1f} MB in {elapsed:.1f}s, "
+              f"{size / 1e6 / max(elapsed, 1e-6):.1f} MB/s), {current} already current")
+    else:
+        print(f"   ✅ {current} already current, nothing to download")
+    return {"downloaded": downloaded, "current": current, "failed": failed, "bytes": size}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Download a gs:// prefix (skips files that already match)")
+    parser.add_argument("uri", help="gs://bucket/prefix")
+    parser.add_argument("local_dir", help="Folder to download into")
+    parser.add_argument("--workers", type=int, default=DOWNLOAD_WORKERS,
+                        help=f"Range reads in flight (default: {DOWNLOAD_WORKERS})")
+    args = parser.parse_args()
+
+    print(f"\n📥 Syncing {args.uri} to {args.local_dir}")
+    stats = sync(args.uri, args.local_dir, args.workers)
+    if stats["failed"]:
+        print(f"❌ {stats['failed']} object(s) failed")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,332 @@
+#!/usr/bin/env python3
+"""
+In-process HTTP downloader for Fal.ai results
+Replaces one curl process per file with a shared keep-alive connection pool
+
+- Streams to <output>.part and renames into place only when complete,
+  so a half-written file never looks like a finished result
+- Resumes an interrupted .part file with a Range request (If-Range guards
+  against the remote file having changed)
+- Splits large files (multi-GB 4K videos) into parallel range requests;
+  finished chunks are tracked so a restart only fetches the missing ones
+- Verifies length, and the MD5 from x-goog-hash / Content-MD5 when the
+  server sends one; always reports a SHA-256 of the final file
+- Reports bytes and bytes/s per download, plus running totals
+
+Uses httpx, which is installed with fal-client.
+"""
+
+import base64
+import hashlib
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable, Optional
+
+import httpx
+
+CHUNK_SIZE = 1024 * 1024
+
+# Files at least this big are fetched with parallel range requests
+PARALLEL_THRESHOLD = 64 * 1024 * 1024
+PARALLEL_PART_SIZE = 32 * 1024 * 1024
+PARALLEL_CONNECTIONS = 4
+
+MAX_ATTEMPTS = 3
+
+_client = None
+_client_lock = threading.Lock()
+_stats_lock = threading.Lock()
+_stats = {"files": 0, "bytes": 0, "seconds": 0.0}
+
+
+class DownloadError(Exception):
+    """Download failed or produced a file that doesn't match the server's metadata"""
+
+    def __init__(self, message: str, status: Optional[int] = None):
+        super().__init__(message)
+        self.status = status
+
+    @property
+    def permanent(self) -> bool:
+        """A 4xx that retrying won't change (anything but 408 timeout and 429 rate limit)"""
+        return self.status is not None and 400 <= self.status < 500 and self.status not in (408, 429)
+
+
+@dataclass
+class DownloadResult:
+    path: str
+    size: int
+    seconds: float
+    sha256: str
+    resumed_bytes: int = 0
+    parallel: bool = False
+
+    @property
+    def bytes_per_second(self) -> float:
+        return self.size / self.seconds if self.seconds > 0 else 0.0
+
+
+def get_client() -> httpx.Client:
+    """Shared pooled client; httpx.Client is safe to use from many threads"""
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = httpx.Client(
+                follow_redirects=True,
+                # Lengths and checksums must describe the bytes we write
+                headers={"Accept-Encoding": "identity"},
+                timeout=httpx.Timeout(60.0, connect=15.0),
+                limits=httpx.Limits(max_connections=32, max_keepalive_connections=16),
+            )
+        return _client
+
+
+def stats() -> dict:
+    """Totals across every download in this process"""
+    with _stats_lock:
+        totals = dict(_stats)
+    totals["bytes_per_second"] = totals["bytes"] / totals["seconds"] if totals["seconds"] else 0.0
+    return totals
+
+
+def format_rate(bytes_per_second: float) -> str:
+    return f"{bytes_per_second / (1024 * 1024):.1f} MB/s"
+
+
+def _expected_md5(headers) -> Optional[bytes]:
+    """MD5 digest advertised by the server (GCS x-goog-hash or Content-MD5)"""
+    for part in headers.get('x-goog-hash', '').split(','):
+        part = part.strip()
+        if part.startswith('md5='):
+            return base64.b64decode(part[4:])
+    if 'content-md5' in headers:
+        return base64.b64decode(headers['content-md5'])
+    return None
+
+
+def _file_digests(path: Path):
+    sha256, md5 = hashlib.sha256(), hashlib.md5()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), b''):
+            sha256.update(chunk)
+            md5.update(chunk)
+    return sha256.hexdigest(), md5.digest()
+
+
+def _state_path(part_path: Path) -> Path:
+    return part_path.with_name(part_path.name + '.json')
+
+
+def _load_state(part_path: Path) -> dict:
+    try:
+        return json.loads(_state_path(part_path).read_text())
+    except (OSError, ValueError):
+        return {}
+
+
+def _save_state(part_path: Path, state: dict):
+    _state_path(part_path).write_text(json.dumps(state))
+
+
+def _probe(client: httpx.Client, url: str):
+    """HEAD the URL for size, range support and validators"""
+    response = client.head(url)
+    if response.status_code >= 400:
+        return None
+    size = response.headers.get('content-length')
+    return {
+        "size": int(size) if size and size.isdigit() else None,
+        "ranges": response.headers.get('accept-ranges', '').lower() == 'bytes',
+        "validator": response.headers.get('etag') or response.headers.get('last-modified'),
+        "headers": response.headers,
+    }
+
+
+def _stream(client, url, part_path: Path, validator: Optional[str], on_data=None) -> int:
+    """Single-connection download into part_path, resuming if possible; returns resumed bytes"""
+    offset = part_path.stat().st_size if part_path.exists() else 0
+    state = _load_state(part_path)
+    headers = {}
+    if offset and validator and state.get("validator") == validator:
+        headers["Range"] = f"bytes={offset}-"
+        headers["If-Range"] = validator
+    else:
+        offset = 0
+    _save_state(part_path, {"validator": validator})
+
+    with client.stream('GET', url, headers=headers) as response:
+        if response.status_code == 416 and offset:
+            # The part file no longer fits the remote file; start over next attempt
+            part_path.unlink(missing_ok=True)
+            raise DownloadError(f"HTTP 416 resuming {url}")
+        if response.status_code >= 400:
+            raise DownloadError(f"HTTP {response.status_code} for {url}", response.status_code)
+        if offset and response.status_code != 206:
+            offset = 0  # server ignored the range (or file changed); start over
+        position = offset
+        with open(part_path, 'ab' if offset else 'wb') as f:
+            for chunk in response.iter_bytes(CHUNK_SIZE):
+                f.write(chunk)
+                if on_data:
+                    on_data(chunk, position)
+                position += len(chunk)
+    return offset
+
+
+def _parallel(client, url, part_path: Path, size: int, validator: Optional[str],
+              connections: int, on_data=None) -> int:
+    """Range-split download into a preallocated part file; returns bytes already present"""
+    state = _load_state(part_path)
+    if state.get("validator") != validator or state.get("size") != size or not part_path.exists():
+        state = {"validator": validator, "size": size, "done": []}
+        with open(part_path, 'wb') as f:
+            f.truncate(size)
+    done = set(state["done"])
+    ranges = [
+        (index, start, min(start + PARALLEL_PART_SIZE, size) - 1)
+        for index, start in enumerate(range(0, size, PARALLEL_PART_SIZE))
+    ]
+    resumed = sum(end - start + 1 for index, start, end in ranges if index in done)
+    state_lock = threading.Lock()
+
+    def fetch(index, start, end):
+        headers = {"Range": f"bytes={start}-{end}"}
+        if validator:
+            headers["If-Range"] = validator
+        fd = os.open(part_path, os.O_WRONLY)
+        try:
+            with client.stream('GET', url, headers=headers) as response:
+                if response.status_code != 206:
+                    status = response.status_code if response.status_code >= 400 else None
+                    raise DownloadError(f"Range request returned HTTP {response.status_code}", status)
+                position = start
+                for chunk in response.iter_bytes(CHUNK_SIZE):
+                    os.pwrite(fd, chunk, position)
+                    if on_data:
+                        on_data(chunk, position)
+                    position += len(chunk)
+            if position != end + 1:
+                raise DownloadError(f"Short range {start}-{end}: got {position - start} bytes")
+        finally:
+            os.close(fd)
+        with state_lock:
+            done.add(index)
+            state["done"] = sorted(done)
+            _save_state(part_path, state)
+
+    pending = [r for r in ranges if r[0] not in done]
+    with ThreadPoolExecutor(max_workers=connections) as executor:
+        for future in [executor.submit(fetch, *r) for r in pending]:
+            future.result()
+    return resumed
+
+
+def fetch_bytes(url: str, attempts: int = MAX_ATTEMPTS,
+                on_data: Optional[Callable[[bytes, int], None]] = None) -> bytes:
+    """
+    Download url into memory over the shared pool
+
+    For results that are transformed before being written (e.g. transcoded
+    images), which avoids a temp-file round trip through the disk.
+    """
+    client = get_client()
+    start = time.time()
+    last_error = None
+    for attempt in range(1, attempts + 1):
+        try:
+            buffer = bytearray()
+            with client.stream('GET', url) as response:
+                if response.status_code >= 400:
+                    raise DownloadError(f"HTTP {response.status_code} for {url}", response.status_code)
+                expected = response.headers.get('content-length')
+                for chunk in response.iter_bytes(CHUNK_SIZE):
+                    if on_data:
+                        on_data(chunk, len(buffer))
+                    buffer += chunk
+            if expected and expected.isdigit() and int(expected) != len(buffer):
+                raise DownloadError(f"Size mismatch: expected {expected} bytes, got {len(buffer)}")
+            with _stats_lock:
+                _stats["files"] += 1
+                _stats["bytes"] += len(buffer)
+                _stats["seconds"] += time.time() - start
+            return bytes(buffer)
+        except (httpx.HTTPError, DownloadError) as e:
+            if isinstance(e, DownloadError) and e.permanent:
+                raise  # e.g. 404: the object won't appear on a retry
+            last_error = e
+            if attempt < attempts:
+                time.sleep(2 ** attempt)
+
+    raise DownloadError(f"Download failed after {attempts} attempts: {last_error}")
+
+
+def download(url: str, output_path: str, connections: int = PARALLEL_CONNECTIONS,
+             attempts: int = MAX_ATTEMPTS,
+             on_data: Optional[Callable[[bytes, int], None]] = None) -> DownloadResult:
+    """
+    Download url to output_path atomically, resuming and parallelising when possible
+
+    Args:
+        url: HTTP(S) URL to fetch
+        output_path: Final file path; written via output_path + '.part'
+        connections: Parallel range requests for large files (1 disables)
+        attempts: Tries before giving up; each retry resumes the .part file
+        on_data: Called as on_data(chunk, file_offset) for every chunk received
+                 (e.g. image_probe.StreamProbe.feed)
+
+    Raises:
+        DownloadError if the file can't be fetched or fails verification
+    """
+    client = get_client()
+    output_path = Path(output_path)
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    part_path = output_path.with_name(output_path.name + '.part')
+
+    start = time.time()
+    last_error = None
+    for attempt in range(1, attempts + 1):
+        try:
+            info = _probe(client, url) or {"size": None, "ranges": False, "validator": None, "headers": {}}
+            size = info["size"]
+            use_parallel = (connections > 1 and info["ranges"] and size
+                            and size >= PARALLEL_THRESHOLD)
+            if use_parallel:
+                resumed = _parallel(client, url, part_path, size, info["validator"],
+                                    connections, on_data)
+            else:
+                resumed = _stream(client, url, part_path, info["validator"], on_data)
+
+            actual = part_path.stat().st_size
+            if size is not None and actual != size:
+                raise DownloadError(f"Size mismatch: expected {size} bytes, got {actual}")
+
+            sha256, md5 = _file_digests(part_path)
+            expected_md5 = _expected_md5(info["headers"])
+            if expected_md5 and md5 != expected_md5:
+                part_path.unlink()
+                _state_path(part_path).unlink(missing_ok=True)
+                raise DownloadError("MD5 mismatch against server checksum")
+
+            os.replace(part_path, output_path)
+            _state_path(part_path).unlink(missing_ok=True)
+
+            elapsed = time.time() - start
+            with _stats_lock:
+                _stats["files"] += 1
+                _stats["bytes"] += actual - resumed
+                _stats["seconds"] += elapsed
+            return DownloadResult(str(output_path), actual, elapsed, sha256,
+                                  resumed_bytes=resumed, parallel=bool(use_parallel))
+        except (httpx.HTTPError, DownloadError, OSError) as e:
+            if isinstance(e, DownloadError) and e.permanent:
+                raise  # e.g. 404: the object won't appear on a retry
+            last_error = e
+            if attempt < attempts:
+                time.sleep(2 ** attempt)
+
+    raise DownloadError(f"Download failed after {attempts} attempts: {last_error}")
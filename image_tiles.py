@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""
+Overlapping tile split and feathered stitching for tiled upscaling
+
+An image is cut into overlapping tiles that can be upscaled independently
+(and concurrently). Each upscaled tile is blended back with a weight that
+ramps linearly across the overlap on every side that touches another
+tile, so seams fade out instead of showing a hard edge. Weights and pixel
+sums are accumulated in float32 and normalised once at the end.
+"""
+
+import io
+import os
+from pathlib import Path
+
+try:
+    import numpy as np
+except ImportError:
+    print("Installing numpy...")
+    os.system("pip install numpy")
+    import numpy as np
+
+try:
+    from PIL import Image
+except ImportError:
+    print("Installing Pillow...")
+    os.system("pip install Pillow")
+    from PIL import Image
+
+DEFAULT_TILE_SIZE = 1024
+DEFAULT_OVERLAP = 64
+
+
+def _starts(length, tile_size, overlap):
+    """Tile start offsets along one axis, the last tile flush with the edge"""
+    if length <= tile_size:
+        return [0]
+    step = tile_size - overlap
+    starts = list(range(0, length - tile_size, step))
+    starts.append(length - tile_size)
+    return starts
+
+
+def tile_boxes(width, height, tile_size=DEFAULT_TILE_SIZE, overlap=DEFAULT_OVERLAP):
+    """(left, top, right, bottom) boxes covering the image with the given overlap"""
+    if overlap >= tile_size:
+        raise ValueError("Tile overlap must be smaller than the tile size")
+    return [
+        (x, y, min(x + tile_size, width), min(y + tile_size, height))
+        for y in _starts(height, tile_size, overlap)
+        for x in _starts(width, tile_size, overlap)
+    ]
+
+
+def split_tiles(image_path, tile_dir, tile_size=DEFAULT_TILE_SIZE, overlap=DEFAULT_OVERLAP):
+    """
+    Write the tiles of an image as PNG files
+
+    Returns:
+        (image size, [(box, tile_path), ...])
+    """
+    image = Image.open(image_path).convert("RGB")
+    tile_dir = Path(tile_dir)
+    tile_dir.mkdir(parents=True, exist_ok=True)
+    stem = Path(image_path).stem
+
+    tiles = []
+    for box in tile_boxes(image.width, image.height, tile_size, overlap):
+        tile_path = tile_dir / f"{stem}_tile_{box[0]}_{box[1]}.png"
+        image.crop(box).save(tile_path, "PNG")
+        tiles.append((box, str(tile_path)))
+    return image.size, tiles
+
+
+def _ramp(length, fade_start, fade_end):
+    """1-D weight: linear fade-in/out over the given number of pixels at each end"""
+    weights = np.ones(length, dtype=np.float32)
+    if fade_start:
+        weights[:fade_start] = np.linspace(0.0, 1.0, fade_start + 2, dtype=np.float32)[1:-1]
+    if fade_end:
+        weights[length - fade_end:] = np.linspace(1.0, 0.0, fade_end + 2, dtype=np.float32)[1:-1]
+    return weights
+
+
+class TileStitcher:
+    """
+    Accumulates upscaled tiles into one output image
+
+    Args:
+        size: Source image (width, height)
+        scale: Integer upscale factor applied to every tile
+        overlap: Tile overlap in source pixels (the feather width)
+    """
+
+    def __init__(self, size, scale, overlap=DEFAULT_OVERLAP):
+        self.width, self.height = size
+        self.scale = scale
+        self.overlap = overlap
+        out_h, out_w = self.height * scale, self.width * scale
+        self.accum = np.zeros((out_h, out_w, 3), dtype=np.float32)
+        self.weights = np.zeros((out_h, out_w), dtype=np.float32)
+
+    def add(self, box, tile):
+        """Blend one upscaled tile (PIL image or encoded bytes) into place"""
+        if isinstance(tile, (bytes, bytearray)):
+            tile = Image.open(io.BytesIO(tile))
+        left, top, right, bottom = (v * self.scale for v in box)
+        size = (right - left, bottom - top)
+        tile = tile.convert("RGB")
+        if tile.size != size:
+            tile = tile.resize(size, Image.LANCZOS)
+
+        # Only feather edges shared with a neighbouring tile
+        fade = self.overlap * self.scale
+        fade_x = _ramp(size[0], fade if box[0] > 0 else 0, fade if box[2] < self.width else 0)
+        fade_y = _ramp(size[1], fade if box[1] > 0 else 0, fade if box[3] < self.height else 0)
+        weight = np.outer(fade_y, fade_x)
+
+        self.accum[top:bottom, left:right] += np.asarray(tile, dtype=np.float32) * weight[..., None]
+        self.weights[top:bottom, left:right] += weight
+
+    def result(self) -> Image.Image:
+        """Normalised stitched image"""
+        pixels = self.accum / np.maximum(self.weights, 1e-6)[..., None]
+        return Image.fromarray(np.clip(pixels + 0.5, 0, 255).astype(np.uint8))
@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+In-memory image transcoding with Pillow
+Writes downloaded result bytes straight to the final path in the chosen codec
+
+Replaces the download-to-temp -> `file` -> `sips` -> rename round trip.
+The format is sniffed from magic bytes; when it already matches the
+requested codec (and no re-encode is forced) the bytes are written as-is.
+Pillow releases the GIL while encoding, so transcodes can run on a thread
+pool alongside network-bound work.
+"""
+
+import io
+import os
+from pathlib import Path
+from typing import Optional
+
+from image_probe import sniff_format
+
+try:
+    from PIL import Image
+except ImportError:
+    print("Installing Pillow...")
+    os.system("pip install Pillow")
+    from PIL import Image
+
+# Output codecs: Pillow format name and file extension
+CODECS = {
+    "jpeg": {"pillow": "JPEG", "ext": ".jpg"},
+    "png": {"pillow": "PNG", "ext": ".png"},
+    "webp": {"pillow": "WEBP", "ext": ".webp"},
+}
+
+EXTENSION_CODECS = {".jpg": "jpeg", ".jpeg": "jpeg", ".png": "png", ".webp": "webp"}
+
+DEFAULT_QUALITY = 95
+
+
+def codec_for_extension(ext: str, default: str = "jpeg") -> str:
+    """Codec matching a file extension (e.g. the source image's)"""
+    return EXTENSION_CODECS.get(ext.lower(), default)
+
+
+def _atomic_write(output_path: Path, writer):
+    temp_path = output_path.with_name(output_path.name + '.part')
+    with open(temp_path, 'wb') as f:
+        writer(f)
+    os.replace(temp_path, output_path)
+
+
+def save_image(image: Image.Image, output_path, codec: str, quality: Optional[int] = None):
+    """Encode a decoded image to output_path (temp file + atomic rename)"""
+    output_path = Path(output_path)
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    options = {}
+    if codec == "jpeg":
+        if image.mode not in ("RGB", "L"):
+            image = image.convert("RGB")
+        options = {"quality": quality or DEFAULT_QUALITY, "optimize": True}
+    elif codec == "webp":
+        options = {"quality": quality or DEFAULT_QUALITY, "method": 4}
+    elif codec == "png":
+        options = {"compress_level": 6}
+
+    _atomic_write(output_path, lambda f: image.save(f, CODECS[codec]["pillow"], **options))
+
+
+def transcode(data: bytes, output_path, codec: str, quality: Optional[int] = None) -> str:
+    """
+    Write image bytes to output_path encoded as codec
+
+    Args:
+        data: Encoded image (JPEG, PNG, WebP or GIF)
+        output_path: Final file path
+        codec: One of CODECS
+        quality: Encoder quality 1-100 for jpeg/webp; when given, the image
+                 is re-encoded even if it is already in the requested codec
+
+    Returns:
+        The sniffed source format
+    """
+    output_path = Path(output_path)
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    source_format = sniff_format(data)
+
+    if source_format == codec and quality is None:
+        _atomic_write(output_path, lambda f: f.write(data))
+        return source_format
+
+    save_image(Image.open(io.BytesIO(data)), output_path, codec, quality)
+    return source_format
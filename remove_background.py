@@ -7,19 +7,19 @@ Optimized for portrait photos with multiple model options
 import os
 import sys
 import time
+import argparse
+import tempfile
 from pathlib import Path
 from dotenv import load_dotenv
 
+from batch_journal import BatchJournal
+from fal_jobs import FalJob, FalPipeline, configure_api_key, run_single, upload_file
+from image_probe import image_size
+import fal_cache
+
 # Load environment variables
 load_dotenv('.env.local')
 
-try:
-    import fal_client
-except ImportError:
-    print("Installing fal_client...")
-    os.system("pip install fal-client")
-    import fal_client
-
 # Available models for background removal
 MODELS = {
     "portrait": {
@@ -52,25 +52,78 @@ MODELS = {
 def upload_image_to_fal(image_path):
     """Upload image file to Fal.ai and return URL"""
     print(f"Uploading {image_path}...")
-    url = fal_client.upload_file(image_path)
+    url = upload_file(image_path)
     print(f"  Uploaded: {url}")
     return url
 
 
 def get_image_dimensions(image_path):
-    """Get image dimensions using sips (macOS)"""
-    import subprocess
-    result = subprocess.run(
-        ['sips', '-g', 'pixelWidth', '-g', 'pixelHeight', image_path],
-        capture_output=True, text=True
+    """Get image dimensions from the file header (cached, no subprocess)"""
+    return image_size(image_path)
+
+
+def prepare_proxy(job):
+    """Write the downscaled upload proxy for a job (runs in an upload worker)"""
+    from alpha_matte import make_proxy
+    proxy_size = job.output_options['proxy']
+    source_hash = fal_cache.file_sha256(job.input_path)[:16]
+    proxy_path = Path(tempfile.gettempdir()) / "vibe-proxies" / (
+        f"{Path(job.input_path).stem}_{source_hash}_{proxy_size}px.jpg"
+    )
+    if not proxy_path.exists():
+        make_proxy(job.input_path, proxy_path, proxy_size)
+    job.upload_path = str(proxy_path)
+
+
+def composite_matte(job):
+    """Rebuild full-resolution alpha from the proxy matte (runs in a postprocess worker)"""
+    from alpha_matte import composite_full_resolution
+    job.extra['output_dimensions'] = composite_full_resolution(
+        job.input_path, job.extra['data'], job.output_path
+    )
+
+
+def build_job(image_path, model="portrait", output_dir=None, proxy_size=None):
+    """
+    Describe the fal job for one image (input, endpoint, arguments, output path)
+
+    With proxy_size, a copy downscaled to that longest side is uploaded and
+    the returned matte is upsampled onto the original locally.
+    """
+    model_info = MODELS[model]
+
+    arguments = {}
+    if model_info['model_type']:
+        arguments["model"] = model_info['model_type']
+
+    input_path = Path(image_path)
+    out_dir = Path(output_dir) if output_dir else input_path.parent / "no_bg"
+
+    # Always save as PNG to preserve transparency
+    job = FalJob(
+        input_path=str(input_path),
+        endpoint=model_info['name'],
+        output_path=str(out_dir / f"{input_path.stem}_no_bg.png"),
+        arguments=arguments,
+        url_field="image_url",
     )
-    lines = result.stdout.strip().split('\n')
-    width = int([l for l in lines if 'pixelWidth' in l][0].split(':')[1].strip())
-    height = int([l for l in lines if 'pixelHeight' in l][0].split(':')[1].strip())
-    return width, height
+    if proxy_size:
+        job.prepare = prepare_proxy
+        job.postprocess = composite_matte
+        job.in_memory = True
+        job.output_options = {"proxy": proxy_size}
+    return job
 
 
-def remove_background(image_path, model="portrait", output_dir=None):
+def check_model(model):
+    if model not in MODELS:
+        print(f"Error: Unknown model '{model}'. Choose from: {', '.join(MODELS.keys())}")
+        return False
+    return True
+
+
+def remove_background(image_path, model="portrait", output_dir=None, proxy_size=None,
+                      **pipeline_options):
     """
     Remove background from image using selected Fal.ai model
 
@@ -78,23 +131,17 @@ def remove_background(image_path, model="portrait", output_dir=None):
         image_path: Path to input image
         model: One of: portrait, general, heavy, bria
         output_dir: Optional output directory (default: no_bg subfolder)
+        proxy_size: Upload a copy downscaled to this longest side and rebuild
+                    the full-resolution alpha locally (default: full size)
+        pipeline_options: Passed to fal_jobs.FalPipeline (e.g. use_cache=False)
     """
     if not os.path.exists(image_path):
         print(f"Error: File not found: {image_path}")
         return None
 
-    if model not in MODELS:
-        print(f"Error: Unknown model '{model}'. Choose from: {', '.join(MODELS.keys())}")
-        return None
-
-    # Configure API key
-    api_key = os.getenv('FAL_API_KEY')
-    if not api_key:
-        print("Error: FAL_API_KEY not found in .env.local")
+    if not check_model(model) or not configure_api_key():
         return None
 
-    os.environ['FAL_KEY'] = api_key
-
     # Get current dimensions
     width, height = get_image_dimensions(image_path)
 
@@ -106,96 +153,38 @@ def remove_background(image_path, model="portrait", output_dir=None):
     print(f"Cost: {model_info['cost']}")
     print(f"{'='*60}\n")
 
-    try:
-        # Upload image
-        image_url = upload_image_to_fal(image_path)
-
-        # Prepare arguments based on model
-        arguments = {
-            "image_url": image_url,
-        }
-
-        # Add model-specific parameters
-        if model_info['model_type']:
-            arguments["model"] = model_info['model_type']
-
-        # Submit job
-        print(f"Removing background...")
-        handler = fal_client.submit(
-            model_info['name'],
-            arguments=arguments
-        )
-
-        print(f"Job ID: {handler.request_id}")
-        print("Processing...")
-
-        # Wait for result
-        start_time = time.time()
-        result = handler.get()
-        elapsed = time.time() - start_time
-
-        print(f"\n  Background removal complete! ({elapsed:.1f} seconds)")
-
-        # Find output URL in result
-        output_url = None
-        if 'image' in result:
-            output_url = result['image']['url']
-        elif 'output' in result:
-            output_url = result['output']['url'] if isinstance(result['output'], dict) else result['output']
-        elif 'url' in result:
-            output_url = result['url']
-        else:
-            # Try to find any URL in the result
-            print("Result structure:")
-            print(result)
-            for key, value in result.items():
-                if isinstance(value, str) and value.startswith('http'):
-                    output_url = value
-                    break
-                elif isinstance(value, dict) and 'url' in value:
-                    output_url = value['url']
-                    break
-
-        if output_url:
-            # Generate output filename
-            input_path = Path(image_path)
-            if output_dir:
-                out_dir = Path(output_dir)
-            else:
-                out_dir = input_path.parent / "no_bg"
-            out_dir.mkdir(exist_ok=True)
-
-            # Always save as PNG to preserve transparency
-            output_path = out_dir / f"{input_path.stem}_no_bg.png"
-
-            # Download
-            print(f"Downloading...")
-            os.system(f'curl -sS -o "{output_path}" "{output_url}"')
-
-            # Verify dimensions
-            new_width, new_height = get_image_dimensions(str(output_path))
-
-            print(f"\n{'='*60}")
-            print(f"  Saved: {output_path}")
-            print(f"Size: {new_width}x{new_height}")
-            print(f"Processing time: {elapsed:.1f} seconds")
-            print(f"{'='*60}\n")
-
-            return str(output_path)
-        else:
-            print("Error: No output URL in result")
-            print(result)
-            return None
-
-    except Exception as e:
-        print(f"Error during background removal: {e}")
-        import traceback
-        traceback.print_exc()
+    job = run_single(build_job(image_path, model, output_dir, proxy_size), **pipeline_options)
+    if not job.ok:
+        print(f"Error during background removal: {job.error}")
         return None
 
+    # Verify dimensions
+    new_width, new_height = job.extra.get('output_dimensions') or get_image_dimensions(job.output_path)
+    elapsed = job.timings.get('fal', 0.0)
+
+    print(f"\n{'='*60}")
+    print(f"  Saved: {job.output_path}")
+    print(f"Size: {new_width}x{new_height}")
+    print(f"Processing time: {elapsed:.1f} seconds")
+    print(f"{'='*60}\n")
+
+    return job.output_path
+
 
-def batch_remove_background(input_dir, model="portrait", extensions=None):
-    """Remove backgrounds from all images in a directory"""
+def batch_remove_background(input_dir, model="portrait", extensions=None, jobs=1,
+                            proxy_size=None, fresh=False, **pipeline_options):
+    """
+    Remove backgrounds from all images in a directory
+
+    Args:
+        input_dir: Directory containing images
+        model: One of: portrait, general, heavy, bria
+        extensions: File extensions to include
+        jobs: Number of fal requests in flight at once; uploads and
+              downloads of other images overlap with them
+        proxy_size: Upload proxies of this longest side (see remove_background)
+        pipeline_options: Passed to fal_jobs.FalPipeline
+    """
     if extensions is None:
         extensions = ['.jpg', '.jpeg', '.png', '.webp']
 
@@ -205,6 +194,9 @@ def batch_remove_background(input_dir, model="portrait", extensions=None):
         print(f"Error: Directory not found: {input_dir}")
         return
 
+    if not check_model(model) or not configure_api_key():
+        return
+
     # Find all images
     images = []
     for ext in extensions:
@@ -212,64 +204,113 @@ def batch_remove_background(input_dir, model="portrait", extensions=None):
         images.extend(input_path.glob(f"*{ext.upper()}"))
 
     # Filter out already processed images
-    images = [img for img in images if '_no_bg' not in img.stem]
+    images = sorted(set(img for img in images if '_no_bg' not in img.stem))
 
     if not images:
         print(f"No images found in {input_dir}")
         return
 
+    jobs = max(1, jobs)
+
     print(f"Found {len(images)} image(s) to process")
     print(f"Model: {model}")
+    print(f"Parallel jobs: {jobs}")
     print()
 
-    results = {"success": 0, "failed": 0}
+    results = {"success": 0, "skipped": 0, "failed": 0, "cancelled": 0}
+    batch_start = time.time()
 
-    for i, image in enumerate(images, 1):
-        print(f"\n[{i}/{len(images)}] Processing: {image.name}")
-        result = remove_background(str(image), model=model)
-        if result:
-            print(f"  Completed: {Path(result).name}")
+    def report(index, job):
+        if job.cached == 'output':
+            print(f"[{index + 1}/{len(images)}] Up to date: {Path(job.output_path).name}")
+            results["skipped"] += 1
+        elif job.ok:
+            print(f"[{index + 1}/{len(images)}] Completed: {Path(job.output_path).name}")
             results["success"] += 1
+        elif job.retryable:
+            print(f"[{index + 1}/{len(images)}] Cancelled (retryable): {job.name} ({job.error})")
+            results["cancelled"] += 1
         else:
-            print(f"  Failed: {image.name}")
+            print(f"[{index + 1}/{len(images)}] Failed: {job.name} ({job.error})")
             results["failed"] += 1
 
+    # Resumes an interrupted run of the same batch (see batch_journal)
+    journal = BatchJournal.for_batch("remove_background", input_dir, model, fresh=fresh)
+    pipeline = FalPipeline.for_jobs(jobs, journal=journal, **pipeline_options)
+    pipeline.run([build_job(str(image), model, proxy_size=proxy_size) for image in images],
+                 on_result=report)
+    journal.close()
+
+    elapsed = time.time() - batch_start
+    throughput = results["success"] / (elapsed / 60) if elapsed > 0 else 0.0
+
     print(f"\n{'='*60}")
-    print(f"Batch complete: {results['success']} successful, {results['failed']} failed")
+    print(f"Batch complete: {results['success']} successful, {results['skipped']} up to date, {results['failed']} failed")
+    if results["cancelled"]:
+        print(f"{results['cancelled']} cancelled at a deadline; re-run the batch to retry them")
+    print(f"Total time: {elapsed:.1f} seconds ({throughput:.1f} images/min)")
     print(f"{'='*60}")
 
+    return results
+
+
+def print_usage():
+    print("Background Removal using Fal.ai")
+    print("=" * 40)
+    print()
+    print("Usage:")
+    print("  Single image: python remove_background.py <image.jpg> [model]")
+    print("  Batch process: python remove_background.py --batch <directory> [model] [--jobs N]")
+    print()
+    print("Available models:")
+    for name, info in MODELS.items():
+        marker = "(default)" if name == "portrait" else ""
+        print(f"  {name:12} - {info['description']} ({info['cost']}) {marker}")
+    print()
+    print("Examples:")
+    print("  python remove_background.py photo.jpg")
+    print("  python remove_background.py photo.jpg portrait")
+    print("  python remove_background.py --batch ./portraits")
+    print("  python remove_background.py --batch ./photos general")
+    print("  python remove_background.py --batch ./portraits portrait --jobs 8")
+    print("  python remove_background.py --batch ./portraits portrait --proxy 1024")
+    print()
+    print("Output: PNG files with transparent background in 'no_bg' subfolder")
+
 
 def main():
     if len(sys.argv) < 2:
-        print("Background Removal using Fal.ai")
-        print("=" * 40)
-        print()
-        print("Usage:")
-        print("  Single image: python remove_background.py <image.jpg> [model]")
-        print("  Batch process: python remove_background.py --batch <directory> [model]")
-        print()
-        print("Available models:")
-        for name, info in MODELS.items():
-            marker = "(default)" if name == "portrait" else ""
-            print(f"  {name:12} - {info['description']} ({info['cost']}) {marker}")
-        print()
-        print("Examples:")
-        print("  python remove_background.py photo.jpg")
-        print("  python remove_background.py photo.jpg portrait")
-        print("  python remove_background.py --batch ./portraits")
-        print("  python remove_background.py --batch ./photos general")
-        print()
-        print("Output: PNG files with transparent background in 'no_bg' subfolder")
+        print_usage()
         sys.exit(1)
 
-    if sys.argv[1] == "--batch":
-        directory = sys.argv[2] if len(sys.argv) > 2 else "."
-        model = sys.argv[3] if len(sys.argv) > 3 else "portrait"
-        batch_remove_background(directory, model)
+    parser = argparse.ArgumentParser(description="Background Removal using Fal.ai")
+    parser.add_argument("target", nargs="?", help="Image file, or directory with --batch")
+    parser.add_argument("model", nargs="?", default="portrait", choices=list(MODELS.keys()))
+    parser.add_argument("--batch", action="store_true", help="Process every image in a directory")
+    parser.add_argument("--jobs", "-j", type=int, default=1, help="Images to process in parallel (batch mode)")
+    parser.add_argument("--proxy", type=int, nargs="?", const=1024, metavar="PX",
+                        help="Upload a proxy downscaled to PX on the long side (default 1024) "
+                             "and rebuild full-resolution alpha locally")
+    parser.add_argument("--no-cache", action="store_true", help="Ignore cached uploads and results")
+    parser.add_argument("--timeout", type=float, metavar="SECONDS",
+                        help="Cancel a fal request still unfinished after SECONDS (retryable)")
+    parser.add_argument("--batch-timeout", type=float, metavar="SECONDS",
+                        help="Cancel everything still outstanding SECONDS after the batch starts")
+    parser.add_argument("--fresh", action="store_true",
+                        help="Ignore the batch journal and start the batch over")
+    args = parser.parse_args()
+
+    pipeline_options = {"use_cache": not args.no_cache, "job_timeout": args.timeout,
+                        "batch_timeout": args.batch_timeout}
+
+    if args.batch:
+        batch_remove_background(args.target or ".", args.model, jobs=args.jobs,
+                                proxy_size=args.proxy, fresh=args.fresh, **pipeline_options)
+    elif args.target:
+        remove_background(args.target, args.model, proxy_size=args.proxy, **pipeline_options)
     else:
-        image_path = sys.argv[1]
-        model = sys.argv[2] if len(sys.argv) > 2 else "portrait"
-        remove_background(image_path, model)
+        print_usage()
+        sys.exit(1)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,212 @@
+#!/usr/bin/env python3
+"""
+Static-segment elision for screen recordings
+Find long runs of (near-)identical frames so only motion is sent to video models
+
+Screen captures are mostly still frames with bursts of scrolling, but the
+video upscalers bill per second. Low-resolution grayscale frames are
+streamed from ffmpeg into NumPy and compared against the first frame of the
+current run; runs that stay below a mean-difference threshold for long
+enough become "static" spans. Each static span is represented by a single
+frame (upscaled through the image models), motion spans are cut out as
+short clips for the video model, and the full-length 4K timeline is then
+rebuilt locally with the source audio.
+"""
+
+import os
+import subprocess
+import tempfile
+from dataclasses import dataclass
+from pathlib import Path
+from typing import List
+
+from ffmpeg_utils import FFmpegError, concat_copy, run_ffmpeg
+
+try:
+    import numpy as np
+except ImportError:
+    print("Installing numpy...")
+    os.system("pip install numpy")
+    import numpy as np
+
+# Analysis resolution: enough to see scrolling text, cheap to diff
+ANALYSIS_WIDTH = 160
+
+# Mean absolute difference (0-255 gray) below which frames count as identical;
+# a blinking cursor or clock tick stays well under this
+DEFAULT_THRESHOLD = 1.0
+
+DEFAULT_MIN_STATIC_SECONDS = 2.0
+
+# Video models reject (or bill a minimum for) very short clips
+DEFAULT_MIN_MOTION_SECONDS = 1.0
+
+# Inputs per ffmpeg process when rebuilding the timeline; longer timelines are
+# rendered in groups of this many parts and joined with the concat demuxer
+ASSEMBLE_GROUP_SIZE = 32
+
+
+@dataclass
+class Span:
+    kind: str  # 'static' or 'motion'
+    start: int  # first frame
+    end: int  # one past the last frame
+
+    def seconds(self, fps: float) -> float:
+        return (self.end - self.start) / fps
+
+
+def analysis_frames(video_path, fps: float, width: int, height: int):
+    """Yield low-resolution grayscale frames (float32) decoded at a constant fps"""
+    small_w = ANALYSIS_WIDTH
+    small_h = max(2, round(ANALYSIS_WIDTH * height / width / 2) * 2)
+    frame_size = small_w * small_h
+    cmd = ["ffmpeg", "-hide_banner", "-nostdin", "-loglevel", "error", "-i", str(video_path),
+           "-vf", f"fps={fps},scale={small_w}:{small_h}:flags=area,format=gray",
+           "-f", "rawvideo", "pipe:1"]
+    process = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    try:
+        while True:
+            data = process.stdout.read(frame_size)
+            if len(data) < frame_size:
+                break
+            yield np.frombuffer(data, dtype=np.uint8).reshape(small_h, small_w).astype(np.float32)
+    finally:
+        process.stdout.close()
+        stderr = process.stderr.read().decode(errors="replace")
+        if process.wait() > 0:
+            raise FFmpegError(f"ffmpeg failed decoding {video_path}: {stderr.strip()[-2000:]}")
+
+
+def find_runs(frames, threshold: float = DEFAULT_THRESHOLD) -> List[tuple]:
+    """
+    Group consecutive frames that stay within threshold of the run's first frame
+
+    Comparing against the run's anchor (not the previous frame) stops a slow
+    fade or scroll from drifting through as "static".
+
+    Returns:
+        [(start, end), ...] frame ranges covering every frame
+    """
+    runs = []
+    anchor, start, index = None, 0, -1
+    for index, frame in enumerate(frames):
+        if anchor is not None and np.mean(np.abs(frame - anchor)) <= threshold:
+            continue
+        if anchor is not None:
+            runs.append((start, index))
+        anchor, start = frame, index
+    if index >= 0:
+        runs.append((start, index + 1))
+    return runs
+
+
+def plan_spans(runs, fps: float, min_static_seconds: float = DEFAULT_MIN_STATIC_SECONDS,
+               min_motion_seconds: float = DEFAULT_MIN_MOTION_SECONDS) -> List[Span]:
+    """
+    Turn frame runs into alternating static/motion spans
+
+    Runs of at least min_static_seconds are static; everything between them
+    is motion. Motion spans shorter than min_motion_seconds grow into the
+    neighbouring static spans, which are dropped back to motion if that
+    leaves them too short.
+    """
+    min_static = max(1, round(min_static_seconds * fps))
+    min_motion = max(1, round(min_motion_seconds * fps))
+
+    spans: List[Span] = []
+    for start, end in runs:
+        kind = "static" if end - start >= min_static else "motion"
+        if spans and spans[-1].kind == kind == "motion":
+            spans[-1].end = end
+        else:
+            spans.append(Span(kind, start, end))
+
+    for i, span in enumerate(spans):
+        if span.kind != "motion" or span.end - span.start >= min_motion:
+            continue
+        missing = min_motion - (span.end - span.start)
+        if i + 1 < len(spans):
+            grow = min(missing, spans[i + 1].end - spans[i + 1].start)
+            span.end += grow
+            spans[i + 1].start += grow
+            missing -= grow
+        if missing and i > 0:
+            grow = min(missing, spans[i - 1].end - spans[i - 1].start)
+            span.start -= grow
+            spans[i - 1].end -= grow
+
+    # Re-check static spans that were trimmed, then merge neighbouring motion
+    merged: List[Span] = []
+    for span in spans:
+        if span.end <= span.start:
+            continue
+        if span.kind == "static" and span.end - span.start < min_static:
+            span.kind = "motion"
+        if merged and merged[-1].kind == span.kind == "motion":
+            merged[-1].end = span.end
+        else:
+            merged.append(span)
+    return merged
+
+
+def render_parts(parts, output_path, fps: float, size, audio_from=None, crf: int = 16):
+    """Encode parts (see assemble) into one clip with a single ffmpeg filter graph"""
+    width, height = size
+    inputs, filters = [], []
+    for index, (kind, path, seconds) in enumerate(parts):
+        if kind == "static":
+            inputs += ["-loop", "1", "-framerate", f"{fps}", "-t", f"{seconds:.6f}", "-i", path]
+        else:
+            inputs += ["-i", path]
+        filters.append(
+            f"[{index}:v]scale={width}:{height}:flags=lanczos,setsar=1,fps={fps},format=yuv420p,"
+            f"trim=duration={seconds:.6f},setpts=PTS-STARTPTS[v{index}]"
+        )
+    labels = "".join(f"[v{index}]" for index in range(len(parts)))
+    filters.append(f"{labels}concat=n={len(parts)}:v=1:a=0[video]")
+
+    args = inputs
+    if audio_from:
+        args += ["-i", audio_from]
+    args += ["-filter_complex", ";".join(filters), "-map", "[video]"]
+    if audio_from:
+        args += ["-map", f"{len(parts)}:a?", "-c:a", "copy"]
+    args += ["-r", f"{fps}", "-c:v", "libx264", "-preset", "medium", "-crf", str(crf),
+             "-movflags", "+faststart", output_path]
+    run_ffmpeg(args)
+
+
+def assemble(parts, output_path, fps: float, size, audio_from=None, crf: int = 16):
+    """
+    Rebuild the full timeline from upscaled clips and still frames
+
+    Up to ASSEMBLE_GROUP_SIZE parts are encoded in one pass; longer
+    timelines are encoded a group at a time (bounding open inputs and
+    decoders) and the groups joined without re-encoding.
+
+    Args:
+        parts: [(kind, path, seconds), ...] in playback order; kind is
+               'motion' (a video clip) or 'static' (an image held for seconds)
+        output_path: Final H.264 MP4
+        fps: Output frame rate (the source's)
+        size: Output (width, height)
+        audio_from: Copy this file's audio track (if any) into the output
+    """
+    output_path = Path(output_path)
+    if len(parts) > ASSEMBLE_GROUP_SIZE:
+        with tempfile.TemporaryDirectory(prefix="elision-", dir=output_path.parent) as work:
+            groups = []
+            for start in range(0, len(parts), ASSEMBLE_GROUP_SIZE):
+                group = Path(work) / f"group{len(groups):04d}.mp4"
+                render_parts(parts[start:start + ASSEMBLE_GROUP_SIZE], group, fps, size, crf=crf)
+                groups.append(str(group))
+            concat_copy(groups, output_path, audio_from=audio_from)
+        return
+
+    temp_path = output_path.with_name(output_path.stem + ".part" + output_path.suffix)
+    try:
+        render_parts(parts, temp_path, fps, size, audio_from, crf)
+        temp_path.replace(output_path)
+    finally:
+        temp_path.unlink(missing_ok=True)
@@ -0,0 +1,50 @@
+import re
+import shutil
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+# The tools are top-level scripts, not a package
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+
+@pytest.fixture(autouse=True)
+def isolated_cache(tmp_path, monkeypatch):
+    """Keep the fal cache, journals and Veo render times out of ~/.cache"""
+    monkeypatch.setenv("FAL_CACHE_DIR", str(tmp_path / "cache"))
+    monkeypatch.setenv("VEO_TIMINGS_FILE", str(tmp_path / "cache" / "veo_render_times.jsonl"))
+
+
+@pytest.fixture
+def make_clip(tmp_path):
+    """Generate a small H.264 test clip: make_clip(name, seconds, fps, gop, audio)"""
+    if shutil.which("ffmpeg") is None:
+        pytest.skip("ffmpeg not installed")
+
+    def make(name="clip.mp4", seconds=6, fps=30, gop=30, audio=True):
+        path = tmp_path / name
+        cmd = ["ffmpeg", "-hide_banner", "-nostdin", "-loglevel", "error", "-y",
+               "-f", "lavfi", "-i", f"testsrc=size=160x90:rate={fps}:duration={seconds}"]
+        if audio:
+            cmd += ["-f", "lavfi", "-i", f"sine=duration={seconds}"]
+        cmd += ["-c:v", "libx264", "-preset", "ultrafast", "-g", str(gop), "-keyint_min", str(gop),
+                "-sc_threshold", "0", "-pix_fmt", "yuv420p"]
+        if audio:
+            cmd += ["-c:a", "aac"]
+        subprocess.run(cmd + [str(path)], check=True)
+        return path
+
+    return make
+
+
+@pytest.fixture
+def stream_info():
+    """(video frames, has audio) of a file, read with ffmpeg alone (no ffprobe needed)"""
+    def info(path):
+        result = subprocess.run(["ffmpeg", "-hide_banner", "-nostdin", "-i", str(path), "-map", "0:v",
+                                 "-f", "null", "-"], capture_output=True, text=True, check=True)
+        frames = re.findall(r"frame=\s*(\d+)", result.stderr)
+        return int(frames[-1]) if frames else 0, "Audio:" in result.stderr.split("Output #0")[0]
+    return info
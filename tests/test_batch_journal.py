@@ -0,0 +1,126 @@
+import json
+import os
+from types import SimpleNamespace
+
+import pytest
+
+from batch_journal import BatchJournal, job_key
+
+
+@pytest.fixture
+def job(tmp_path):
+    source = tmp_path / "in.png"
+    source.write_bytes(b"pixels")
+    return SimpleNamespace(
+        input_path=str(source), endpoint="fal-ai/clarity-upscaler", arguments={"scale": 2},
+        output_options={"format": "png"}, output_path=str(tmp_path / "out" / "in_4k.png"),
+        request_id=None, output_url=None, error=None, retryable=False,
+    )
+
+
+def test_job_key_is_stable(job):
+    assert job_key(job) == job_key(SimpleNamespace(**vars(job)))
+    assert len(job_key(job)) == 32
+
+
+@pytest.mark.parametrize("change", [
+    {"endpoint": "fal-ai/esrgan"},
+    {"arguments": {"scale": 4}},
+    {"output_options": {"format": "jpeg"}},
+    {"output_path": "elsewhere.png"},
+])
+def test_job_key_changes_with_job(job, change):
+    assert job_key(SimpleNamespace(**{**vars(job), **change})) != job_key(job)
+
+
+def test_job_key_changes_when_input_is_modified(job):
+    before = job_key(job)
+    with open(job.input_path, "ab") as f:
+        f.write(b" more")
+    assert job_key(job) != before
+
+
+def test_job_key_missing_input(job, tmp_path):
+    job.input_path = str(tmp_path / "gone.png")
+    assert job_key(job) == job_key(job)
+
+
+def test_replay_restores_state(job, tmp_path):
+    path = tmp_path / "batch.jsonl"
+    journal = BatchJournal(path)
+    key = job_key(job)
+    job.request_id = "req-1"
+    journal.submitted(key, job)
+    journal.close()
+
+    journal = BatchJournal(path)
+    assert journal.pending_request(key)["request_id"] == "req-1"
+    assert not journal.is_done(key, job.output_path)
+
+    os.makedirs(os.path.dirname(job.output_path))
+    open(job.output_path, "wb").close()
+    job.output_url = "https://fal.media/out.png"
+    journal.done(key, job)
+    journal.close()
+
+    journal = BatchJournal(path)
+    assert journal.pending_request(key) is None
+    assert journal.is_done(key, job.output_path)
+    entry = journal.lookup(key)
+    assert entry["request_id"] == "req-1" and entry["output_url"] == job.output_url
+
+    os.remove(job.output_path)
+    assert not journal.is_done(key, job.output_path)
+    journal.close()
+
+
+def test_replay_skips_torn_last_line(job, tmp_path):
+    path = tmp_path / "batch.jsonl"
+    journal = BatchJournal(path)
+    key = job_key(job)
+    job.request_id = "req-1"
+    journal.submitted(key, job)
+    journal.close()
+    with open(path, "a") as f:
+        f.write(json.dumps({"key": key, "event": "done"})[:20])
+
+    journal = BatchJournal(path)
+    assert journal.pending_request(key)["request_id"] == "req-1"
+    # The next record must not be glued onto the torn fragment
+    job.error = "cancelled"
+    journal.failed(key, job)
+    journal.close()
+
+    journal = BatchJournal(path)
+    assert journal.lookup(key)["error"] == "cancelled"
+    journal.close()
+
+
+def test_failed_is_not_pending(job, tmp_path):
+    journal = BatchJournal(tmp_path / "batch.jsonl")
+    key = job_key(job)
+    journal.submitted(key, job)
+    job.error, job.retryable = "timed out", True
+    journal.failed(key, job)
+    assert journal.pending_request(key) is None
+    assert journal.lookup(key)["retryable"] is True
+    journal.close()
+
+
+def test_for_batch_paths(tmp_path, monkeypatch):
+    monkeypatch.setenv("FAL_CACHE_DIR", str(tmp_path / "cache"))
+    first = BatchJournal.for_batch("upscale", tmp_path, "clarity")
+    other = BatchJournal.for_batch("upscale", tmp_path, "esrgan")
+    assert first.path.parent == tmp_path / "cache" / "journals"
+    assert first.path != other.path
+    first.close()
+    other.close()
+
+    again = BatchJournal.for_batch("upscale", tmp_path, "clarity")
+    assert again.path == first.path
+    again.close()
+
+    first.path.write_text('{"key": "x", "event": "done"}\n')
+    fresh = BatchJournal.for_batch("upscale", tmp_path, "clarity", fresh=True)
+    assert fresh.lookup("x") is None
+    fresh.close()
@@ -0,0 +1,43 @@
+import pytest
+
+from chunked_encode import encode_chunked, encode_files, format_chunk_stats
+from ffmpeg_utils import FFmpegError
+
+
+def test_format_chunk_stats():
+    assert format_chunk_stats({"frames": 600, "media_seconds": 20.0, "wall_seconds": 4.0}) == \
+        "600 frames in 4.0s - 150 fps, 5.00x"
+
+
+def test_batch_shares_one_pool_and_rejoins_each_file(make_clip, stream_info, tmp_path):
+    first = make_clip("first.mp4", seconds=6, gop=30)
+    second = make_clip("second.mp4", seconds=3, gop=30, audio=False)
+    outputs = {str(first): tmp_path / "out" / "first.mp4", str(second): tmp_path / "out" / "second.mp4"}
+    results = encode_files([(src, str(dst)) for src, dst in outputs.items()], vf="crop=160:80:0:5",
+                           preset="ultrafast", chunk_seconds=2, workers=2, threads_per_chunk=1)
+
+    assert results[str(first)]["chunks"] == 3
+    assert results[str(first)]["frames"] == 180
+    assert results[str(second)]["chunks"] == 2
+    assert results[str(second)]["frames"] == 90
+    assert stream_info(outputs[str(first)]) == (180, True)
+    assert stream_info(outputs[str(second)]) == (90, False)
+    # Chunk work directories are removed
+    assert sorted(p.name for p in (tmp_path / "out").iterdir()) == ["first.mp4", "second.mp4"]
+
+
+def test_a_broken_input_fails_only_its_own_file(make_clip, tmp_path, capsys):
+    good = make_clip("good.mp4", seconds=2, audio=False)
+    broken = tmp_path / "broken.mp4"
+    broken.write_bytes(b"not a video")
+    results = encode_files([(str(broken), str(tmp_path / "out" / "broken.mp4")),
+                            (str(good), str(tmp_path / "out" / "good.mp4"))],
+                           preset="ultrafast", workers=1, threads_per_chunk=1)
+    assert results[str(broken)] is None
+    assert results[str(good)]["frames"] == 60
+    assert "✗ Split failed: broken.mp4" in capsys.readouterr().out
+
+
+def test_encode_chunked_raises_on_failure(tmp_path):
+    with pytest.raises(FFmpegError, match="Chunked encode failed"):
+        encode_chunked(tmp_path / "missing.mp4", tmp_path / "out.mp4", workers=1)
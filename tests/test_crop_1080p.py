@@ -0,0 +1,48 @@
+import pytest
+
+from crop_1080p import bitstream_filter, crop_units, parse_crop
+
+
+def stream(**overrides):
+    info = {"codec": "h264", "width": 1920, "height": 1088, "coded_width": 1920,
+            "coded_height": 1088, "pix_fmt": "yuv420p", "field_order": "progressive"}
+    info.update(overrides)
+    return info
+
+
+def test_parse_crop():
+    assert parse_crop("1920:1080:0:4") == (1920, 1080, 0, 4)
+
+
+def test_crop_units():
+    assert crop_units(stream()) == (2, 2)
+    assert crop_units(stream(pix_fmt="yuv422p10le")) == (2, 1)
+    assert crop_units(stream(pix_fmt="yuv444p")) == (1, 1)
+    assert crop_units(stream(pix_fmt="rgb24")) is None
+
+
+def test_crop_units_interlaced_h264_crops_field_pairs():
+    assert crop_units(stream(field_order="tt")) == (2, 4)
+    assert crop_units(stream(codec="hevc", field_order="tt")) == (2, 2)
+
+
+def test_bottom_crop():
+    assert bitstream_filter(stream(), (1920, 1080, 0, 0)) == ("h264_metadata=crop_bottom=8", "")
+
+
+def test_centred_crop_sets_each_nonzero_edge():
+    bsf, reason = bitstream_filter(stream(codec="hevc"), (1916, 1080, 2, 4))
+    assert bsf == "hevc_metadata=crop_left=2:crop_right=2:crop_top=4:crop_bottom=4"
+    assert reason == ""
+
+
+@pytest.mark.parametrize("info, crop, reason", [
+    (stream(codec="vp9"), (1920, 1080, 0, 0), "vp9 has no metadata bitstream filter"),
+    (stream(coded_height=1088, height=1080), (1920, 1080, 0, 0), "stream already has a crop window"),
+    (stream(pix_fmt="rgb24"), (1920, 1080, 0, 0), "unknown chroma layout rgb24"),
+    (stream(), (1920, 1080, 0, 10), "crop 1920x1080+0+10 is outside the 1920x1088 frame"),
+    (stream(), (1920, 1080, 0, 3), "top crop of 3px is not a multiple of 2"),
+    (stream(field_order="tb"), (1920, 1080, 0, 2), "top crop of 2px is not a multiple of 4"),
+])
+def test_unsupported_crops(info, crop, reason):
+    assert bitstream_filter(info, crop) == (None, reason)
@@ -0,0 +1,155 @@
+import os
+import threading
+import time
+
+import fal_cache
+
+
+def test_cache_path_follows_env(tmp_path, monkeypatch):
+    monkeypatch.setenv("FAL_CACHE_DIR", str(tmp_path / "elsewhere"))
+    assert fal_cache.cache_path() == tmp_path / "elsewhere" / "fal_cache.sqlite"
+    fal_cache.connect()
+    assert fal_cache.cache_path().exists()
+
+
+def test_file_sha256_is_memoised_by_size_and_mtime(tmp_path, monkeypatch):
+    path = tmp_path / "clip.mp4"
+    path.write_bytes(b"frames")
+    first = fal_cache.file_sha256(path)
+    assert first == fal_cache.file_sha256(str(path))
+
+    def no_reads(*args, **kwargs):
+        raise AssertionError("unchanged file was read again")
+    monkeypatch.setattr(fal_cache, "open", no_reads, raising=False)
+    assert fal_cache.file_sha256(path) == first
+    monkeypatch.delattr(fal_cache, "open")
+
+    path.write_bytes(b"other frames")
+    assert fal_cache.file_sha256(path) != first
+
+
+def test_upload_lookup_respects_expiry():
+    fal_cache.record_upload("abc", "https://fal.media/abc.mp4", 10)
+    assert fal_cache.lookup_upload("abc") == "https://fal.media/abc.mp4"
+    assert fal_cache.lookup_upload("missing") is None
+
+    # Too close to expiry to hand to a queued job
+    fal_cache.record_upload("abc", "https://fal.media/abc.mp4", 10,
+                            ttl_seconds=fal_cache.MIN_REMAINING_SECONDS - 60)
+    assert fal_cache.lookup_upload("abc") is None
+
+
+def test_forget_upload_by_hash_or_url():
+    fal_cache.record_upload("one", "https://fal.media/1", 1)
+    fal_cache.record_upload("two", "https://fal.media/2", 1)
+    fal_cache.forget_upload(sha256="one")
+    fal_cache.forget_upload(url="https://fal.media/2")
+    assert fal_cache.lookup_upload("one") is None
+    assert fal_cache.lookup_upload("two") is None
+
+
+def test_prune_drops_expired_uploads_and_deleted_files(tmp_path):
+    kept, gone = tmp_path / "kept.png", tmp_path / "gone.png"
+    kept.write_bytes(b"a")
+    gone.write_bytes(b"b")
+    fal_cache.file_sha256(kept)
+    fal_cache.file_sha256(gone)
+    gone.unlink()
+    fal_cache.record_upload("old", "https://fal.media/old", 1, ttl_seconds=-1)
+    fal_cache.record_upload("new", "https://fal.media/new", 1)
+
+    fal_cache.prune()
+    conn = fal_cache.connect()
+    assert [row[0] for row in conn.execute("SELECT sha256 FROM uploads")] == ["new"]
+    assert [row[0] for row in conn.execute("SELECT path FROM file_hashes")] == [str(kept.resolve())]
+
+
+def test_connect_prunes_when_due():
+    conn = fal_cache.connect()
+    fal_cache.record_upload("old", "https://fal.media/old", 1, ttl_seconds=-1)
+    with conn:
+        conn.execute("UPDATE meta SET value = ? WHERE name = 'last_prune'",
+                     (time.time() - fal_cache.PRUNE_INTERVAL_SECONDS - 1,))
+    # A fresh connection (another thread) runs the overdue prune
+    thread = threading.Thread(target=fal_cache.connect)
+    thread.start()
+    thread.join()
+    assert conn.execute("SELECT COUNT(*) FROM uploads").fetchone()[0] == 0
+
+
+def test_connection_is_per_thread():
+    conns = []
+    thread = threading.Thread(target=lambda: conns.append(fal_cache.connect()))
+    thread.start()
+    thread.join()
+    assert fal_cache.connect() is fal_cache.connect()
+    assert conns[0] is not fal_cache.connect()
+
+
+def test_hash_is_cached_across_threads(tmp_path):
+    path = tmp_path / "shared.png"
+    path.write_bytes(os.urandom(1024))
+    digests = []
+    threads = [threading.Thread(target=lambda: digests.append(fal_cache.file_sha256(path))) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(set(digests)) == 1
+
+
+def test_result_key_changes_with_any_input():
+    base = fal_cache.result_key("sha", "fal-ai/clarity-upscaler", {"scale": 2})
+    assert base == fal_cache.result_key("sha", "fal-ai/clarity-upscaler", {"scale": 2})
+    assert base == fal_cache.result_key("sha", "fal-ai/clarity-upscaler", {"scale": 2}, {})
+    assert len({
+        base,
+        fal_cache.result_key("other", "fal-ai/clarity-upscaler", {"scale": 2}),
+        fal_cache.result_key("sha", "fal-ai/esrgan", {"scale": 2}),
+        fal_cache.result_key("sha", "fal-ai/clarity-upscaler", {"scale": 4}),
+        fal_cache.result_key("sha", "fal-ai/clarity-upscaler", {"scale": 2}, {"format": "webp"}),
+    }) == 5
+
+
+def test_result_key_ignores_argument_order():
+    assert (fal_cache.result_key("sha", "e", {"a": 1, "b": 2})
+            == fal_cache.result_key("sha", "e", {"b": 2, "a": 1}))
+
+
+def test_record_and_lookup_result(tmp_path):
+    output = tmp_path / "out_4K.png"
+    output.write_bytes(b"upscaled")
+    key = fal_cache.result_key("sha", "fal-ai/esrgan", {"scale": 4}, {"format": "png"})
+    fal_cache.record_result(key, "sha", "fal-ai/esrgan", {"scale": 4}, "https://fal.media/out.png",
+                            str(output), {"format": "png"})
+
+    entry = fal_cache.lookup_result(key)
+    assert entry["output_url"] == "https://fal.media/out.png"
+    assert entry["output_path"] == str(output.resolve())
+    assert fal_cache.output_is_current(entry)
+    assert fal_cache.result_url_is_live(entry)
+    assert fal_cache.lookup_result("unknown") is None
+
+    output.write_bytes(b"edited by hand")
+    assert not fal_cache.output_is_current(entry)
+    output.unlink()
+    assert not fal_cache.output_is_current(entry)
+
+    fal_cache.forget_result(key)
+    assert fal_cache.lookup_result(key) is None
+
+
+def test_result_url_expiry(tmp_path):
+    output = tmp_path / "out.png"
+    output.write_bytes(b"x")
+    fal_cache.record_result("k", "sha", "e", {}, "https://fal.media/out.png", str(output), ttl_seconds=-1)
+    assert not fal_cache.result_url_is_live(fal_cache.lookup_result("k"))
+
+
+def test_lookup_result_leaves_connection_rows_as_tuples(tmp_path):
+    output = tmp_path / "out.png"
+    output.write_bytes(b"x")
+    fal_cache.record_result("k", "sha", "e", {}, "https://fal.media/out.png", str(output))
+    fal_cache.lookup_result("k")
+    row = fal_cache.connect().execute("SELECT key FROM results").fetchone()
+    assert row == ("k",)
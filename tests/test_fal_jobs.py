@@ -0,0 +1,203 @@
+import time
+
+import fal_client
+import httpx
+import pytest
+from fal_client.client import FalClientHTTPError
+
+import fal_jobs
+import http_download
+from fal_jobs import RETRY_MAX_SECONDS, FalJob, FalPipeline, backoff_delay, is_rejected_input, is_transient
+
+
+class StatusError(Exception):
+    def __init__(self, status_code):
+        super().__init__(f"HTTP {status_code}")
+        self.status_code = status_code
+
+
+class FakeHandler:
+    def __init__(self, request_id, events=(), result=None):
+        self.request_id = request_id
+        self.events = events
+        self.result = result or {"image": {"url": f"https://fal.media/out/{request_id}.png"}}
+        self.cancelled = False
+
+    def iter_events(self, with_logs=False, interval=1.0):
+        for event in self.events:
+            if callable(event):
+                event = event()
+            yield event
+        yield fal_client.Completed(logs=None, metrics={"inference_time": 0.1})
+
+    def get(self):
+        return self.result
+
+    def cancel(self):
+        self.cancelled = True
+
+
+@pytest.fixture
+def fal(monkeypatch):
+    """Fake fal: uploads and downloads are local, submit() is scripted per test"""
+    state = {"submits": 0, "handlers": [], "submit": None}
+
+    def submit(endpoint, arguments):
+        state["submits"] += 1
+        handler = state["submit"](state["submits"], arguments)
+        state["handlers"].append(handler)
+        return handler
+
+    def download_file(url, output_path, on_data=None):
+        with open(output_path, "wb") as f:
+            f.write(url.encode())
+        return http_download.DownloadResult(output_path, len(url), 0.0, "")
+
+    monkeypatch.setattr(fal_client, "submit", submit)
+    monkeypatch.setattr(fal_jobs, "upload_file", lambda path, use_cache=True: f"https://fal.media/in/{path}")
+    monkeypatch.setattr(fal_jobs, "download_file", download_file)
+    monkeypatch.setattr(fal_jobs, "backoff_delay", lambda attempt: 0.0)
+    return state
+
+
+def make_jobs(tmp_path, count=1):
+    return [FalJob(input_path=f"in{i}.png", endpoint="fal-ai/test", output_path=str(tmp_path / f"out{i}.png"))
+            for i in range(count)]
+
+
+def run(jobs, **options):
+    return FalPipeline(verbose=False, use_cache=False, **options).run(jobs)
+
+
+def test_backoff_delay_is_full_jitter_within_cap():
+    for attempt in range(1, 12):
+        ceiling = min(RETRY_MAX_SECONDS, fal_jobs.RETRY_BASE_SECONDS * 2 ** (attempt - 1))
+        delays = [backoff_delay(attempt) for _ in range(200)]
+        assert all(0 <= delay <= ceiling for delay in delays)
+    assert max(backoff_delay(20) for _ in range(200)) <= RETRY_MAX_SECONDS
+
+
+@pytest.mark.parametrize("error", [
+    httpx.ConnectError("refused"),
+    httpx.ReadTimeout("slow"),
+    ConnectionResetError(),
+    TimeoutError(),
+    StatusError(429),
+    StatusError(503),
+    httpx.HTTPStatusError("bad gateway", request=httpx.Request("GET", "https://fal.run"),
+                          response=httpx.Response(502)),
+])
+def test_is_transient(error):
+    assert is_transient(error)
+
+
+@pytest.mark.parametrize("error", [
+    StatusError(400),
+    StatusError(404),
+    StatusError(422),
+    ValueError("No output URL in result"),
+    httpx.HTTPStatusError("not found", request=httpx.Request("GET", "https://fal.run"),
+                          response=httpx.Response(404)),
+])
+def test_is_not_transient(error):
+    assert not is_transient(error)
+
+
+def test_transient_submit_errors_are_retried(fal, tmp_path):
+    def submit(number, arguments):
+        if number < 3:
+            raise StatusError(503)
+        return FakeHandler(f"req-{number}")
+    fal["submit"] = submit
+
+    [job] = run(make_jobs(tmp_path))
+    assert job.ok, job.error
+    assert fal["submits"] == 3
+    assert job.request_id == "req-3"
+
+
+def test_retries_are_bounded(fal, tmp_path):
+    def submit(number, arguments):
+        raise StatusError(503)
+    fal["submit"] = submit
+
+    [job] = run(make_jobs(tmp_path), retries=2)
+    assert not job.ok and "503" in job.error
+    assert fal["submits"] == 2
+    assert not job.retryable
+
+
+def test_permanent_errors_are_not_retried(fal, tmp_path):
+    def submit(number, arguments):
+        raise StatusError(422)
+    fal["submit"] = submit
+
+    [job] = run(make_jobs(tmp_path))
+    assert not job.ok
+    assert fal["submits"] == 1
+
+
+def test_job_timeout_cancels_request(fal, tmp_path):
+    def queued():
+        time.sleep(0.02)
+        return fal_client.Queued(position=3)
+    fal["submit"] = lambda number, arguments: FakeHandler(f"req-{number}", events=[queued] * 1000)
+
+    [job] = run(make_jobs(tmp_path), job_timeout=0.1)
+    assert not job.ok and job.retryable
+    assert "Job deadline" in job.error
+    assert fal["handlers"][0].cancelled
+
+
+def test_batch_timeout_skips_unsent_jobs(fal, tmp_path):
+    def queued():
+        time.sleep(0.02)
+        return fal_client.Queued(position=1)
+    fal["submit"] = lambda number, arguments: FakeHandler(f"req-{number}", events=[queued] * 1000)
+
+    jobs = run(make_jobs(tmp_path, 3), fal_workers=1, batch_timeout=0.2)
+    assert all(job.retryable and not job.ok for job in jobs)
+    assert fal["submits"] == 1
+    assert fal["handlers"][0].cancelled
+
+
+def http_error(status, detail, error_type=None):
+    return FalClientHTTPError(detail, status, {}, httpx.Response(status), error_type)
+
+
+def test_rejected_input_needs_fal_download_error():
+    download_failed = [{"loc": ["body", "image_url"], "msg": "Failed to download the file.",
+                        "type": "file_download_error"}]
+    assert is_rejected_input(http_error(422, download_failed), "image_url")
+    assert is_rejected_input(http_error(422, "Failed to download", "file_download_error"), "image_url")
+    # Same error on another argument, or a different error on the URL
+    assert not is_rejected_input(http_error(422, download_failed), "video_url")
+    assert not is_rejected_input(http_error(422, [{"loc": ["body", "image_url"], "msg": "Image too large",
+                                                   "type": "image_too_large"}]), "image_url")
+
+
+@pytest.mark.parametrize("error", [
+    http_error(500, "could not fetch the model weights"),
+    http_error(400, "invalid url in prompt"),
+    http_error(422, "download the image at a lower scale"),
+    ValueError("download failed"),
+])
+def test_model_errors_mentioning_urls_are_not_rejected_input(error):
+    assert not is_rejected_input(error, "image_url")
+
+
+def test_rejected_input_forgets_cached_upload(fal, tmp_path, monkeypatch):
+    forgotten = []
+    monkeypatch.setattr(fal_jobs.fal_cache, "forget_upload", lambda url=None: forgotten.append(url))
+
+    def submit(number, arguments):
+        raise http_error(422, [{"loc": ["body", "image_url"], "msg": "Failed to download the file.",
+                                "type": "file_download_error"}])
+    fal["submit"] = submit
+
+    source = tmp_path / "in.png"
+    source.write_bytes(b"pixels")
+    job = FalJob(input_path=str(source), endpoint="fal-ai/test", output_path=str(tmp_path / "out.png"))
+    FalPipeline(verbose=False, use_cache=True).run([job])
+    assert not job.ok
+    assert forgotten == [job.upload_url]
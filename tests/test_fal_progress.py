@@ -0,0 +1,115 @@
+import json
+import types
+
+import pytest
+
+import fal_progress
+from fal_jobs import FalJob
+from fal_progress import THROUGHPUT_WINDOW, ProgressTracker, format_duration
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = types.SimpleNamespace(value=1000.0)
+    monkeypatch.setattr(fal_progress, "time", types.SimpleNamespace(time=lambda: now.value))
+    return now
+
+
+def job(name="in.png", **fields):
+    return FalJob(input_path=name, endpoint="fal-ai/test", output_path=f"out_{name}", **fields)
+
+
+def read(path):
+    return [json.loads(line) for line in path.read_text().splitlines()]
+
+
+def test_format_duration():
+    assert format_duration(42.4) == "42s"
+    assert format_duration(125) == "2m05s"
+    assert format_duration(3 * 3600 + 7 * 60 + 30) == "3h07m"
+
+
+def test_metrics_default_next_to_the_cache(tmp_path, monkeypatch):
+    monkeypatch.delenv("FAL_METRICS_FILE", raising=False)
+    assert fal_progress.metrics_path() == tmp_path / "cache" / "fal_metrics.jsonl"
+    monkeypatch.setenv("FAL_METRICS_FILE", "")
+    assert fal_progress.metrics_path() is None
+
+
+def test_counts_follow_job_states(tmp_path):
+    tracker = ProgressTracker(3, path=tmp_path / "m.jsonl")
+    jobs = [job(f"{i}.png") for i in range(3)]
+    tracker.update(jobs[0], "queued")
+    tracker.update(jobs[1], "queued")
+    tracker.update(jobs[1], "running")
+    assert tracker.counts() == {"uploading": 0, "queued": 1, "running": 1, "downloading": 0, "postprocessing": 0}
+    tracker.finish(jobs[1])
+    assert tracker.counts()["running"] == 0
+    assert tracker.status_line().startswith("Batch: 1/3 done, 1 queued, 0 running")
+
+
+def test_eta_from_batch_average_until_window_fills(tmp_path, clock):
+    tracker = ProgressTracker(10, path=tmp_path / "m.jsonl")
+    assert tracker.eta() is None
+    assert tracker.status_line().endswith("ETA estimating...")
+    clock.value += 30
+    tracker.finish(job())
+    clock.value += 30
+    tracker.finish(job())
+    assert tracker.throughput() == pytest.approx(2 / 60)
+    assert tracker.eta() == pytest.approx(240)
+    assert tracker.status_line() == "Batch: 2/10 done, 0 queued, 0 running, 2.0/min, ETA 4m00s"
+
+
+def test_throughput_rolls_over_recent_completions(tmp_path, clock):
+    tracker = ProgressTracker(100, path=tmp_path / "m.jsonl")
+    # A slow start, then one completion every 5s
+    clock.value += 600
+    for _ in range(THROUGHPUT_WINDOW + 1):
+        tracker.finish(job())
+        clock.value += 5
+    assert tracker.throughput() == pytest.approx(1 / 5)
+
+
+def test_cached_failed_and_cancelled_jobs_do_not_count_towards_throughput(tmp_path, clock):
+    path = tmp_path / "m.jsonl"
+    tracker = ProgressTracker(4, concurrency=2, path=path)
+    clock.value += 10
+    tracker.finish(job("cached.png", cached="output", output_url="file:///out"))
+    tracker.finish(job("failed.png", error="HTTP 500"))
+    tracker.finish(job("cancelled.png", error="Cancelled at batch deadline", retryable=True))
+    assert tracker.throughput() is None
+    assert (tracker.finished, tracker.failed, tracker.cancelled) == (3, 1, 1)
+    assert tracker.status_line().startswith("Batch: 3/4 done, 1 failed, 1 cancelled")
+    assert [record["status"] for record in read(path)] == ["cached_output", "error", "cancelled"]
+
+
+def test_job_and_batch_records(tmp_path, clock):
+    path = tmp_path / "m.jsonl"
+    tracker = ProgressTracker(2, concurrency=4, path=path)
+    first = job("a.png", request_id="req-1", timings={"queue": 12.0, "inference": 30.0})
+    first.extra["queue_positions"] = [5, 7, 2]
+    clock.value += 60
+    tracker.finish(first)
+    tracker.finish(job("b.png", timings={"queue": 4.0, "inference": 20.0}))
+    tracker.close()
+
+    job_record, _, batch = read(path)
+    assert job_record["batch_id"] == batch["batch_id"] == tracker.batch_id
+    assert {key: job_record[key] for key in ("type", "input", "request_id", "status", "concurrency",
+                                             "first_queue_position", "max_queue_position",
+                                             "queue_seconds", "inference_seconds")} == {
+        "type": "job", "input": "a.png", "request_id": "req-1", "status": "ok", "concurrency": 4,
+        "first_queue_position": 5, "max_queue_position": 7, "queue_seconds": 12.0, "inference_seconds": 30.0}
+    assert {key: batch[key] for key in ("type", "jobs", "failed", "wall_seconds", "jobs_per_minute",
+                                        "mean_queue_seconds", "mean_inference_seconds")} == {
+        "type": "batch", "jobs": 2, "failed": 0, "wall_seconds": 60.0, "jobs_per_minute": 2.0,
+        "mean_queue_seconds": 8.0, "mean_inference_seconds": 25.0}
+
+
+def test_unwritable_metrics_are_ignored(tmp_path):
+    (tmp_path / "file").write_text("")
+    tracker = ProgressTracker(1, path=tmp_path / "file" / "m.jsonl")
+    tracker.finish(job())
+    tracker.close()
+    assert tracker.finished == 1
@@ -0,0 +1,48 @@
+from pathlib import Path
+
+import pytest
+
+from ffmpeg_utils import FFmpegError, FFmpegInterrupted, concat_copy, killed_by_signal, run_ffmpeg, split_at_keyframes
+
+
+def test_split_cuts_on_keyframes(make_clip, stream_info, tmp_path):
+    clip = make_clip(seconds=6, fps=30, gop=30)
+    segments = split_at_keyframes(clip, tmp_path / "segments", 2.0)
+    assert [Path(s).name for s in segments] == [f"clip_seg{i:04d}.mp4" for i in range(3)]
+    counts = [stream_info(s) for s in segments]
+    assert [frames for frames, _ in counts] == [60, 60, 60]
+    assert not any(audio for _, audio in counts)
+
+
+def test_split_snaps_to_sparse_keyframes(make_clip, stream_info, tmp_path):
+    # Keyframes every 3s: 1s segments can only be cut at 3s
+    clip = make_clip(seconds=6, fps=30, gop=90, audio=False)
+    segments = split_at_keyframes(clip, tmp_path / "segments", 1.0)
+    assert [stream_info(s)[0] for s in segments] == [90, 90]
+
+
+def test_concat_rejoins_segments_with_source_audio(make_clip, stream_info, tmp_path):
+    clip = make_clip(seconds=6)
+    segments = split_at_keyframes(clip, tmp_path / "segments", 2.0)
+    output = tmp_path / "out" / "joined.mp4"
+    concat_copy(segments, output, audio_from=clip)
+    assert stream_info(output) == (180, True)
+    assert sorted(p.name for p in output.parent.iterdir()) == ["joined.mp4"]
+
+
+def test_concat_without_audio(make_clip, stream_info, tmp_path):
+    clip = make_clip(seconds=4)
+    segments = split_at_keyframes(clip, tmp_path / "segments", 2.0)
+    concat_copy(segments, tmp_path / "joined.mp4")
+    assert stream_info(tmp_path / "joined.mp4") == (120, False)
+
+
+def test_run_ffmpeg_raises_with_stderr(make_clip, tmp_path):
+    with pytest.raises(FFmpegError, match="No such file") as error:
+        run_ffmpeg(["-i", tmp_path / "missing.mp4", tmp_path / "out.mp4"])
+    assert not isinstance(error.value, FFmpegInterrupted)
+
+
+@pytest.mark.parametrize("returncode, interrupted", [(-2, True), (-9, True), (255, True), (1, False), (0, False)])
+def test_killed_by_signal(returncode, interrupted):
+    assert killed_by_signal(returncode) is interrupted
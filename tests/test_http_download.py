@@ -0,0 +1,100 @@
+import hashlib
+
+import httpx
+import pytest
+
+import http_download
+from http_download import DownloadError, download, fetch_bytes
+
+BODY = bytes(range(256)) * 64
+
+
+class Server:
+    """Serves BODY with HEAD and Range support; scripted failures per path"""
+
+    def __init__(self):
+        self.requests = []
+        self.status = {}
+
+    def __call__(self, request):
+        self.requests.append(request)
+        path = request.url.path
+        if path in self.status:
+            return httpx.Response(self.status[path])
+        headers = {"content-length": str(len(BODY)), "accept-ranges": "bytes", "etag": '"v1"'}
+        if request.method == "HEAD":
+            return httpx.Response(200, headers=headers)
+        range_header = request.headers.get("range")
+        if range_header and request.headers.get("if-range", '"v1"') == '"v1"':
+            start, _, end = range_header.removeprefix("bytes=").partition("-")
+            start, end = int(start), int(end) if end else len(BODY) - 1
+            headers["content-length"] = str(end - start + 1)
+            return httpx.Response(206, headers=headers, content=BODY[start:end + 1])
+        return httpx.Response(200, headers=headers, content=BODY)
+
+    def count(self, method, path):
+        return sum(1 for r in self.requests if r.method == method and r.url.path == path)
+
+
+@pytest.fixture
+def server(monkeypatch):
+    server = Server()
+    monkeypatch.setattr(http_download, "_client", httpx.Client(transport=httpx.MockTransport(server)))
+    monkeypatch.setattr(http_download.time, "sleep", lambda seconds: None)
+    return server
+
+
+def test_download(server, tmp_path):
+    result = download("https://fal.media/out.mp4", tmp_path / "out.mp4")
+    assert (tmp_path / "out.mp4").read_bytes() == BODY
+    assert result.size == len(BODY)
+    assert result.sha256 == hashlib.sha256(BODY).hexdigest()
+    assert not (tmp_path / "out.mp4.part").exists()
+
+
+def test_resumes_part_file(server, tmp_path):
+    part = tmp_path / "out.mp4.part"
+    part.write_bytes(BODY[:1000])
+    http_download._save_state(part, {"validator": '"v1"'})
+
+    result = download("https://fal.media/out.mp4", tmp_path / "out.mp4")
+    assert (tmp_path / "out.mp4").read_bytes() == BODY
+    assert result.resumed_bytes == 1000
+    get = next(r for r in server.requests if r.method == "GET")
+    assert get.headers["range"] == "bytes=1000-"
+
+
+def test_parallel_ranges(server, tmp_path, monkeypatch):
+    monkeypatch.setattr(http_download, "PARALLEL_THRESHOLD", 1024)
+    monkeypatch.setattr(http_download, "PARALLEL_PART_SIZE", 4096)
+    result = download("https://fal.media/out.mp4", tmp_path / "out.mp4", connections=3)
+    assert result.parallel
+    assert (tmp_path / "out.mp4").read_bytes() == BODY
+    assert server.count("GET", "/out.mp4") == len(BODY) // 4096
+
+
+@pytest.mark.parametrize("status", [404, 410, 403])
+def test_permanent_errors_fail_without_retrying(server, tmp_path, status):
+    server.status["/gone.mp4"] = status
+    with pytest.raises(DownloadError) as error:
+        download("https://fal.media/gone.mp4", tmp_path / "out.mp4")
+    assert error.value.status == status and error.value.permanent
+    assert server.count("GET", "/gone.mp4") == 1
+
+    with pytest.raises(DownloadError):
+        fetch_bytes("https://fal.media/gone.mp4")
+    assert server.count("GET", "/gone.mp4") == 2
+
+
+@pytest.mark.parametrize("status", [408, 429, 503])
+def test_retryable_errors_are_retried(server, tmp_path, status):
+    server.status["/busy.mp4"] = status
+    with pytest.raises(DownloadError, match="after 3 attempts"):
+        download("https://fal.media/busy.mp4", tmp_path / "out.mp4")
+    assert server.count("GET", "/busy.mp4") == 3
+
+
+def test_fetch_bytes(server):
+    chunks = []
+    assert fetch_bytes("https://fal.media/out.png", on_data=lambda chunk, offset: chunks.append(offset)) == BODY
+    assert chunks[0] == 0
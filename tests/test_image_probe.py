@@ -0,0 +1,98 @@
+import struct
+
+import pytest
+
+from image_probe import StreamProbe, UnknownImageFormat, image_size, probe_bytes, sniff_format
+
+
+def png(width, height):
+    return (b'\x89PNG\r\n\x1a\n' + struct.pack('>I', 13) + b'IHDR'
+            + struct.pack('>IIBBBBB', width, height, 8, 2, 0, 0, 0) + b'\0' * 4)
+
+
+def gif(width, height):
+    return b'GIF89a' + struct.pack('<HH', width, height) + b'\0' * 8
+
+
+def webp(chunk, payload):
+    body = b'WEBP' + chunk + struct.pack('<I', len(payload)) + payload
+    return b'RIFF' + struct.pack('<I', len(body)) + body
+
+
+def jpeg(width, height, progressive=False):
+    app0 = b'\xff\xe0' + struct.pack('>H', 16) + b'JFIF\0' + b'\0' * 9
+    sof = b'\xff' + (b'\xc2' if progressive else b'\xc0') + struct.pack('>HBHH', 17, 8, height, width)
+    return b'\xff\xd8' + app0 + sof + b'\0' * 15 + b'\xff\xd9'
+
+
+def test_sniff_format():
+    assert sniff_format(png(1, 1)) == 'png'
+    assert sniff_format(gif(1, 1)) == 'gif'
+    assert sniff_format(jpeg(1, 1)) == 'jpeg'
+    assert sniff_format(webp(b'VP8X', b'\0' * 10)) == 'webp'
+    assert sniff_format(b'hello world!') is None
+
+
+@pytest.mark.parametrize("data", [
+    png(3840, 2160),
+    gif(3840, 2160),
+    jpeg(3840, 2160),
+    jpeg(3840, 2160, progressive=True),
+    # VP8 keyframe: frame tag, start code, 14-bit sizes (top bits are scale)
+    webp(b'VP8 ', b'\0' * 3 + b'\x9d\x01\x2a' + struct.pack('<HH', 3840 | 0x4000, 2160)),
+    # VP8L: signature, then width-1 and height-1 packed in 14 bits each
+    webp(b'VP8L', b'\x2f' + struct.pack('<I', (3840 - 1) | (2160 - 1) << 14) + b'\0' * 8),
+    # VP8X: flags, reserved, 24-bit width-1 and height-1
+    webp(b'VP8X', b'\0' * 4 + (3840 - 1).to_bytes(3, 'little') + (2160 - 1).to_bytes(3, 'little')),
+])
+def test_probe_bytes(data):
+    assert probe_bytes(data) == (3840, 2160)
+
+
+def test_jpeg_skips_fill_bytes_and_standalone_markers():
+    data = jpeg(640, 480)
+    data = data[:2] + b'\xff\xff\xd0' + data[2:]
+    assert probe_bytes(data) == (640, 480)
+
+
+def test_truncated_header_needs_more_bytes():
+    assert probe_bytes(png(640, 480)[:11]) is None
+    assert probe_bytes(png(640, 480)[:20]) is None
+    assert probe_bytes(jpeg(640, 480)[:25]) is None
+
+
+def test_unknown_data_raises():
+    with pytest.raises(UnknownImageFormat):
+        probe_bytes(b'not an image at all')
+    with pytest.raises(UnknownImageFormat):
+        probe_bytes(b'\xff\xd8\xff\xd9' + b'\0' * 10)
+
+
+def test_image_size(tmp_path):
+    path = tmp_path / "frame.jpg"
+    path.write_bytes(jpeg(1920, 1080))
+    assert image_size(path) == (1920, 1080)
+
+    path.write_bytes(png(20, 10) + b'\0' * 100)
+    assert image_size(str(path)) == (20, 10)
+
+    path.write_bytes(png(20, 10)[:16])
+    with pytest.raises(UnknownImageFormat):
+        image_size(path)
+
+
+def test_stream_probe_uses_contiguous_prefix_only():
+    data = jpeg(1280, 720)
+    probe = StreamProbe()
+    probe.feed(data[20:], offset=20)  # a parallel range arriving early
+    assert probe.dimensions is None and not probe.done
+    probe.feed(data[:10])
+    probe.feed(data[10:], offset=10)
+    assert probe.dimensions == (1280, 720)
+    assert probe.done
+
+
+def test_stream_probe_gives_up_on_non_images():
+    probe = StreamProbe()
+    probe.feed(b'<html>not found</html>')
+    assert probe.done and probe.dimensions is None
@@ -0,0 +1,95 @@
+import io
+
+import numpy as np
+import pytest
+from PIL import Image
+
+from image_tiles import TileStitcher, _ramp, _starts, split_tiles, tile_boxes
+
+
+def test_starts_single_tile_when_it_fits():
+    assert _starts(500, 1024, 64) == [0]
+    assert _starts(1024, 1024, 64) == [0]
+
+
+def test_starts_last_tile_flush_with_edge():
+    assert _starts(2500, 1024, 64) == [0, 960, 1476]
+
+
+def test_tile_boxes_cover_image_with_overlap():
+    boxes = tile_boxes(2500, 1000, tile_size=1024, overlap=64)
+    assert boxes == [(0, 0, 1024, 1000), (960, 0, 1984, 1000), (1476, 0, 2500, 1000)]
+
+    covered = np.zeros((1000, 2500), dtype=int)
+    for left, top, right, bottom in boxes:
+        covered[top:bottom, left:right] += 1
+    assert covered.min() >= 1
+
+
+def test_tile_boxes_rejects_overlap_as_large_as_tile():
+    with pytest.raises(ValueError):
+        tile_boxes(100, 100, tile_size=64, overlap=64)
+
+
+def test_ramp():
+    weights = _ramp(10, 3, 2)
+    np.testing.assert_allclose(weights[:3], [0.25, 0.5, 0.75])
+    np.testing.assert_allclose(weights[3:8], 1.0)
+    np.testing.assert_allclose(weights[8:], [2 / 3, 1 / 3])
+    assert (_ramp(5, 0, 0) == 1.0).all()
+
+
+def test_split_tiles(tmp_path):
+    source = tmp_path / "shot.png"
+    Image.new("RGB", (300, 200), (10, 20, 30)).save(source)
+
+    size, tiles = split_tiles(source, tmp_path / "tiles", tile_size=128, overlap=16)
+    assert size == (300, 200)
+    assert [box for box, _ in tiles] == tile_boxes(300, 200, 128, 16)
+    for (left, top, right, bottom), path in tiles:
+        with Image.open(path) as tile:
+            assert tile.size == (right - left, bottom - top)
+
+
+def test_stitch_round_trip_is_seamless():
+    rng = np.random.default_rng(0)
+    pixels = rng.integers(0, 256, size=(200, 300, 3), dtype=np.uint8)
+    image = Image.fromarray(pixels)
+    scale = 2
+    expected = np.asarray(image.resize((600, 400), Image.NEAREST))
+
+    stitcher = TileStitcher(image.size, scale, overlap=16)
+    for box in tile_boxes(300, 200, tile_size=128, overlap=16):
+        tile = image.crop(box)
+        stitcher.add(box, tile.resize((tile.width * scale, tile.height * scale), Image.NEAREST))
+
+    result = stitcher.result()
+    assert result.size == (600, 400)
+    np.testing.assert_array_equal(np.asarray(result), expected)
+
+
+def test_stitch_feathers_across_overlap():
+    # Two flat tiles of different colour: the overlap blends between them
+    stitcher = TileStitcher((200, 10), 1, overlap=40)
+    left_box, right_box = tile_boxes(200, 10, tile_size=120, overlap=40)
+    stitcher.add(left_box, Image.new("RGB", (120, 10), (0, 0, 0)))
+    stitcher.add(right_box, Image.new("RGB", (120, 10), (200, 200, 200)))
+
+    row = np.asarray(stitcher.result())[5, :, 0].astype(int)
+    assert (row[:80] == 0).all()
+    assert (row[120:] == 200).all()
+    blend = row[80:120]
+    assert (np.diff(blend) > 0).all()
+    assert 0 < blend[0] < blend[-1] < 200
+
+
+def test_stitch_accepts_encoded_bytes_and_resizes():
+    tile = Image.new("RGB", (50, 50), (255, 0, 0))
+    encoded = io.BytesIO()
+    tile.save(encoded, "PNG")
+
+    stitcher = TileStitcher((100, 100), 4, overlap=0)
+    stitcher.add((0, 0, 100, 100), encoded.getvalue())
+    result = np.asarray(stitcher.result())
+    assert result.shape == (400, 400, 3)
+    assert (result[..., 0] == 255).all() and (result[..., 1:] == 0).all()
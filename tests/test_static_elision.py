@@ -0,0 +1,74 @@
+import numpy as np
+
+from static_elision import Span, find_runs, plan_spans
+
+
+def frames(*levels):
+    return [np.full((4, 4), level, dtype=np.float32) for level in levels]
+
+
+def test_find_runs_groups_identical_frames():
+    assert find_runs(frames(0, 0, 0, 50, 50, 100)) == [(0, 3), (3, 5), (5, 6)]
+
+
+def test_find_runs_tolerates_noise_under_threshold():
+    assert find_runs(frames(10, 10.5, 9.5, 11), threshold=1.0) == [(0, 4)]
+
+
+def test_find_runs_compares_against_run_anchor():
+    # Each frame is within threshold of the previous one, but the drift is not
+    assert find_runs(frames(0, 0.8, 1.6, 2.4), threshold=1.0) == [(0, 2), (2, 4)]
+
+
+def test_find_runs_empty():
+    assert find_runs([]) == []
+
+
+def test_plan_spans_static_and_motion():
+    # 10 fps: static needs 20 frames, motion at least 10
+    runs = [(0, 30), (30, 31), (31, 32), (32, 45), (45, 70)]
+    assert plan_spans(runs, fps=10) == [
+        Span("static", 0, 30), Span("motion", 30, 45), Span("static", 45, 70),
+    ]
+
+
+def test_plan_spans_short_runs_are_motion():
+    runs = [(0, 5), (5, 12), (12, 15)]
+    assert plan_spans(runs, fps=10) == [Span("motion", 0, 15)]
+
+
+def test_plan_spans_short_motion_grows_into_next_static():
+    runs = [(0, 30), (30, 33), (33, 70)]
+    assert plan_spans(runs, fps=10) == [
+        Span("static", 0, 30), Span("motion", 30, 40), Span("static", 40, 70),
+    ]
+
+
+def test_plan_spans_short_motion_at_end_grows_backwards():
+    runs = [(0, 30), (30, 33)]
+    assert plan_spans(runs, fps=10) == [Span("static", 0, 23), Span("motion", 23, 33)]
+
+
+def test_plan_spans_trimmed_static_falls_back_to_motion():
+    # Growing the motion span leaves the static run under min_static
+    runs = [(0, 4), (4, 26)]
+    assert plan_spans(runs, fps=10) == [Span("motion", 0, 26)]
+
+
+def test_plan_spans_cover_every_frame():
+    rng = np.random.default_rng(1)
+    lengths = rng.integers(1, 40, size=50)
+    edges = np.concatenate([[0], np.cumsum(lengths)])
+    runs = list(zip(edges[:-1].tolist(), edges[1:].tolist()))
+
+    spans = plan_spans(runs, fps=10)
+    assert spans[0].start == 0 and spans[-1].end == edges[-1]
+    for previous, span in zip(spans, spans[1:]):
+        assert previous.end == span.start
+        assert not previous.kind == span.kind == "motion"
+    for span in spans:
+        assert span.end - span.start >= (20 if span.kind == "static" else 1)
+
+
+def test_span_seconds():
+    assert Span("static", 30, 90).seconds(30) == 2.0
@@ -0,0 +1,168 @@
+import shutil
+import types
+from pathlib import Path
+
+import pytest
+
+import upscale_to_4k
+from ffmpeg_utils import FFmpegError
+from upscale_to_4k import duration_tolerance, upscale_video_segmented, verify_segment
+
+
+def test_tolerance_is_two_frames_at_the_coarser_rate():
+    assert duration_tolerance({"fps": 25.0}, {"fps": 30.0}) == pytest.approx(0.08)
+    assert duration_tolerance({"fps": 60.0}, {"fps": 30.0}) == pytest.approx(2 / 30)
+    assert duration_tolerance({"fps": 0}, {"fps": None}) == pytest.approx(2 / 30)
+
+
+@pytest.fixture
+def probes(monkeypatch):
+    """Fake probe_video/check_timestamps from a {path name: (duration, fps)} table"""
+    table = {}
+    monkeypatch.setattr(upscale_to_4k, "probe_video",
+                        lambda path: {"duration": table[Path(path).name][0], "fps": table[Path(path).name][1]})
+    monkeypatch.setattr(upscale_to_4k, "check_timestamps",
+                        lambda path: round(table[Path(path).name][0] * table[Path(path).name][1]))
+    return table
+
+
+def test_segment_resampled_within_two_frames_passes(probes):
+    # 25fps source resampled to 30fps, ending one output frame early
+    probes.update({"seg.mp4": (10.0, 25.0), "seg_4K.mp4": (10.0 - 1 / 30, 30.0)})
+    assert verify_segment("seg.mp4", "seg_4K.mp4") == 299
+
+
+def test_segment_drifting_past_two_frames_fails(probes):
+    probes.update({"seg.mp4": (10.0, 25.0), "seg_4K.mp4": (9.9, 30.0)})
+    with pytest.raises(FFmpegError, match="duration 9.900s != source 10.000s"):
+        verify_segment("seg.mp4", "seg_4K.mp4")
+
+
+class CopyPipeline:
+    """Stands in for FalPipeline: each 'upscaled' segment is a copy of its source"""
+    runs = []
+
+    def __init__(self, **options):
+        pass
+
+    def run(self, jobs, on_result=None):
+        CopyPipeline.runs.append([Path(job.input_path).name for job in jobs])
+        for index, job in enumerate(jobs):
+            Path(job.output_path).parent.mkdir(parents=True, exist_ok=True)
+            shutil.copy(job.input_path, job.output_path)
+            job.output_url = Path(job.output_path).as_uri()
+            if on_result:
+                on_result(index, job)
+        return jobs
+
+
+@pytest.fixture
+def segmented(monkeypatch, stream_info):
+    """Run upscale_video_segmented locally, probing with ffmpeg instead of ffprobe"""
+    CopyPipeline.runs = []
+    frame_counts = {}
+
+    def probe(path):
+        frames, audio = stream_info(path)
+        return {"duration": frames / 30, "fps": 30.0, "has_audio": audio, "width": 160, "height": 90}
+
+    def timestamps(path):
+        return frame_counts.get(Path(path).name, stream_info(path)[0])
+
+    monkeypatch.setattr(upscale_to_4k, "configure_api_key", lambda: True)
+    monkeypatch.setattr(upscale_to_4k, "require_ffmpeg", lambda: None)
+    monkeypatch.setattr(upscale_to_4k, "FalPipeline", CopyPipeline)
+    monkeypatch.setattr(upscale_to_4k, "probe_video", probe)
+    monkeypatch.setattr(upscale_to_4k, "check_timestamps", timestamps)
+    return frame_counts
+
+
+def test_segments_are_upscaled_and_rejoined(segmented, make_clip, stream_info):
+    clip = make_clip(seconds=6, gop=30)
+    output = upscale_video_segmented(str(clip), segment_seconds=2, jobs=3)
+    assert output == str(clip.parent / "4K" / "clip_4K_bytedance.mp4")
+    assert CopyPipeline.runs == [[f"clip_seg{i:04d}.mp4" for i in range(3)]]
+    assert stream_info(output) == (180, True)
+    # Segment work directory is cleaned up next to the output
+    assert sorted(p.name for p in Path(output).parent.iterdir()) == ["clip_4K_bytedance.mp4"]
+
+
+def test_join_frame_count_drift_fails(segmented, make_clip, capsys):
+    clip = make_clip(seconds=4, gop=30, audio=False)
+    segmented["clip_4K_bytedance.mp4"] = 119
+    assert upscale_video_segmented(str(clip), segment_seconds=2) is None
+    assert "Joined video has 119 frames, segments had 120" in capsys.readouterr().out
+
+
+@pytest.fixture
+def batch(monkeypatch, tmp_path):
+    """batch_upscale over three fake 1080p videos, each segmented upscale taking 100s of fake time"""
+    now = types.SimpleNamespace(value=1000.0)
+    calls = []
+    outcomes = {}
+
+    def upscale(video_path, model, segment_seconds, jobs, batch_timeout=None, **options):
+        calls.append((Path(video_path).name, batch_timeout))
+        now.value += 100
+        if not outcomes.get(Path(video_path).name, True):
+            return None
+        output = Path(upscale_to_4k.build_job(video_path, model).output_path)
+        output.parent.mkdir(parents=True, exist_ok=True)
+        output.write_bytes(b"4k")
+        return str(output)
+
+    monkeypatch.setattr(upscale_to_4k, "time", types.SimpleNamespace(time=lambda: now.value))
+    monkeypatch.setattr(upscale_to_4k, "configure_api_key", lambda: True)
+    monkeypatch.setattr(upscale_to_4k, "upscale_video_segmented", upscale)
+    videos = tmp_path / "videos"
+    videos.mkdir()
+    for name in "abc":
+        (videos / f"{name}_1080p.mp4").write_bytes(name.encode())
+    return types.SimpleNamespace(dir=str(videos), calls=calls, outcomes=outcomes)
+
+
+def test_segmented_batch_skips_videos_already_done(batch, capsys):
+    results = upscale_to_4k.batch_upscale(batch.dir, segment_seconds=30)
+    assert (results["success"], results["skipped"]) == (3, 0)
+    assert len(batch.calls) == 3
+
+    # Journal alone (no result cache) is enough to skip them
+    results = upscale_to_4k.batch_upscale(batch.dir, segment_seconds=30, use_cache=False)
+    assert (results["success"], results["skipped"]) == (0, 3)
+    assert len(batch.calls) == 3
+    assert "3 up to date" in capsys.readouterr().out
+
+    # A different segment length is different work
+    upscale_to_4k.batch_upscale(batch.dir, segment_seconds=60, use_cache=False)
+    assert len(batch.calls) == 6
+
+
+def test_segmented_batch_fresh_redoes_everything(batch):
+    upscale_to_4k.batch_upscale(batch.dir, segment_seconds=30, use_cache=False)
+    results = upscale_to_4k.batch_upscale(batch.dir, segment_seconds=30, use_cache=False, fresh=True)
+    assert results["success"] == 3
+    assert len(batch.calls) == 6
+
+
+def test_failed_video_is_retried_next_run(batch):
+    batch.outcomes["b_1080p.mp4"] = False
+    results = upscale_to_4k.batch_upscale(batch.dir, segment_seconds=30)
+    assert (results["success"], results["failed"]) == (2, 1)
+    batch.outcomes.clear()
+    upscale_to_4k.batch_upscale(batch.dir, segment_seconds=30)
+    assert [name for name, _ in batch.calls[3:]] == ["b_1080p.mp4"]
+
+
+def test_batch_timeout_spans_the_whole_batch(batch, capsys):
+    # 150s: a gets all of it, b the 50s left (and overruns), c is never started
+    batch.outcomes["b_1080p.mp4"] = False
+    results = upscale_to_4k.batch_upscale(batch.dir, segment_seconds=30, batch_timeout=150)
+    assert batch.calls == [("a_1080p.mp4", 150), ("b_1080p.mp4", 50)]
+    assert (results["success"], results["failed"], results["cancelled"]) == (1, 0, 2)
+    assert "2 cancelled at the batch timeout" in capsys.readouterr().out
+
+    # Cancelled videos are retried on the next run
+    batch.outcomes.clear()
+    results = upscale_to_4k.batch_upscale(batch.dir, segment_seconds=30)
+    assert [name for name, _ in batch.calls[2:]] == ["b_1080p.mp4", "c_1080p.mp4"]
+    assert (results["success"], results["skipped"]) == (2, 1)
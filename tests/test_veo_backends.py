@@ -0,0 +1,140 @@
+import types
+
+import pytest
+
+import veo_backends
+import veo_polling
+from veo_backends import ERROR_COOLDOWN_SECONDS, Backend, BackendPool, is_backend_error, parse_backends
+
+
+class ApiError(Exception):
+    def __init__(self, code):
+        super().__init__(f"{code}")
+        self.code = code
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """One controllable clock for backends and their token buckets"""
+    now = types.SimpleNamespace(value=1000.0)
+    fake = types.SimpleNamespace(time=lambda: now.value)
+    monkeypatch.setattr(veo_backends, "time", fake)
+    monkeypatch.setattr(veo_polling, "time", fake)
+    return now
+
+
+def vertex(location, rpm=None):
+    return Backend('vertex', "veo-3.0-generate-001", project="proj", location=location, rpm=rpm)
+
+
+def test_backend_errors_versus_rejected_requests():
+    assert is_backend_error(ConnectionError("reset"))
+    assert all(is_backend_error(ApiError(code)) for code in (401, 403, 404, 500, 503))
+    assert not is_backend_error(ApiError(400))
+    assert not is_backend_error(ApiError(429))
+
+
+def test_backend_names():
+    assert vertex(None).name == "vertex:proj/us-central1"
+    assert Backend('gemini', "m", api_key="k").name == "gemini"
+    assert Backend('gemini', "m", api_key="k", key_env="OTHER_KEY").name == "gemini:OTHER_KEY"
+
+
+def test_pool_needs_a_backend():
+    with pytest.raises(ValueError):
+        BackendPool([], jobs=2)
+
+
+def test_by_name():
+    pool = BackendPool([vertex("us-central1"), vertex("europe-west4")], jobs=2)
+    assert pool.capacity == 4
+    assert pool.by_name(None) is pool.primary
+    assert pool.by_name("vertex:proj/europe-west4") is pool.backends[1]
+    assert pool.by_name("vertex:proj/asia-east1") is None
+
+
+def test_pick_least_loaded_with_free_slot(clock):
+    us, eu = vertex("us-central1"), vertex("europe-west4")
+    pool = BackendPool([us, eu], jobs=2)
+    assert pool.pick() is us
+    us.in_flight = 1
+    assert pool.pick() is eu
+    eu.in_flight = 2
+    assert pool.pick() is us
+    us.in_flight = 2
+    assert pool.pick() is None
+    assert pool.next_ready() is None
+
+
+def test_recent_errors_count_against_a_backend(clock):
+    us, eu = vertex("us-central1"), vertex("europe-west4")
+    pool = BackendPool([us, eu], jobs=4)
+    eu.in_flight = 1
+    for ok in (True, True, False, True):
+        us.outcomes.append(ok)
+    assert us.error_rate() == 0.25
+    # 0 + 2 * 0.25 load vs 0.25
+    assert pool.pick() is eu
+
+
+def test_throttled_backend_pauses_and_fails_over(clock, monkeypatch):
+    monkeypatch.setattr(veo_backends, "quota_backoff", lambda attempt: 15.0 * attempt)
+    us, eu = vertex("us-central1"), vertex("europe-west4")
+    pool = BackendPool([us, eu], jobs=2)
+    assert us.throttled() == 15
+    assert us.throttled() == 30
+    assert us.ready_at() == 1030
+    assert pool.pick() is eu
+    eu.in_flight = 2
+    assert pool.pick() is None
+    assert pool.next_ready() == 1030
+    clock.value = 1030
+    assert pool.pick() is us
+    us.succeeded()
+    assert us.quota_errors == 0
+
+
+def test_failed_submit_cools_down_but_status_error_does_not(clock):
+    backend = vertex("us-central1")
+    backend.failed(cooldown=0)
+    assert backend.ready_at() == clock.value
+    backend.failed()
+    assert backend.ready_at() == clock.value + ERROR_COOLDOWN_SECONDS
+    assert backend.error_rate() == 1.0
+
+
+def test_rate_limited_backend_waits_for_a_token(clock):
+    backend = vertex("us-central1", rpm=6)
+    pool = BackendPool([backend], jobs=4)
+    assert pool.pick() is backend
+    backend.bucket.take()
+    assert pool.pick() is None
+    assert pool.next_ready() == pytest.approx(1010)
+
+
+def models(mode, use_fast):
+    return f"{mode}-{'fast' if use_fast else 'standard'}"
+
+
+def test_parse_backends(monkeypatch):
+    monkeypatch.setenv("GOOGLE_API_KEY", "default-key")
+    monkeypatch.setenv("SECOND_KEY", "second-key")
+    backends = parse_backends(" vertex:proj, vertex:proj/europe-west4,, gemini, gemini:SECOND_KEY",
+                              models, use_fast=True, rpm=10)
+    assert [b.name for b in backends] == ["vertex:proj/us-central1", "vertex:proj/europe-west4",
+                                          "gemini", "gemini:SECOND_KEY"]
+    assert [b.model for b in backends] == ["vertex-fast"] * 2 + ["gemini-fast"] * 2
+    assert [b.api_key for b in backends[2:]] == ["default-key", "second-key"]
+    assert backends[0].bucket.rate == pytest.approx(10 / 60)
+
+
+@pytest.mark.parametrize("text, message", [
+    ("vertex", "needs a project"),
+    ("vertex:/europe-west4", "needs a project"),
+    ("gemini:MISSING_KEY", "MISSING_KEY is not set"),
+    ("openai", "Unknown backend 'openai'"),
+])
+def test_parse_backends_rejects(text, message, monkeypatch):
+    monkeypatch.delenv("MISSING_KEY", raising=False)
+    with pytest.raises(ValueError, match=message):
+        parse_backends(text, models)
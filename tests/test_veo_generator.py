@@ -0,0 +1,236 @@
+import types
+
+import pytest
+
+import veo_backends
+import veo_generator
+import veo_polling
+from veo_backends import Backend
+from veo_generator import clip_spec, run_concurrent, select_model, show_plan
+from veo_manifest import VeoManifest
+
+PROMPTS = {
+    "M1_01_towers": {"section": "MAIN1", "duration": 8, "prompt": "glass towers", "aspect_ratio": "16:9"},
+    "H01_neural": {"section": "HOOK", "duration": 8, "prompt": "neural data flow", "aspect_ratio": "16:9"},
+    "H02_code": {"section": "HOOK", "duration": 4, "prompt": "streaming code", "aspect_ratio": "16:9"},
+    "X01_extra": {"section": "EXTRA", "duration": 4, "prompt": "b-roll", "aspect_ratio": "9:16"},
+}
+
+
+@pytest.fixture(autouse=True)
+def prompts(monkeypatch):
+    monkeypatch.setattr(veo_generator, "PROMPTS", PROMPTS)
+
+
+@pytest.fixture
+def vertex():
+    return Backend('vertex', select_model('vertex'), project="proj")
+
+
+def plan(tmp_path, capsys, backends, keys=tuple(PROMPTS), **options):
+    count = show_plan(list(keys), str(tmp_path), backends=backends, **options)
+    return count, capsys.readouterr().out
+
+
+def test_plan_without_manifest(tmp_path, capsys, vertex):
+    (tmp_path / "H02_code.mp4").write_bytes(b"clip")
+    count, out = plan(tmp_path, capsys, [vertex], jobs=2)
+    assert count == 3
+    assert "H02_code: on disk, will be recorded without rendering" in out
+    assert "H01_neural: new (8s, ~$1.60)" in out
+    assert "Up to date: 1/4 clip(s)" in out
+    assert "To render: 3 clip(s), 20s of footage, ~$4.00 (veo-3.1-generate-001)" in out
+    # 156s + 108s on one slot, 156s on the other
+    assert "Est. time: ~4m24s with 2 concurrent render(s)" in out
+    assert not (tmp_path / ".veo_manifest.jsonl").exists()
+
+
+def test_plan_against_manifest(tmp_path, capsys, vertex):
+    model = vertex.model
+    manifest = VeoManifest.for_output(tmp_path)
+    (tmp_path / "H02_code.mp4").write_bytes(b"clip")
+    manifest.done("H02_code", clip_spec("H02_code", model), tmp_path / "H02_code.mp4")
+    manifest.submitted("H01_neural", clip_spec("H01_neural", model), "operations/1", backend=vertex.name)
+    manifest.done("X01_extra", dict(clip_spec("X01_extra", model), prompt="old b-roll"), tmp_path / "H02_code.mp4")
+    manifest.close()
+    before = (tmp_path / ".veo_manifest.jsonl").read_bytes()
+
+    count, out = plan(tmp_path, capsys, [vertex])
+    assert count == 3
+    assert "H02_code" not in out
+    assert "H01_neural: rendering, re-attach" in out
+    assert "X01_extra: changed: prompt (4s, ~$0.80)" in out
+    assert "M1_01_towers: new" in out
+    assert "Up to date: 1/4 clip(s)" in out
+    assert "To render: 2 clip(s), 12s of footage" in out
+    assert "Re-attaching: 1 render(s) already paid for" in out
+    assert (tmp_path / ".veo_manifest.jsonl").read_bytes() == before
+
+
+def test_fresh_plan_renders_everything(tmp_path, capsys, vertex):
+    (tmp_path / "H02_code.mp4").write_bytes(b"clip")
+    count, out = plan(tmp_path, capsys, [vertex], fresh=True)
+    assert count == 4
+    assert "H02_code: forced (--fresh)" in out
+
+
+def test_nothing_to_do(tmp_path, capsys, vertex):
+    for key in PROMPTS:
+        (tmp_path / f"{key}.mp4").write_bytes(b"clip")
+    count, out = plan(tmp_path, capsys, [vertex])
+    assert count == 0
+    assert "To render: 0 clip(s), 0s of footage, ~$0.00 (veo-3.1-generate-001)" in out
+    assert "Est. time" not in out
+
+
+def test_render_order_by_section_then_shortest():
+    assert veo_generator.render_order(list(PROMPTS)) == ["H02_code", "H01_neural", "M1_01_towers", "X01_extra"]
+    assert veo_generator.render_order(["X01_extra", "M1_01_towers"]) == ["M1_01_towers", "X01_extra"]
+
+
+def test_plan_paces_submissions_at_rpm(tmp_path, capsys, vertex):
+    # Four slots free at once, but at 1/min the last clip can't start until 3 minutes in
+    count, out = plan(tmp_path, capsys, [vertex], jobs=4, rpm=1)
+    assert count == 4
+    assert "Est. time: ~4m48s with 4 concurrent render(s)" in out
+
+
+def test_plan_prices_each_clip_on_its_backend(tmp_path, capsys, vertex):
+    gemini = Backend('gemini', select_model('gemini'), api_key="key")
+    count, out = plan(tmp_path, capsys, [vertex, gemini], jobs=1, rpm=0)
+    assert count == 4
+    assert "H02_code: new (4s, ~$0.80, vertex:proj/us-central1)" in out
+    assert "H01_neural: new (8s, ~100 credits, gemini)" in out
+    assert "M1_01_towers: new (8s, ~$1.60, vertex:proj/us-central1)" in out
+    assert "To render: 4 clip(s), 24s of footage, ~$2.40 + ~200 credits " \
+           "(veo-3.1-generate-001, veo-3.1-generate-preview)" in out
+    assert "with 1 concurrent render(s) on each of 2 backends" in out
+
+
+def test_plan_reattaches_on_the_recorded_backend(tmp_path, capsys, vertex):
+    manifest = VeoManifest.for_output(tmp_path)
+    for key, backend in (("H01_neural", vertex.name), ("H02_code", "vertex:proj/asia-east1")):
+        manifest.submitted(key, clip_spec(key, vertex.model), f"operations/{key}", backend=backend)
+    manifest.close()
+    count, out = plan(tmp_path, capsys, [vertex], keys=["H01_neural", "H02_code"])
+    assert count == 2
+    assert "H01_neural: rendering, re-attach" in out
+    assert "H02_code: was on vertex:proj/asia-east1, no longer configured (4s, ~$0.80)" in out
+
+
+class ApiError(Exception):
+    def __init__(self, code):
+        super().__init__(f"{code} error")
+        self.code = code
+
+
+class FakeVeo:
+    """A backend's genai client: operations finish after `checks` status checks"""
+
+    def __init__(self, checks=2, submit_errors=(), status_errors=()):
+        self.checks = checks
+        self.submit_errors = list(submit_errors)
+        self.status_errors = list(status_errors)
+        self.submitted = []
+        self.polls = {}
+        self.in_flight = self.max_in_flight = 0
+        self.operations = self
+
+    def start(self, key):
+        if self.submit_errors:
+            raise self.submit_errors.pop(0)
+        self.submitted.append(key)
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        return types.SimpleNamespace(name=f"operations/{key}", key=key, done=False)
+
+    def get(self, operation):
+        if self.status_errors:
+            raise self.status_errors.pop(0)
+        self.polls[operation.key] = self.polls.get(operation.key, 0) + 1
+        if self.polls[operation.key] < self.checks:
+            return operation
+        self.in_flight -= 1
+        video = types.SimpleNamespace(video=types.SimpleNamespace(video_bytes=operation.key.encode(), uri=None))
+        return types.SimpleNamespace(name=operation.name, done=True, error=None, response=True,
+                                     result=types.SimpleNamespace(generated_videos=[video]))
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """Simulated time for the render loop: sleeping just advances the clock"""
+    now = types.SimpleNamespace(value=1000.0)
+
+    def sleep(seconds):
+        now.value += max(seconds, 0.01)
+
+    fake = types.SimpleNamespace(time=lambda: now.value, sleep=sleep)
+    for module in (veo_generator, veo_backends, veo_polling):
+        monkeypatch.setattr(module, "time", fake)
+    monkeypatch.setattr(veo_generator, "start_generation", lambda client, model, key: client.start(key))
+    return now
+
+
+def backend_with(client, location="us-central1", rpm=0):
+    backend = Backend('vertex', select_model('vertex'), project="proj", location=location, rpm=rpm)
+    backend._client = client
+    return backend
+
+
+def test_concurrent_batch_keeps_jobs_in_flight(tmp_path, clock, capsys):
+    veo = FakeVeo(checks=3)
+    results = run_concurrent(list(PROMPTS), str(tmp_path), jobs=2, backends=[backend_with(veo)])
+    assert results == {key: str(tmp_path / f"{key}.mp4") for key in PROMPTS}
+    assert veo.submitted == ["H02_code", "H01_neural", "M1_01_towers", "X01_extra"]
+    assert veo.max_in_flight == 2
+    assert (tmp_path / "H01_neural.mp4").read_bytes() == b"H01_neural"
+    # Completed renders are on record: a second run submits nothing
+    assert run_concurrent(list(PROMPTS), str(tmp_path), jobs=2, backends=[backend_with(veo)]) == results
+    assert len(veo.submitted) == 4
+    assert "already rendered and verified" in capsys.readouterr().out
+
+
+def test_quota_error_pauses_and_resubmits(tmp_path, clock, monkeypatch):
+    monkeypatch.setattr(veo_backends, "quota_backoff", lambda attempt: 60.0)
+    veo = FakeVeo(submit_errors=[ApiError(429)])
+    start = clock.value
+    results = run_concurrent(["H01_neural"], str(tmp_path), backends=[backend_with(veo)])
+    assert results["H01_neural"] == str(tmp_path / "H01_neural.mp4")
+    assert veo.submitted == ["H01_neural"]
+    assert clock.value - start >= 60
+
+
+def test_lost_operation_fails_the_clip_and_frees_its_slot(tmp_path, clock, capsys):
+    veo = FakeVeo(checks=1, status_errors=[ApiError(404)])
+    results = run_concurrent(["H01_neural", "H02_code"], str(tmp_path), jobs=1, backends=[backend_with(veo)])
+    assert results == {"H01_neural": str(tmp_path / "H01_neural.mp4"), "H02_code": None}
+    assert "H02_code: operation lost" in capsys.readouterr().out
+    manifest = VeoManifest.for_output(tmp_path)
+    assert manifest.lookup("H01_neural")["event"] == "done"
+    assert manifest.lookup("H02_code")["event"] == "failed"
+    manifest.close()
+
+
+def test_transient_status_errors_are_retried(tmp_path, clock):
+    veo = FakeVeo(checks=1, status_errors=[ApiError(503), ApiError(503)])
+    results = run_concurrent(["H01_neural"], str(tmp_path), backends=[backend_with(veo)])
+    assert results["H01_neural"] == str(tmp_path / "H01_neural.mp4")
+
+
+def test_submissions_fail_over_to_another_backend(tmp_path, clock, capsys):
+    broken = FakeVeo(submit_errors=[ApiError(403)])
+    healthy = FakeVeo()
+    backends = [backend_with(broken), backend_with(healthy, location="europe-west4")]
+    results = run_concurrent(["H01_neural"], str(tmp_path), backends=backends)
+    assert results["H01_neural"] == str(tmp_path / "H01_neural.mp4")
+    assert healthy.submitted == ["H01_neural"]
+    assert "vertex:proj/us-central1 failed (403 error); trying another backend" in capsys.readouterr().out
+    manifest = VeoManifest.for_output(tmp_path)
+    assert manifest.lookup("H01_neural")["backend"] == "vertex:proj/europe-west4"
+    manifest.close()
+
+
+def test_clip_rejected_by_every_backend_fails(tmp_path, clock):
+    backends = [backend_with(FakeVeo(submit_errors=[ApiError(500)])),
+                backend_with(FakeVeo(submit_errors=[ApiError(500)]), location="europe-west4")]
+    assert run_concurrent(["H01_neural"], str(tmp_path), backends=backends) == {"H01_neural": None}
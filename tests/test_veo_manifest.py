@@ -0,0 +1,82 @@
+import json
+
+import pytest
+
+from veo_manifest import VeoManifest, changed_fields, fingerprint
+
+SPEC = {"prompt": "city at dusk", "duration": 8, "aspect_ratio": "16:9",
+        "model": "veo-3.0-generate-001", "resolution": "1080p"}
+
+
+@pytest.fixture
+def manifest(tmp_path):
+    manifest = VeoManifest.for_output(tmp_path)
+    yield manifest
+    manifest.close()
+
+
+def test_changed_fields():
+    assert changed_fields(SPEC, SPEC) == []
+    assert changed_fields(SPEC, {**SPEC, "resolution": "720p", "duration": 6}) == ["duration", "resolution"]
+    assert changed_fields({"prompt": "a"}, {"prompt": "a", "seed": 1}) == ["seed"]
+    assert changed_fields({"prompt": "a", "seed": 1}, {"prompt": "a"}) == ["seed"]
+
+
+def test_fingerprint_ignores_key_order():
+    assert fingerprint(dict(reversed(list(SPEC.items())))) == fingerprint(SPEC)
+    assert fingerprint({**SPEC, "duration": 6}) != fingerprint(SPEC)
+
+
+def test_replay_skips_torn_last_line(tmp_path, manifest):
+    manifest.submitted("clip_01", SPEC, "operations/abc", backend="gemini")
+    manifest.submitted("clip_02", SPEC, "operations/def")
+    manifest.close()
+    with open(manifest.path, "a") as f:
+        f.write(json.dumps({"key": "clip_02", "event": "failed", "error": "boom"})[:25])
+
+    replayed = VeoManifest.for_output(tmp_path)
+    try:
+        assert replayed.pending("clip_01", fingerprint(SPEC))["backend"] == "gemini"
+        assert replayed.pending("clip_02", fingerprint(SPEC))["operation"] == "operations/def"
+        # Appending after a torn line still yields readable records
+        replayed.failed("clip_02", SPEC, "quota")
+    finally:
+        replayed.close()
+
+    replayed = VeoManifest.for_output(tmp_path)
+    try:
+        assert replayed.pending("clip_02", fingerprint(SPEC)) is None
+        assert replayed.lookup("clip_02")["error"] == "quota"
+    finally:
+        replayed.close()
+
+
+def test_pending_requires_matching_fingerprint(manifest):
+    manifest.submitted("clip_01", SPEC, "operations/abc")
+    changed = fingerprint({**SPEC, "prompt": "city at dawn"})
+    assert manifest.pending("clip_01", changed) is None
+    assert manifest.pending("clip_01", {changed, fingerprint(SPEC)}) is not None
+
+
+def test_verified_checks_file_checksum(tmp_path, manifest):
+    clip = tmp_path / "clip_01.mp4"
+    clip.write_bytes(b"video")
+    manifest.done("clip_01", SPEC, clip)
+    assert manifest.verified("clip_01", fingerprint(SPEC), clip)
+    assert not manifest.verified("clip_01", fingerprint({**SPEC, "duration": 6}), clip)
+
+    clip.write_bytes(b"VIDEO")
+    assert not manifest.verified("clip_01", fingerprint(SPEC), clip)
+    clip.unlink()
+    assert not manifest.verified("clip_01", fingerprint(SPEC), clip)
+
+
+def test_records_without_fingerprint_never_match(tmp_path):
+    path = tmp_path / "foreign.jsonl"
+    path.write_text(json.dumps({"key": "clip_01", "event": "submitted", "operation": "operations/old"}) + "\n")
+    manifest = VeoManifest(path)
+    try:
+        assert manifest.pending("clip_01", fingerprint(SPEC)) is None
+        assert not manifest.matches(manifest.lookup("clip_01"), fingerprint(SPEC))
+    finally:
+        manifest.close()
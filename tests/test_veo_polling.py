@@ -0,0 +1,159 @@
+import json
+import types
+
+import pytest
+
+import veo_polling
+from veo_polling import (MAX_POLL_SECONDS, MIN_POLL_SECONDS, MIN_SAMPLES, PollSchedule, RenderTimes, TokenBucket,
+                         is_lost_operation_error, is_quota_error, quota_backoff)
+
+
+class ApiError(Exception):
+    def __init__(self, code, message=""):
+        super().__init__(message or f"{code}")
+        self.code = code
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """Controllable veo_polling clock, without jitter"""
+    now = types.SimpleNamespace(value=1000.0)
+    monkeypatch.setattr(veo_polling, "time", types.SimpleNamespace(time=lambda: now.value))
+    monkeypatch.setattr(veo_polling, "JITTER", 0.0)
+    return now
+
+
+def test_error_classification():
+    assert is_quota_error(ApiError(429))
+    assert is_quota_error(Exception("400 RESOURCE_EXHAUSTED: quota"))
+    assert not is_quota_error(ApiError(500))
+    assert all(is_lost_operation_error(ApiError(code)) for code in (401, 403, 404))
+    assert not is_lost_operation_error(ApiError(429))
+    assert not is_lost_operation_error(Exception("404"))
+
+
+@pytest.mark.parametrize("attempt, ceiling", [(1, 15), (2, 30), (3, 60), (5, 240), (6, 300), (20, 300)])
+def test_quota_backoff_envelope(attempt, ceiling):
+    delays = [quota_backoff(attempt) for _ in range(200)]
+    assert all(ceiling / 2 <= d <= ceiling for d in delays)
+
+
+def test_schedule_sleeps_through_early_window_then_polls_tightly(clock):
+    schedule = PollSchedule(expected=120, early=72, late=180)
+    assert schedule.next_delay() == MAX_POLL_SECONDS
+    clock.value += 60
+    assert schedule.next_delay() == pytest.approx(12)
+    clock.value += 12
+    assert schedule.next_delay() == MIN_POLL_SECONDS
+    clock.value += 100
+    assert schedule.next_delay() == MIN_POLL_SECONDS
+
+
+def test_overdue_schedule_backs_off_gradually(clock):
+    schedule = PollSchedule(expected=120, early=72, late=180)
+    clock.value += 220
+    assert schedule.next_delay() == pytest.approx(MIN_POLL_SECONDS + 10)
+    clock.value += 1000
+    assert schedule.next_delay() == MAX_POLL_SECONDS
+
+
+def test_delays_are_jittered_within_bounds():
+    schedule = PollSchedule(expected=120, early=72, late=180)
+    delays = {schedule.next_delay() for _ in range(50)}
+    assert len(delays) > 1
+    assert all(MAX_POLL_SECONDS * 0.8 <= d <= MAX_POLL_SECONDS * 1.2 for d in delays)
+
+
+def test_quota_delay_grows_until_a_successful_poll(monkeypatch):
+    monkeypatch.setattr(veo_polling.random, "uniform", lambda low, high: high)
+    schedule = PollSchedule(expected=120, early=72, late=180)
+    assert [schedule.quota_delay() for _ in range(3)] == [15, 30, 60]
+    schedule.next_delay()
+    assert schedule.quota_delay() == 15
+
+
+def test_priors_until_enough_samples(tmp_path):
+    times = RenderTimes(tmp_path / "times.jsonl")
+    assert times.expected("veo-3.0-generate-001", 8) == pytest.approx((156, 93.6, 234))
+    assert times.expected("veo-3.0-fast-generate-001", 8) == pytest.approx((78, 46.8, 117))
+    for seconds in range(MIN_SAMPLES - 1):
+        times.record("veo-3.0-generate-001", 8, 100 + seconds)
+    assert times.expected("veo-3.0-generate-001", 8)[0] == pytest.approx(156)
+
+
+def test_recorded_distribution_replaces_priors(tmp_path):
+    path = tmp_path / "times.jsonl"
+    times = RenderTimes(path)
+    for seconds in (90, 100, 110, 120, 130, 140, 150, 160, 170, 180):
+        times.record("veo-3.0-generate-001", 8, seconds)
+    assert times.expected("veo-3.0-generate-001", 8) == (140, 100, 180)
+    # Other durations keep their priors
+    assert times.expected("veo-3.0-generate-001", 4)[0] == pytest.approx(108)
+
+    reloaded = RenderTimes(path)
+    assert reloaded.expected("veo-3.0-generate-001", 8) == (140, 100, 180)
+    schedule = reloaded.schedule("veo-3.0-generate-001", 8)
+    assert (schedule.expected, schedule.early, schedule.late) == (140, 100, 180)
+
+
+def test_history_skips_bad_lines_and_keeps_recent_samples(tmp_path, monkeypatch):
+    monkeypatch.setattr(veo_polling, "MAX_SAMPLES", 5)
+    path = tmp_path / "times.jsonl"
+    lines = ["not json", json.dumps({"model": "m"}), json.dumps({"model": "m", "duration": 8, "seconds": "x"})]
+    lines += [json.dumps({"model": "m", "duration": 8, "seconds": s}) for s in range(10)]
+    path.write_text("\n".join(lines) + "\n")
+    assert RenderTimes(path).samples == {("m", 8): [5.0, 6.0, 7.0, 8.0, 9.0]}
+
+
+def test_disabled_history_is_memory_only(monkeypatch):
+    monkeypatch.setenv("VEO_TIMINGS_FILE", "")
+    times = RenderTimes()
+    assert times.path is None
+    times.record("m", 8, 120.0)
+    assert times.samples == {("m", 8): [120.0]}
+
+
+def test_default_history_lives_in_the_cache_dir(tmp_path, monkeypatch):
+    monkeypatch.delenv("VEO_TIMINGS_FILE")
+    monkeypatch.setenv("FAL_CACHE_DIR", str(tmp_path))
+    assert veo_polling.timings_path() == tmp_path / "veo_render_times.jsonl"
+
+
+def test_token_bucket_paces_after_burst(clock):
+    bucket = TokenBucket(per_minute=6, burst=2)
+    for _ in range(2):
+        assert bucket.delay() == 0
+        bucket.take()
+    assert bucket.delay() == pytest.approx(10)
+    clock.value += 4
+    assert bucket.delay() == pytest.approx(6)
+    clock.value += 6
+    assert bucket.delay() == 0
+
+
+def test_token_bucket_refill_caps_at_burst(clock):
+    bucket = TokenBucket(per_minute=60, burst=3)
+    bucket.take()
+    clock.value += 3600
+    for _ in range(3):
+        bucket.take()
+    assert bucket.delay() == pytest.approx(1)
+
+
+def test_drain_waits_a_full_interval(clock):
+    bucket = TokenBucket(per_minute=12, burst=4)
+    bucket.drain()
+    assert bucket.delay() == pytest.approx(5)
+    # Draining never refunds requests already overspent
+    bucket.take()
+    bucket.drain()
+    assert bucket.delay() == pytest.approx(10)
+
+
+@pytest.mark.parametrize("per_minute", [0, None])
+def test_unlimited_bucket(per_minute, clock):
+    bucket = TokenBucket(per_minute)
+    for _ in range(100):
+        bucket.take()
+    bucket.drain()
+    assert bucket.delay() == 0
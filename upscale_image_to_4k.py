@@ -4,22 +4,26 @@ Upscale images to 4K using Fal.ai
 Supports multiple upscaling models with different quality/cost tradeoffs
 """
 
+import io
 import os
 import sys
+import math
 import time
+import argparse
+import tempfile
 from pathlib import Path
 from dotenv import load_dotenv
 
+import fal_cache
+from batch_journal import BatchJournal, job_key
+from fal_jobs import FalJob, FalPipeline, configure_api_key, run_single, upload_file
+from image_probe import image_size
+from image_transcode import CODECS, codec_for_extension, save_image, transcode
+from PIL import Image
+
 # Load environment variables
 load_dotenv('.env.local')
 
-try:
-    import fal_client
-except ImportError:
-    print("Installing fal_client...")
-    os.system("pip install fal-client")
-    import fal_client
-
 # Available models for image upscaling
 MODELS = {
     "creative": {
@@ -39,6 +43,9 @@ MODELS = {
     }
 }
 
+# Models whose output is faithful enough to stitch tiles without visible seams
+TILED_MODELS = ["clarity", "esrgan"]
+
 # Target 4K dimensions
 TARGET_4K_WIDTH = 3840
 TARGET_4K_HEIGHT = 2160
@@ -46,21 +53,13 @@ TARGET_4K_HEIGHT = 2160
 def upload_image_to_fal(image_path):
     """Upload image file to Fal.ai and return URL"""
     print(f"Uploading {image_path}...")
-    url = fal_client.upload_file(image_path)
+    url = upload_file(image_path)
     print(f"✓ Uploaded: {url}")
     return url
 
 def get_image_dimensions(image_path):
-    """Get image dimensions using sips (macOS)"""
-    import subprocess
-    result = subprocess.run(
-        ['sips', '-g', 'pixelWidth', '-g', 'pixelHeight', image_path],
-        capture_output=True, text=True
-    )
-    lines = result.stdout.strip().split('\n')
-    width = int([l for l in lines if 'pixelWidth' in l][0].split(':')[1].strip())
-    height = int([l for l in lines if 'pixelHeight' in l][0].split(':')[1].strip())
-    return width, height
+    """Get image dimensions from the file header (cached, no subprocess)"""
+    return image_size(image_path)
 
 def calculate_scale_for_4k(width, height):
     """Calculate scale factor needed to reach 4K"""
@@ -69,7 +68,66 @@ def calculate_scale_for_4k(width, height):
     # Use the larger scale to ensure we reach 4K on the smaller dimension
     return max(scale_w, scale_h)
 
-def upscale_image(image_path, model="clarity", output_dir=None):
+def build_arguments(model, scale):
+    """Model-specific request arguments for a given 4K scale factor"""
+    arguments = {"scale": min(int(scale) + 1, 4)}  # Max 4x per request
+    if model == "creative":
+        arguments["creativity"] = 0.3  # Lower = more faithful to original
+    return arguments
+
+
+def finalize_output(job):
+    """Sniff the downloaded bytes and write them to the final path in the chosen codec"""
+    options = job.output_options
+    source_format = transcode(job.extra['data'], job.output_path, options['codec'], options['quality'])
+    if source_format != options['codec']:
+        job.extra['converted_from'] = source_format
+
+
+def output_codec(input_path, output_format="auto"):
+    """Codec for the output file: the source's own for 'auto', JPEG for unknown sources"""
+    if output_format == "auto":
+        return codec_for_extension(Path(input_path).suffix)
+    return output_format
+
+
+def build_job(image_path, model="clarity", output_dir=None, scale=None,
+              output_format="auto", quality=None):
+    """Describe the fal job for one image (input, endpoint, arguments, output path)"""
+    if scale is None:
+        scale = calculate_scale_for_4k(*get_image_dimensions(image_path))
+
+    input_path = Path(image_path)
+    out_dir = Path(output_dir) if output_dir else input_path.parent / "4K"
+
+    # Keep the source extension in auto mode (e.g. .jpeg stays .jpeg)
+    codec = output_codec(input_path, output_format)
+    ext = input_path.suffix.lower()
+    if output_format != "auto" or codec_for_extension(ext, None) is None:
+        ext = CODECS[codec]['ext']
+
+    # The result is kept in memory and transcoded straight to the final path
+    return FalJob(
+        input_path=str(input_path),
+        endpoint=MODELS[model]['name'],
+        output_path=str(out_dir / f"{input_path.stem}_4K{ext}"),
+        arguments=build_arguments(model, scale),
+        url_field="image_url",
+        postprocess=finalize_output,
+        in_memory=True,
+        output_options={"codec": codec, "quality": quality},
+    )
+
+
+def check_model(model):
+    if model not in MODELS:
+        print(f"Error: Unknown model '{model}'. Choose from: {', '.join(MODELS.keys())}")
+        return False
+    return True
+
+
+def upscale_image(image_path, model="clarity", output_dir=None, output_format="auto",
+                  quality=None, **pipeline_options):
     """
     Upscale image to 4K using selected Fal.ai model
 
@@ -77,23 +135,17 @@ def upscale_image(image_path, model="clarity", output_dir=None):
         image_path: Path to input image
         model: One of: creative, clarity, esrgan
         output_dir: Optional output directory (default: 4K subfolder)
+        output_format: auto (match source), jpeg, png or webp
+        quality: Encoder quality for jpeg/webp (forces a re-encode)
+        pipeline_options: Passed to fal_jobs.FalPipeline (e.g. use_cache=False)
     """
     if not os.path.exists(image_path):
         print(f"Error: File not found: {image_path}")
         return None
 
-    if model not in MODELS:
-        print(f"Error: Unknown model '{model}'. Choose from: {', '.join(MODELS.keys())}")
-        return None
-
-    # Configure API key
-    api_key = os.getenv('FAL_API_KEY')
-    if not api_key:
-        print("Error: FAL_API_KEY not found in .env.local")
+    if not check_model(model) or not configure_api_key():
         return None
 
-    os.environ['FAL_KEY'] = api_key
-
     # Get current dimensions and calculate scale
     width, height = get_image_dimensions(image_path)
     scale = calculate_scale_for_4k(width, height)
@@ -108,122 +160,192 @@ def upscale_image(image_path, model="clarity", output_dir=None):
     print(f"Cost: {model_info['cost']}")
     print(f"{'='*60}\n")
 
-    try:
-        # Upload image
-        image_url = upload_image_to_fal(image_path)
-
-        # Prepare arguments based on model
-        arguments = {
-            "image_url": image_url,
-        }
-
-        if model == "creative":
-            arguments["scale"] = min(int(scale) + 1, 4)  # Max 4x for creative
-            arguments["creativity"] = 0.3  # Lower = more faithful to original
-        elif model == "clarity":
-            arguments["scale"] = min(int(scale) + 1, 4)
-        elif model == "esrgan":
-            arguments["scale"] = min(int(scale) + 1, 4)
-
-        # Submit upscaling job
-        print(f"Submitting upscaling job...")
-        handler = fal_client.submit(
-            model_info['name'],
-            arguments=arguments
-        )
+    job = run_single(build_job(image_path, model, output_dir, scale=scale,
+                               output_format=output_format, quality=quality),
+                     **pipeline_options)
+    if not job.ok:
+        print(f"Error during upscaling: {job.error}")
+        return None
+
+    # Verify and show new dimensions
+    new_width, new_height = job.extra.get('output_dimensions') or get_image_dimensions(job.output_path)
+    elapsed = job.timings.get('fal', 0.0)
 
-        print(f"Job ID: {handler.request_id}")
-        print("Processing...")
+    print(f"\n{'='*60}")
+    print(f"✓ 4K image saved: {job.output_path}")
+    if job.extra.get('converted_from'):
+        print(f"Converted from {job.extra['converted_from'].upper()} to {job.output_options['codec'].upper()}")
+    print(f"Final size: {new_width}x{new_height}")
+    print(f"Processing time: {elapsed:.1f} seconds")
+    print(f"{'='*60}\n")
 
-        # Wait for result
-        start_time = time.time()
-        result = handler.get()
-        elapsed = time.time() - start_time
+    return job.output_path
+
+def decode_tile(job):
+    """Decode a downloaded tile in a postprocess worker so stitching only blends"""
+    image = Image.open(io.BytesIO(job.extra['data']))
+    image.load()
+    job.extra['tile'] = image
+
+def run_tiled_pass(image_path, model, pass_scale, work_dir, tile_size, overlap, jobs,
+                   **pipeline_options):
+    """Upscale one image by an integer factor <= 4 as concurrent tile jobs; returns a PIL image"""
+    from image_tiles import TileStitcher, split_tiles
+
+    size, tiles = split_tiles(image_path, work_dir, tile_size, overlap)
+    arguments = {"scale": pass_scale}
+    tile_jobs = [
+        FalJob(
+            input_path=tile_path,
+            endpoint=MODELS[model]['name'],
+            output_path=tile_path + ".out",
+            arguments=arguments,
+            url_field="image_url",
+            postprocess=decode_tile,
+            in_memory=True,
+        )
+        for box, tile_path in tiles
+    ]
+    print(f"Pass {pass_scale}x: {size[0]}x{size[1]} in {len(tiles)} tile(s)")
 
-        print(f"\n✓ Upscaling complete! ({elapsed:.1f} seconds)")
+    stitcher = TileStitcher(size, pass_scale, overlap)
+    failed = []
 
-        # Find output URL in result
-        output_url = None
-        if 'image' in result:
-            output_url = result['image']['url']
-        elif 'output' in result:
-            output_url = result['output']['url'] if isinstance(result['output'], dict) else result['output']
-        elif 'url' in result:
-            output_url = result['url']
+    def blend(index, job):
+        if job.ok:
+            stitcher.add(tiles[index][0], job.extra.pop('tile'))
         else:
-            # Try to find any URL in the result
-            print("Result structure:")
-            print(result)
-            for key, value in result.items():
-                if isinstance(value, str) and value.startswith('http'):
-                    output_url = value
-                    break
-                elif isinstance(value, dict) and 'url' in value:
-                    output_url = value['url']
-                    break
-
-        if output_url:
-            # Generate output filename
-            input_path = Path(image_path)
-            if output_dir:
-                out_dir = Path(output_dir)
-            else:
-                out_dir = input_path.parent / "4K"
-            out_dir.mkdir(exist_ok=True)
-
-            # Download to temp file first
-            temp_path = out_dir / f"{input_path.stem}_4K_temp"
-            print(f"Downloading...")
-            os.system(f'curl -sS -o "{temp_path}" "{output_url}"')
-
-            # Detect actual format and convert to desired format if needed
-            import subprocess
-            result = subprocess.run(['file', str(temp_path)], capture_output=True, text=True)
-            actual_format = result.stdout.lower()
-
-            # Determine desired extension (prefer original, but use jpg for compatibility)
-            desired_ext = input_path.suffix.lower()
-            if desired_ext not in ['.jpg', '.jpeg', '.png', '.webp']:
-                desired_ext = '.jpg'
-
-            output_path = out_dir / f"{input_path.stem}_4K{desired_ext}"
-
-            # Convert if format doesn't match extension
-            if 'png' in actual_format and desired_ext in ['.jpg', '.jpeg']:
-                print(f"Converting PNG to JPEG for compatibility...")
-                os.system(f'sips -s format jpeg "{temp_path}" --out "{output_path}"')
-                os.remove(temp_path)
-            elif 'jpeg' in actual_format and desired_ext == '.png':
-                print(f"Converting JPEG to PNG...")
-                os.system(f'sips -s format png "{temp_path}" --out "{output_path}"')
-                os.remove(temp_path)
-            else:
-                # Format matches, just rename
-                os.rename(temp_path, output_path)
+            failed.append(job)
+
+    pipeline = FalPipeline.for_jobs(jobs, verbose=False, **pipeline_options)
+    pipeline.run(tile_jobs, on_result=blend)
+    if failed:
+        raise RuntimeError(f"{len(failed)} tile(s) failed, first error: {failed[0].error}")
+    return stitcher.result()
+
+def tiled_output_path(image_path, output_dir=None, output_format="auto") -> Path:
+    """Where upscale_image_tiled saves its result"""
+    input_path = Path(image_path)
+    out_dir = Path(output_dir) if output_dir else input_path.parent / "4K"
+    ext = input_path.suffix.lower()
+    if output_format != "auto" or codec_for_extension(ext, None) is None:
+        ext = CODECS[output_codec(input_path, output_format)]['ext']
+    return out_dir / f"{input_path.stem}_4K{ext}"
+
+def tiled_job(image_path, model, output_format="auto", quality=None, tile_options=None) -> FalJob:
+    """
+    A whole tiled upscale as one FalJob, for the batch journal and result
+    cache (the tiles themselves are never resumed)
+    """
+    return FalJob(
+        input_path=str(image_path),
+        endpoint=MODELS[model]['name'],
+        output_path=str(tiled_output_path(image_path, output_format=output_format)),
+        arguments={"tiled": dict(tile_options or {})},
+        output_options={"output_format": output_format, "quality": quality},
+    )
 
-            # Verify and show new dimensions
-            new_width, new_height = get_image_dimensions(str(output_path))
+def upscale_image_tiled(image_path, model="clarity", output_dir=None, scale=None,
+                        tile_size=1024, overlap=64, jobs=8, output_format="auto",
+                        quality=None, batch_timeout=None, **pipeline_options):
+    """
+    Upscale image as overlapping tiles submitted concurrently, then stitch
 
-            print(f"\n{'='*60}")
-            print(f"✓ 4K image saved: {output_path}")
-            print(f"Final size: {new_width}x{new_height}")
-            print(f"Processing time: {elapsed:.1f} seconds")
-            print(f"{'='*60}\n")
+    Wall-clock time scales with the number of parallel fal workers rather
+    than with pixel count. Factors above 4x are reached with repeated
+    passes; the result is resized to the exact target size.
 
-            return str(output_path)
-        else:
-            print("Error: No output URL in result")
-            print(result)
-            return None
+    Args:
+        image_path: Path to input image
+        model: One of TILED_MODELS (creative invents detail per tile)
+        output_dir: Optional output directory (default: 4K subfolder)
+        scale: Total upscale factor (default: enough to reach 4K)
+        tile_size: Tile edge in source pixels
+        overlap: Overlap between neighbouring tiles in source pixels
+        jobs: Tiles in flight at once
+        output_format: auto (match source), jpeg, png or webp
+        quality: Encoder quality for jpeg/webp
+        batch_timeout: Seconds for the whole image, across every pass
+        pipeline_options: Passed to fal_jobs.FalPipeline
+    """
+    if not os.path.exists(image_path):
+        print(f"Error: File not found: {image_path}")
+        return None
+
+    if model not in TILED_MODELS:
+        print(f"Error: Tiled mode supports: {', '.join(TILED_MODELS)}")
+        return None
+
+    if not configure_api_key():
+        return None
+
+    width, height = get_image_dimensions(image_path)
+    scale = scale or calculate_scale_for_4k(width, height)
+    target = (round(width * scale), round(height * scale))
+
+    input_path = Path(image_path)
+    codec = output_codec(input_path, output_format)
+    output_path = tiled_output_path(input_path, output_dir, output_format)
+
+    print(f"\n{'='*60}")
+    print(f"Image: {input_path.name}")
+    print(f"Current size: {width}x{height}")
+    print(f"Scale factor: {scale:.2f}x (tiled, {jobs} parallel)")
+    print(f"Target size: {target[0]}x{target[1]}")
+    print(f"Model: {MODELS[model]['description']}")
+    print(f"{'='*60}\n")
 
+    start_time = time.time()
+    deadline = start_time + batch_timeout if batch_timeout else None
+    try:
+        with tempfile.TemporaryDirectory(prefix="vibe-tiles-") as work:
+            current, remaining, pass_no = str(input_path), scale, 0
+            while remaining > 1.0 + 1e-6:
+                pass_no += 1
+                pass_scale = min(4, math.ceil(remaining))
+                # One deadline for all passes, not a fresh one per pass
+                time_left = deadline - time.time() if deadline else None
+                if time_left is not None and time_left <= 0:
+                    raise TimeoutError(f"batch timeout reached before pass {pass_no}")
+                result = run_tiled_pass(current, model, pass_scale, Path(work) / f"pass{pass_no}",
+                                        tile_size, overlap, jobs, batch_timeout=time_left, **pipeline_options)
+                remaining /= pass_scale
+                if remaining > 1.0 + 1e-6:
+                    current = str(Path(work) / f"pass{pass_no}.png")
+                    result.save(current, "PNG")
+
+            if result.size != target:
+                result = result.resize(target, Image.LANCZOS)
+            save_image(result, output_path, codec, quality)
     except Exception as e:
-        print(f"Error during upscaling: {e}")
-        import traceback
-        traceback.print_exc()
+        print(f"Error during tiled upscaling: {e}")
         return None
 
-def batch_upscale(input_dir, model="clarity", extensions=None):
-    """Upscale all images in a directory"""
+    elapsed = time.time() - start_time
+    print(f"\n{'='*60}")
+    print(f"✓ 4K image saved: {output_path}")
+    print(f"Final size: {target[0]}x{target[1]}")
+    print(f"Processing time: {elapsed:.1f} seconds")
+    print(f"{'='*60}\n")
+
+    return str(output_path)
+
+def batch_upscale(input_dir, model="clarity", extensions=None, jobs=1, output_format="auto",
+                  quality=None, tile_options=None, fresh=False, **pipeline_options):
+    """
+    Upscale all images in a directory
+
+    Args:
+        input_dir: Directory containing images
+        model: One of: creative, clarity, esrgan
+        extensions: File extensions to include
+        jobs: Number of fal requests in flight at once
+        output_format: auto (match source), jpeg, png or webp
+        quality: Encoder quality for jpeg/webp (forces a re-encode)
+        tile_options: Upscale each image in tiled mode with these
+                      upscale_image_tiled arguments (jobs then counts tiles)
+        pipeline_options: Passed to fal_jobs.FalPipeline
+    """
     if extensions is None:
         extensions = ['.jpg', '.jpeg', '.png', '.webp']
 
@@ -233,6 +355,9 @@ def batch_upscale(input_dir, model="clarity", extensions=None):
         print(f"Error: Directory not found: {input_dir}")
         return
 
+    if not check_model(model) or not configure_api_key():
+        return
+
     # Find all images
     images = []
     for ext in extensions:
@@ -240,7 +365,7 @@ def batch_upscale(input_dir, model="clarity", extensions=None):
         images.extend(input_path.glob(f"*{ext.upper()}"))
 
     # Filter out already upscaled images
-    images = [img for img in images if '_4K' not in img.stem]
+    images = sorted(set(img for img in images if '_4K' not in img.stem))
 
     if not images:
         print(f"No images found in {input_dir}")
@@ -248,40 +373,165 @@ def batch_upscale(input_dir, model="clarity", extensions=None):
 
     print(f"Found {len(images)} image(s) to upscale")
     print(f"Model: {model}")
+    print(f"Parallel jobs: {max(1, jobs)}")
     print()
 
-    for i, image in enumerate(images, 1):
-        print(f"\n[{i}/{len(images)}] Processing: {image.name}")
-        result = upscale_image(str(image), model=model)
-        if result:
-            print(f"✓ Completed: {Path(result).name}")
+    results = {"success": 0, "skipped": 0, "failed": 0, "cancelled": 0}
+    batch_start = time.time()
+
+    if tile_options is not None:
+        # Images go one at a time; the parallelism is across each image's tiles.
+        # Whole images are journaled and cached, and --batch-timeout covers the batch.
+        journal = BatchJournal.for_batch("upscale_image_tiled", input_dir, model, fresh=fresh)
+        batch_timeout = pipeline_options.pop('batch_timeout', None)
+        deadline = batch_start + batch_timeout if batch_timeout else None
+        use_cache = pipeline_options.get('use_cache', True)
+        for i, image in enumerate(images, 1):
+            job = tiled_job(image, model, output_format, quality, tile_options)
+            key = job_key(job)
+            cache_key = entry = None
+            if use_cache:
+                sha256 = fal_cache.file_sha256(job.input_path)
+                cache_key = fal_cache.result_key(sha256, job.endpoint, job.arguments, job.output_options)
+                entry = fal_cache.lookup_result(cache_key)
+                if entry and not fal_cache.output_is_current(entry):
+                    entry = None
+            if journal.is_done(key, job.output_path) or entry:
+                print(f"[{i}/{len(images)}] ✓ Up to date: {Path(job.output_path).name}")
+                results["skipped"] += 1
+                continue
+            time_left = deadline - time.time() if deadline else None
+            if time_left is not None and time_left <= 0:
+                print(f"[{i}/{len(images)}] ⏱ Cancelled (retryable): {image.name} (batch timeout)")
+                results["cancelled"] += 1
+                continue
+            print(f"[{i}/{len(images)}] Processing: {image.name}")
+            output = upscale_image_tiled(str(image), model, jobs=jobs, output_format=output_format,
+                                         quality=quality, batch_timeout=time_left, **tile_options,
+                                         **pipeline_options)
+            if output:
+                # No single fal URL for a stitched image; the local file stands in
+                job.output_url = Path(output).resolve().as_uri()
+                journal.done(key, job)
+                if cache_key:
+                    fal_cache.record_result(cache_key, sha256, job.endpoint, job.arguments, job.output_url,
+                                            output, job.output_options)
+                results["success"] += 1
+            else:
+                job.error = "tiled upscale failed"
+                journal.failed(key, job)
+                results["failed"] += 1
+        journal.close()
+        elapsed = time.time() - batch_start
+        print(f"\nBatch complete: {results['success']} successful, {results['skipped']} up to date, "
+              f"{results['failed']} failed in {elapsed:.1f} seconds")
+        if results["cancelled"]:
+            print(f"{results['cancelled']} cancelled at the batch timeout; re-run the batch to retry them")
+        return results
+
+    def report(index, job):
+        if job.cached == 'output':
+            print(f"[{index + 1}/{len(batch)}] ✓ Up to date: {Path(job.output_path).name}")
+            results["skipped"] += 1
+        elif job.ok:
+            print(f"[{index + 1}/{len(batch)}] ✓ Completed: {Path(job.output_path).name}")
+            results["success"] += 1
+        elif job.retryable:
+            print(f"[{index + 1}/{len(batch)}] ⏱ Cancelled (retryable): {job.name} ({job.error})")
+            results["cancelled"] += 1
         else:
-            print(f"✗ Failed: {image.name}")
+            print(f"[{index + 1}/{len(batch)}] ✗ Failed: {job.name} ({job.error})")
+            results["failed"] += 1
+
+    # Images whose header can't be read are reported up front, not sent to fal
+    batch = []
+    for image in images:
+        try:
+            batch.append(build_job(str(image), model, output_format=output_format, quality=quality))
+        except (OSError, ValueError) as e:
+            print(f"✗ Failed: {image.name} ({e})")
+            results["failed"] += 1
+
+    # Resumes an interrupted run of the same batch (see batch_journal)
+    journal = BatchJournal.for_batch("upscale_image", input_dir, model, fresh=fresh)
+    pipeline = FalPipeline.for_jobs(jobs, journal=journal, **pipeline_options)
+    pipeline.run(batch, on_result=report)
+    journal.close()
+
+    elapsed = time.time() - batch_start
+    throughput = results["success"] / (elapsed / 60) if elapsed > 0 else 0.0
+    print(f"\nBatch complete: {results['success']} successful, {results['skipped']} up to date, {results['failed']} failed "
+          f"in {elapsed:.1f} seconds ({throughput:.1f} images/min)")
+    if results["cancelled"]:
+        print(f"{results['cancelled']} cancelled at a deadline; re-run the batch to retry them")
+
+    return results
+
+def print_usage():
+    print("Usage:")
+    print("  Single image: python upscale_image_to_4k.py <image.jpg> [model]")
+    print("  Batch process: python upscale_image_to_4k.py --batch <directory> [model] [--jobs N]")
+    print()
+    print("Available models:")
+    for name, info in MODELS.items():
+        print(f"  {name:12} - {info['description']} ({info['cost']})")
+    print()
+    print("Examples:")
+    print("  python upscale_image_to_4k.py photo.jpg")
+    print("  python upscale_image_to_4k.py photo.jpg creative")
+    print("  python upscale_image_to_4k.py --batch ./photos clarity")
+    print("  python upscale_image_to_4k.py --batch ./photos clarity --jobs 6")
+    print("  python upscale_image_to_4k.py --batch ./photos esrgan --format webp --quality 90")
+    print("  python upscale_image_to_4k.py huge.png clarity --tiled --jobs 8")
 
 def main():
     if len(sys.argv) < 2:
-        print("Usage:")
-        print("  Single image: python upscale_image_to_4k.py <image.jpg> [model]")
-        print("  Batch process: python upscale_image_to_4k.py --batch <directory> [model]")
-        print()
-        print("Available models:")
-        for name, info in MODELS.items():
-            print(f"  {name:12} - {info['description']} ({info['cost']})")
-        print()
-        print("Examples:")
-        print("  python upscale_image_to_4k.py photo.jpg")
-        print("  python upscale_image_to_4k.py photo.jpg creative")
-        print("  python upscale_image_to_4k.py --batch ./photos clarity")
+        print_usage()
         sys.exit(1)
 
-    if sys.argv[1] == "--batch":
-        directory = sys.argv[2] if len(sys.argv) > 2 else "."
-        model = sys.argv[3] if len(sys.argv) > 3 else "clarity"
-        batch_upscale(directory, model)
+    parser = argparse.ArgumentParser(description="Upscale images to 4K using Fal.ai")
+    parser.add_argument("target", nargs="?", help="Image file, or directory with --batch")
+    parser.add_argument("model", nargs="?", default="clarity", choices=list(MODELS.keys()))
+    parser.add_argument("--batch", action="store_true", help="Upscale every image in a directory")
+    parser.add_argument("--jobs", "-j", type=int, default=1, help="Images to process in parallel (batch mode)")
+    parser.add_argument("--format", dest="output_format", default="auto",
+                        choices=["auto"] + list(CODECS.keys()),
+                        help="Output codec (default: same as the source image)")
+    parser.add_argument("--quality", type=int, help="JPEG/WebP quality 1-100 (re-encodes the result)")
+    parser.add_argument("--encode-workers", type=int, help="Parallel transcodes (default: CPU count)")
+    parser.add_argument("--no-cache", action="store_true", help="Ignore cached uploads and results")
+    parser.add_argument("--timeout", type=float, metavar="SECONDS",
+                        help="Cancel a fal request still unfinished after SECONDS (retryable)")
+    parser.add_argument("--batch-timeout", type=float, metavar="SECONDS",
+                        help="Cancel everything still outstanding SECONDS after the batch starts")
+    parser.add_argument("--tiled", action="store_true",
+                        help="Split into overlapping tiles upscaled in parallel (--jobs counts tiles)")
+    parser.add_argument("--tile-size", type=int, default=1024, help="Tile edge in source pixels (tiled mode)")
+    parser.add_argument("--overlap", type=int, default=64, help="Tile overlap in source pixels (tiled mode)")
+    parser.add_argument("--scale", type=float, help="Total upscale factor, may exceed 4x (tiled mode)")
+    parser.add_argument("--fresh", action="store_true",
+                        help="Ignore the batch journal and start the batch over")
+    args = parser.parse_args()
+
+    pipeline_options = {"use_cache": not args.no_cache, "job_timeout": args.timeout,
+                        "batch_timeout": args.batch_timeout, "postprocess_workers": args.encode_workers}
+    output_options = {"output_format": args.output_format, "quality": args.quality}
+
+    tile_options = None
+    if args.tiled:
+        tile_options = {"tile_size": args.tile_size, "overlap": args.overlap, "scale": args.scale}
+
+    if args.batch:
+        batch_upscale(args.target or ".", args.model, jobs=args.jobs, tile_options=tile_options,
+                      fresh=args.fresh, **output_options, **pipeline_options)
+    elif args.target and tile_options is not None:
+        upscale_image_tiled(args.target, args.model, jobs=args.jobs, **tile_options,
+                            **output_options, **pipeline_options)
+    elif args.target:
+        upscale_image(args.target, args.model, **output_options, **pipeline_options)
     else:
-        image_path = sys.argv[1]
-        model = sys.argv[2] if len(sys.argv) > 2 else "clarity"
-        upscale_image(image_path, model)
+        print_usage()
+        sys.exit(1)
 
 if __name__ == "__main__":
     main()
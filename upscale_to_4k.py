@@ -7,19 +7,21 @@ Supports multiple upscaling models with different quality/cost tradeoffs
 import os
 import sys
 import time
+import argparse
+import tempfile
 from pathlib import Path
 from dotenv import load_dotenv
 
+import fal_cache
+from batch_journal import BatchJournal, job_key
+from fal_jobs import FalJob, FalPipeline, configure_api_key, run_single, upload_file
+from ffmpeg_utils import (CROP_1080P, FFmpegError, check_timestamps, concat_copy, encode_clip, extract_frame,
+                          probe_video, require_ffmpeg, split_at_keyframes)
+from fused_upload import crop_and_upload, streaming_supported
+
 # Load environment variables
 load_dotenv('.env.local')
 
-try:
-    import fal_client
-except ImportError:
-    print("Installing fal_client...")
-    os.system("pip install fal-client")
-    import fal_client
-
 # Available models and their pricing
 MODELS = {
     "bytedance": {
@@ -44,14 +46,85 @@ MODELS = {
     }
 }
 
+# Output frame sizes for target_resolution
+RESOLUTIONS = {"1080p": (1920, 1080), "2k": (2560, 1440), "4k": (3840, 2160)}
+
 def upload_video_to_fal(video_path):
     """Upload video file to Fal.ai and return URL"""
     print(f"Uploading {video_path}...")
-    url = fal_client.upload_file(video_path)
+    url = upload_file(video_path)
     print(f"✓ Uploaded: {url}")
     return url
 
-def upscale_video(video_path, model="bytedance", target_resolution="4k"):
+def build_arguments(model, target_resolution="4k"):
+    """Model-specific request arguments"""
+    arguments = {}
+    if model == "bytedance":
+        arguments["target_resolution"] = target_resolution  # Options: 1080p, 2k, 4k
+        arguments["target_fps"] = "30fps"  # Options: 30fps, 60fps
+    elif model == "seedvr2":
+        arguments["scale"] = 4
+        arguments["variant"] = "7b"  # Higher quality variant
+    elif model == "topaz":
+        arguments["enhancement_amount"] = 0.75
+        arguments["output_format"] = "mp4"
+    return arguments
+
+def build_job(video_path, model="bytedance", target_resolution="4k", fused_crop=False, use_cache=True):
+    """
+    Describe the fal job for one video (input, endpoint, arguments, output path)
+
+    With fused_crop the input is a raw 1920x1088 recording that is cropped
+    to 1080p and streamed into fal storage in one pass (see fused_upload);
+    the output is named as if the crop had been a separate step.
+    """
+    input_path = Path(video_path)
+    output_dir = input_path.parent / "4K"
+    stem = f"{input_path.stem}_1080p" if fused_crop else input_path.stem
+    job = FalJob(
+        input_path=str(input_path),
+        endpoint=MODELS[model]['name'],
+        output_path=str(output_dir / f"{stem}_4K_{model}.mp4"),
+        arguments=build_arguments(model, target_resolution),
+        url_field="video_url",
+    )
+    if fused_crop:
+        job.upload = lambda job: crop_and_upload(job.input_path, use_cache=use_cache)
+        job.output_options = {"fused_crop": CROP_1080P}
+    return job
+
+def whole_video_job(video_path, model="bytedance", target_resolution="4k", segment_seconds=None,
+                    elide_static=None, image_model="clarity"):
+    """
+    A whole segmented or static-elided upscale as one FalJob, for the batch
+    journal and result cache (the segments themselves are never resumed)
+    """
+    job = build_job(str(video_path), model, target_resolution)
+    if elide_static:
+        job.output_options = {"elide_static": elide_static, "image_model": image_model}
+    else:
+        job.output_options = {"segment_seconds": segment_seconds}
+    return job
+
+def check_fused_crop():
+    """Fused crop needs ffmpeg; streaming the upload also needs a known fal_client"""
+    try:
+        require_ffmpeg()
+    except FFmpegError as e:
+        print(f"Error: {e}")
+        return False
+    if not streaming_supported():
+        print("Note: this fal_client can't stream uploads; each crop is written to a temp file and uploaded")
+    return True
+
+def check_model(model):
+    if model not in MODELS:
+        print(f"Error: Unknown model '{model}'. Choose from: {', '.join(MODELS.keys())}")
+        return False
+    return True
+
+def upscale_video(video_path, model="bytedance", target_resolution="4k", fused_crop=False,
+                  **pipeline_options):
     """
     Upscale video to 4K using selected Fal.ai model
 
@@ -59,158 +132,500 @@ def upscale_video(video_path, model="bytedance", target_resolution="4k"):
         video_path: Path to input video
         model: One of: bytedance (default), seedvr2, topaz, flashvsr
         target_resolution: Target resolution (default: 4k)
+        fused_crop: Input is a raw 1920x1088 recording; crop it while uploading
+        pipeline_options: Passed to fal_jobs.FalPipeline (e.g. use_cache=False)
     """
     if not os.path.exists(video_path):
         print(f"Error: File not found: {video_path}")
         return None
 
-    if model not in MODELS:
-        print(f"Error: Unknown model '{model}'. Choose from: {', '.join(MODELS.keys())}")
+    if not check_model(model) or not configure_api_key():
         return None
 
-    # Configure API key - Fal.ai expects FAL_KEY environment variable
-    api_key = os.getenv('FAL_API_KEY')
-    if not api_key:
-        print("Error: FAL_API_KEY not found in .env.local")
+    if fused_crop and not check_fused_crop():
         return None
 
-    # Set FAL_KEY for fal_client
-    os.environ['FAL_KEY'] = api_key
-
     model_info = MODELS[model]
     print(f"\n{'='*60}")
     print(f"Upscaling with: {model_info['description']}")
     print(f"Model: {model_info['name']}")
     print(f"Cost: {model_info['cost']}")
     print(f"{'='*60}\n")
+    print("Processing... (this may take a few minutes)")
+
+    job = build_job(video_path, model, target_resolution, fused_crop=fused_crop,
+                    use_cache=pipeline_options.get('use_cache', True))
+    job = run_single(job, **pipeline_options)
+    if not job.ok:
+        print(f"Error during upscaling: {job.error}")
+        return None
+
+    elapsed = job.timings.get('fal', 0.0)
+    print(f"\n{'='*60}")
+    print(f"✓ 4K video saved: {job.output_path}")
+    print(f"Processing time: {elapsed:.1f} seconds")
+    print(f"{'='*60}\n")
+
+    return job.output_path
+
+def duration_tolerance(source, upscaled):
+    """Two frames at the coarser of the two rates (models may resample, e.g. bytedance to 30fps)"""
+    return max(2.0 / (source["fps"] or 30.0), 2.0 / (upscaled["fps"] or 30.0))
+
+def verify_segment(source_path, upscaled_path):
+    """
+    Check an upscaled segment covers the same time span as its source
+
+    Returns the segment's frame count (at the output frame rate)
+    """
+    source, upscaled = probe_video(source_path), probe_video(upscaled_path)
+    tolerance = duration_tolerance(source, upscaled)
+    if abs(upscaled["duration"] - source["duration"]) > tolerance:
+        raise FFmpegError(f"{Path(upscaled_path).name}: duration {upscaled['duration']:.3f}s "
+                          f"!= source {source['duration']:.3f}s")
+    return check_timestamps(upscaled_path)
+
+def upscale_video_segmented(video_path, model="bytedance", target_resolution="4k",
+                            segment_seconds=60, jobs=4, **pipeline_options):
+    """
+    Upscale a long video as keyframe-aligned segments submitted concurrently
+
+    The source is split with stream copy, segments go through the fal
+    pipeline in parallel, and the upscaled segments are rejoined with the
+    concat demuxer (no re-encode) before the source audio is copied back in.
+    Frame counts and timestamps are checked per segment and after the join.
+
+    Args:
+        video_path: Path to input video
+        model: One of: bytedance (default), seedvr2, topaz, flashvsr
+        target_resolution: Target resolution (default: 4k)
+        segment_seconds: Approximate segment length; cuts snap to keyframes
+        jobs: Segments in flight at once
+        pipeline_options: Passed to fal_jobs.FalPipeline
+    """
+    if not os.path.exists(video_path):
+        print(f"Error: File not found: {video_path}")
+        return None
+
+    if not check_model(model) or not configure_api_key():
+        return None
 
     try:
-        # Upload video
-        video_url = upload_video_to_fal(video_path)
-
-        # Prepare arguments based on model
-        arguments = {
-            "video_url": video_url,
-        }
-
-        # Add model-specific parameters
-        if model == "bytedance":
-            arguments["target_resolution"] = "4k"  # Options: 1080p, 2k, 4k
-            arguments["target_fps"] = "30fps"  # Options: 30fps, 60fps
-        elif model == "seedvr2":
-            arguments["scale"] = 4
-            arguments["variant"] = "7b"  # Higher quality variant
-        elif model == "topaz":
-            arguments["enhancement_amount"] = 0.75
-            arguments["output_format"] = "mp4"
-
-        # Submit upscaling job
-        print(f"Submitting upscaling job...")
-        handler = fal_client.submit(
-            model_info['name'],
-            arguments=arguments
-        )
-
-        print(f"Job ID: {handler.request_id}")
-        print("Processing... (this may take a few minutes)")
-
-        # Wait for result with progress updates
-        start_time = time.time()
-        result = handler.get()
-        elapsed = time.time() - start_time
-
-        print(f"\n✓ Upscaling complete! ({elapsed:.1f} seconds)")
-
-        # Download result
-        if 'video' in result:
-            output_url = result['video']['url']
-        elif 'output_url' in result:
-            output_url = result['output_url']
-        else:
-            print("Result structure:")
-            print(result)
-            output_url = result.get('url', None)
+        require_ffmpeg()
+    except FFmpegError as e:
+        print(f"Error: {e}")
+        return None
 
-        if output_url:
-            # Generate output filename in 4K subfolder
-            input_path = Path(video_path)
-            output_dir = input_path.parent / "4K"
-            output_dir.mkdir(exist_ok=True)
-            output_path = output_dir / f"{input_path.stem}_4K_{model}.mp4"
+    input_path = Path(video_path)
+    output_path = Path(build_job(video_path, model, target_resolution).output_path)
+    output_path.parent.mkdir(parents=True, exist_ok=True)
 
-            print(f"Downloading to: {output_path}")
+    model_info = MODELS[model]
+    print(f"\n{'='*60}")
+    print(f"Upscaling with: {model_info['description']}")
+    print(f"Model: {model_info['name']}")
+    print(f"Segments: ~{segment_seconds}s each, {jobs} in parallel")
+    print(f"{'='*60}\n")
 
-            # Download using curl
-            os.system(f'curl -o "{output_path}" "{output_url}"')
+    start_time = time.time()
+    try:
+        # Work next to the output so segments don't cross filesystems
+        with tempfile.TemporaryDirectory(prefix=f".{input_path.stem}_segments_",
+                                         dir=output_path.parent) as work:
+            segments = split_at_keyframes(video_path, Path(work) / "source", segment_seconds)
+            print(f"Split into {len(segments)} segment(s) at keyframes")
+
+            segment_jobs = [
+                FalJob(
+                    input_path=segment,
+                    endpoint=model_info['name'],
+                    output_path=str(Path(work) / "upscaled" / f"{Path(segment).stem}_4K.mp4"),
+                    arguments=build_arguments(model, target_resolution),
+                    url_field="video_url",
+                )
+                for segment in segments
+            ]
+
+            failed = []
+
+            def report(index, job):
+                if job.ok:
+                    print(f"[{index + 1}/{len(segment_jobs)}] ✓ Segment done: {job.name}")
+                else:
+                    print(f"[{index + 1}/{len(segment_jobs)}] ✗ Segment failed: {job.name} ({job.error})")
+                    failed.append(job)
+
+            pipeline = FalPipeline(upload_workers=min(jobs, 4), fal_workers=jobs,
+                                   download_workers=min(jobs, 4), verbose=False, **pipeline_options)
+            pipeline.run(segment_jobs, on_result=report)
+            if failed:
+                print(f"Error during upscaling: {len(failed)} segment(s) failed")
+                return None
+
+            # Counted on the upscaled segments, so at the output frame rate like the join
+            expected_frames = sum(verify_segment(job.input_path, job.output_path)
+                                  for job in segment_jobs)
+            upscaled = [job.output_path for job in segment_jobs]
+            audio_from = video_path if probe_video(video_path)["has_audio"] else None
+            concat_copy(upscaled, output_path, audio_from=audio_from)
+
+        frames = check_timestamps(output_path)
+        if frames != expected_frames:
+            raise FFmpegError(f"Joined video has {frames} frames, segments had {expected_frames}")
+        source, result = probe_video(video_path), probe_video(output_path)
+        if abs(result["duration"] - source["duration"]) > duration_tolerance(source, result) + 0.1:
+            raise FFmpegError(f"Joined duration {result['duration']:.3f}s "
+                              f"!= source {source['duration']:.3f}s")
+    except FFmpegError as e:
+        print(f"Error during segmented upscaling: {e}")
+        return None
 
-            print(f"\n{'='*60}")
-            print(f"✓ 4K video saved: {output_path}")
-            print(f"Processing time: {elapsed:.1f} seconds")
-            print(f"{'='*60}\n")
+    elapsed = time.time() - start_time
+    print(f"\n{'='*60}")
+    print(f"✓ 4K video saved: {output_path}")
+    print(f"Frames: {frames} ({result['width']}x{result['height']})")
+    print(f"Processing time: {elapsed:.1f} seconds")
+    print(f"{'='*60}\n")
 
-            return str(output_path)
-        else:
-            print("Error: No output URL in result")
-            print(result)
-            return None
-
-    except Exception as e:
-        print(f"Error during upscaling: {e}")
-        import traceback
-        traceback.print_exc()
+    return str(output_path)
+
+def target_size(width, height, target_resolution="4k"):
+    """Output frame size: the source scaled up to cover the target resolution, even dimensions"""
+    target_w, target_h = RESOLUTIONS.get(target_resolution, RESOLUTIONS["4k"])
+    scale = max(target_w / width, target_h / height)
+    return round(width * scale / 2) * 2, round(height * scale / 2) * 2
+
+def upscale_video_elided(video_path, model="bytedance", target_resolution="4k",
+                         image_model="clarity", min_static_seconds=2.0, threshold=1.0,
+                         jobs=4, **pipeline_options):
+    """
+    Upscale a screen recording, sending only its moving parts to the video model
+
+    Runs of (near-)identical frames at least min_static_seconds long are
+    replaced by one representative frame upscaled through the image models;
+    the motion in between is cut into clips for the video model. All jobs
+    share one pipeline, then the full-length timeline is rebuilt locally
+    with the source audio.
+
+    Args:
+        video_path: Path to input video
+        model: Video model for motion spans
+        target_resolution: Target resolution (default: 4k)
+        image_model: upscale_image_to_4k model for static frames
+        min_static_seconds: Shortest still run worth eliding
+        threshold: Mean gray-level difference still counted as identical
+        jobs: fal requests in flight at once
+        pipeline_options: Passed to fal_jobs.FalPipeline
+    """
+    from static_elision import analysis_frames, assemble, find_runs, plan_spans
+    from upscale_image_to_4k import MODELS as IMAGE_MODELS, build_job as build_image_job
+
+    if not os.path.exists(video_path):
+        print(f"Error: File not found: {video_path}")
+        return None
+
+    if not check_model(model) or not configure_api_key():
         return None
 
-def batch_upscale(input_dir, model="bytedance"):
-    """Upscale all 1080p videos in a directory"""
+    if image_model not in IMAGE_MODELS:
+        print(f"Error: Unknown image model '{image_model}'. Choose from: {', '.join(IMAGE_MODELS.keys())}")
+        return None
+
+    try:
+        require_ffmpeg()
+    except FFmpegError as e:
+        print(f"Error: {e}")
+        return None
+
+    input_path = Path(video_path)
+    output_path = Path(build_job(video_path, model, target_resolution).output_path)
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    start_time = time.time()
+
+    try:
+        source = probe_video(video_path)
+        fps = source["fps"] or 30.0
+        size = target_size(source["width"], source["height"], target_resolution)
+        print(f"Analysing {input_path.name} for static runs...")
+        runs = find_runs(analysis_frames(video_path, fps, source["width"], source["height"]), threshold)
+        spans = plan_spans(runs, fps, min_static_seconds)
+        total = sum(span.seconds(fps) for span in spans)
+        motion = sum(span.seconds(fps) for span in spans if span.kind == "motion")
+        stills = sum(1 for span in spans if span.kind == "static")
+
+        print(f"\n{'='*60}")
+        print(f"Upscaling with: {MODELS[model]['description']}")
+        print(f"Motion: {motion:.1f}s of {total:.1f}s sent to {MODELS[model]['name']}")
+        print(f"Static: {stills} run(s) as single frames via {IMAGE_MODELS[image_model]['name']}")
+        print(f"Billed seconds saved: {total - motion:.1f}s ({(total - motion) / total * 100 if total else 0:.0f}%)")
+        print(f"{'='*60}\n")
+
+        with tempfile.TemporaryDirectory(prefix=f".{input_path.stem}_elide_",
+                                         dir=output_path.parent) as work:
+            work = Path(work)
+            jobs_list = []
+            for index, span in enumerate(spans):
+                start = span.start / fps
+                seconds = span.seconds(fps)
+                if span.kind == "motion":
+                    clip = work / f"span{index:04d}.mp4"
+                    encode_clip(video_path, start, seconds, clip)
+                    jobs_list.append(FalJob(
+                        input_path=str(clip),
+                        endpoint=MODELS[model]['name'],
+                        output_path=str(work / f"span{index:04d}_4K.mp4"),
+                        arguments=build_arguments(model, target_resolution),
+                        url_field="video_url",
+                    ))
+                else:
+                    frame = work / f"span{index:04d}.png"
+                    extract_frame(video_path, start + seconds / 2, frame)
+                    scale = max(size[0] / source["width"], size[1] / source["height"])
+                    jobs_list.append(build_image_job(str(frame), image_model, output_dir=work / "4K",
+                                                     scale=scale, output_format="png"))
+
+            failed = []
+
+            def report(index, job):
+                label = "motion" if spans[index].kind == "motion" else "still"
+                if job.ok:
+                    print(f"[{index + 1}/{len(jobs_list)}] ✓ {label}: {job.name}")
+                else:
+                    print(f"[{index + 1}/{len(jobs_list)}] ✗ {label}: {job.name} ({job.error})")
+                    failed.append(job)
+
+            pipeline = FalPipeline(upload_workers=min(jobs, 4), fal_workers=jobs,
+                                   download_workers=min(jobs, 4), verbose=False, **pipeline_options)
+            pipeline.run(jobs_list, on_result=report)
+            if failed:
+                print(f"Error during upscaling: {len(failed)} span(s) failed")
+                return None
+
+            print("Rebuilding full timeline...")
+            parts = [(span.kind, job.output_path, span.seconds(fps)) for span, job in zip(spans, jobs_list)]
+            assemble(parts, output_path, fps, size,
+                     audio_from=video_path if source["has_audio"] else None)
+
+        result = probe_video(output_path)
+        if abs(result["duration"] - source["duration"]) > 2.0 / fps + 0.1:
+            raise FFmpegError(f"Rebuilt duration {result['duration']:.3f}s "
+                              f"!= source {source['duration']:.3f}s")
+    except FFmpegError as e:
+        print(f"Error during static-elided upscaling: {e}")
+        return None
+
+    elapsed = time.time() - start_time
+    print(f"\n{'='*60}")
+    print(f"✓ 4K video saved: {output_path}")
+    print(f"Size: {result['width']}x{result['height']}, {result['duration']:.1f}s")
+    print(f"Processing time: {elapsed:.1f} seconds")
+    print(f"{'='*60}\n")
+
+    return str(output_path)
+
+def batch_upscale(input_dir, model="bytedance", jobs=1, segment_seconds=None, elide_static=None,
+                  image_model="clarity", fresh=False, fused_crop=False, **pipeline_options):
+    """
+    Upscale all 1080p videos in a directory
+
+    With segment_seconds or elide_static (minimum still-run seconds) set,
+    videos go one at a time and jobs counts segments/spans instead. With
+    fused_crop the directory holds raw 1920x1088 recordings, which are
+    cropped while they upload.
+    """
     input_path = Path(input_dir)
 
     if not input_path.exists():
         print(f"Error: Directory not found: {input_dir}")
         return
 
-    # Find all 1080p videos
-    videos = list(input_path.glob("*_1080p.mp4"))
+    if not check_model(model) or not configure_api_key():
+        return
+
+    if fused_crop:
+        if not check_fused_crop():
+            return
+        # Raw recordings: anything not already a crop or an upscale
+        videos = sorted(v for v in input_path.glob("*.mp4")
+                        if not v.stem.endswith("_1080p") and "_4K" not in v.stem)
+        pattern = "raw *.mp4"
+    else:
+        # Find all 1080p videos
+        videos = sorted(input_path.glob("*_1080p.mp4"))
+        pattern = "*_1080p.mp4"
 
     if not videos:
-        print(f"No *_1080p.mp4 videos found in {input_dir}")
+        print(f"No {pattern} videos found in {input_dir}")
         return
 
     print(f"Found {len(videos)} video(s) to upscale")
     print(f"Model: {model}")
+    print(f"Parallel jobs: {max(1, jobs)}")
     print()
 
-    for i, video in enumerate(videos, 1):
-        print(f"\n[{i}/{len(videos)}] Processing: {video.name}")
-        result = upscale_video(str(video), model=model)
-        if result:
-            print(f"✓ Completed: {Path(result).name}")
+    results = {"success": 0, "skipped": 0, "failed": 0, "cancelled": 0}
+    batch_start = time.time()
+
+    if segment_seconds or elide_static:
+        # Videos go one at a time; the parallelism is across each video's segments.
+        # Whole videos are journaled and cached, and --batch-timeout covers the batch.
+        command = "upscale_video_elided" if elide_static else "upscale_video_segmented"
+        journal = BatchJournal.for_batch(command, input_dir, model, fresh=fresh)
+        batch_timeout = pipeline_options.pop('batch_timeout', None)
+        deadline = batch_start + batch_timeout if batch_timeout else None
+        use_cache = pipeline_options.get('use_cache', True)
+        for i, video in enumerate(videos, 1):
+            job = whole_video_job(video, model, segment_seconds=segment_seconds,
+                                  elide_static=elide_static, image_model=image_model)
+            key = job_key(job)
+            cache_key = entry = None
+            if use_cache:
+                sha256 = fal_cache.file_sha256(job.input_path)
+                cache_key = fal_cache.result_key(sha256, job.endpoint, job.arguments, job.output_options)
+                entry = fal_cache.lookup_result(cache_key)
+                if entry and not fal_cache.output_is_current(entry):
+                    entry = None
+            if journal.is_done(key, job.output_path) or entry:
+                print(f"[{i}/{len(videos)}] ✓ Up to date: {Path(job.output_path).name}")
+                results["skipped"] += 1
+                continue
+            time_left = deadline - time.time() if deadline else None
+            if time_left is not None and time_left <= 0:
+                print(f"[{i}/{len(videos)}] ⏱ Cancelled (retryable): {video.name} (batch timeout)")
+                results["cancelled"] += 1
+                continue
+            print(f"[{i}/{len(videos)}] Processing: {video.name}")
+            if elide_static:
+                output = upscale_video_elided(str(video), model, image_model=image_model,
+                                              min_static_seconds=elide_static, jobs=jobs,
+                                              batch_timeout=time_left, **pipeline_options)
+            else:
+                output = upscale_video_segmented(str(video), model, segment_seconds=segment_seconds,
+                                                 jobs=jobs, batch_timeout=time_left, **pipeline_options)
+            if output:
+                # No single fal URL for a rebuilt video; the local file stands in
+                job.output_url = Path(output).resolve().as_uri()
+                journal.done(key, job)
+                if cache_key:
+                    fal_cache.record_result(cache_key, sha256, job.endpoint, job.arguments, job.output_url,
+                                            output, job.output_options)
+                results["success"] += 1
+            elif deadline and time.time() >= deadline:
+                print(f"[{i}/{len(videos)}] ⏱ Cancelled (retryable): {video.name} (batch timeout)")
+                job.error, job.retryable = "cancelled at the batch timeout", True
+                journal.failed(key, job)
+                results["cancelled"] += 1
+            else:
+                job.error = f"{'static-elided' if elide_static else 'segmented'} upscale failed"
+                journal.failed(key, job)
+                results["failed"] += 1
+        journal.close()
+        elapsed = time.time() - batch_start
+        print(f"\nBatch complete: {results['success']} successful, {results['skipped']} up to date, "
+              f"{results['failed']} failed in {elapsed:.1f} seconds")
+        if results["cancelled"]:
+            print(f"{results['cancelled']} cancelled at the batch timeout; re-run the batch to retry them")
+        return results
+
+    def report(index, job):
+        if job.cached == 'output':
+            print(f"[{index + 1}/{len(videos)}] ✓ Up to date: {Path(job.output_path).name}")
+            results["skipped"] += 1
+        elif job.ok:
+            print(f"[{index + 1}/{len(videos)}] ✓ Completed: {Path(job.output_path).name}")
+            results["success"] += 1
+        elif job.retryable:
+            print(f"[{index + 1}/{len(videos)}] ⏱ Cancelled (retryable): {job.name} ({job.error})")
+            results["cancelled"] += 1
         else:
-            print(f"✗ Failed: {video.name}")
+            print(f"[{index + 1}/{len(videos)}] ✗ Failed: {job.name} ({job.error})")
+            results["failed"] += 1
+
+    # Videos are large: keep uploads/downloads to two at a time
+    # Resumes an interrupted run of the same batch (see batch_journal)
+    journal = BatchJournal.for_batch("upscale_video", input_dir, model, fresh=fresh)
+    pipeline = FalPipeline(upload_workers=min(jobs, 2), fal_workers=jobs,
+                           download_workers=min(jobs, 2), journal=journal, **pipeline_options)
+    use_cache = pipeline_options.get('use_cache', True)
+    pipeline.run([build_job(str(video), model, fused_crop=fused_crop, use_cache=use_cache) for video in videos],
+                 on_result=report)
+    journal.close()
+
+    elapsed = time.time() - batch_start
+    print(f"\nBatch complete: {results['success']} successful, {results['skipped']} up to date, {results['failed']} failed "
+          f"in {elapsed:.1f} seconds")
+    if results["cancelled"]:
+        print(f"{results['cancelled']} cancelled at a deadline; re-run the batch to retry them")
+
+    return results
+
+def print_usage():
+    print("Usage:")
+    print("  Single video:  python upscale_to_4k.py <video.mp4> [model]")
+    print("  Batch process: python upscale_to_4k.py --batch <directory> [model] [--jobs N]")
+    print()
+    print("Available models:")
+    for name, info in MODELS.items():
+        print(f"  {name:12} - {info['description']} ({info['cost']})")
+    print()
+    print("Examples:")
+    print("  python upscale_to_4k.py video_1080p.mp4")
+    print("  python upscale_to_4k.py video_1080p.mp4 seedvr2")
+    print("  python upscale_to_4k.py --batch ./processed_1080p")
+    print("  python upscale_to_4k.py --batch ./processed_1080p bytedance --jobs 4")
+    print("  python upscale_to_4k.py long_recording_1080p.mp4 seedvr2 --segment 30 --jobs 8")
+    print("  python upscale_to_4k.py screen_demo_1080p.mp4 topaz --elide-static")
+    print("  python upscale_to_4k.py raw_recording.mp4 bytedance --fused-crop")
 
 def main():
     if len(sys.argv) < 2:
-        print("Usage:")
-        print("  Single video:  python upscale_to_4k.py <video.mp4> [model]")
-        print("  Batch process: python upscale_to_4k.py --batch <directory> [model]")
-        print()
-        print("Available models:")
-        for name, info in MODELS.items():
-            print(f"  {name:12} - {info['description']} ({info['cost']})")
-        print()
-        print("Examples:")
-        print("  python upscale_to_4k.py video_1080p.mp4")
-        print("  python upscale_to_4k.py video_1080p.mp4 seedvr2")
-        print("  python upscale_to_4k.py --batch ./processed_1080p")
+        print_usage()
         sys.exit(1)
 
-    if sys.argv[1] == "--batch":
-        directory = sys.argv[2] if len(sys.argv) > 2 else "./processed_1080p"
-        model = sys.argv[3] if len(sys.argv) > 3 else "bytedance"
-        batch_upscale(directory, model)
+    parser = argparse.ArgumentParser(description="Upscale videos to 4K using Fal.ai")
+    parser.add_argument("target", nargs="?", help="Video file, or directory with --batch")
+    parser.add_argument("model", nargs="?", default="bytedance", choices=list(MODELS.keys()))
+    parser.add_argument("--batch", action="store_true", help="Upscale every *_1080p.mp4 in a directory")
+    parser.add_argument("--jobs", "-j", type=int, default=1, help="Videos to process in parallel (batch mode)")
+    parser.add_argument("--no-cache", action="store_true", help="Ignore cached uploads and results")
+    parser.add_argument("--timeout", type=float, metavar="SECONDS",
+                        help="Cancel a fal request still unfinished after SECONDS (retryable)")
+    parser.add_argument("--batch-timeout", type=float, metavar="SECONDS",
+                        help="Cancel everything still outstanding SECONDS after the batch starts")
+    parser.add_argument("--segment", type=float, metavar="SECONDS", dest="segment_seconds",
+                        help="Split at keyframes into ~SECONDS segments upscaled in parallel (--jobs counts segments)")
+    parser.add_argument("--elide-static", type=float, nargs="?", const=2.0, metavar="SECONDS",
+                        help="Upscale still runs of at least SECONDS (default 2) as single frames")
+    parser.add_argument("--image-model", default="clarity", help="Image model for still frames (--elide-static)")
+    parser.add_argument("--fresh", action="store_true",
+                        help="Ignore the batch journal and start the batch over")
+    parser.add_argument("--fused-crop", action="store_true",
+                        help="Input is a raw 1920x1088 recording: crop to 1080p while uploading, "
+                             "without writing the crop to disk")
+    args = parser.parse_args()
+
+    if args.fused_crop and (args.segment_seconds or args.elide_static):
+        parser.error("--fused-crop can't be combined with --segment or --elide-static")
+
+    pipeline_options = {"use_cache": not args.no_cache, "job_timeout": args.timeout,
+                        "batch_timeout": args.batch_timeout}
+
+    if args.batch:
+        batch_upscale(args.target or "./processed_1080p", args.model, jobs=args.jobs,
+                      segment_seconds=args.segment_seconds, elide_static=args.elide_static,
+                      image_model=args.image_model, fresh=args.fresh, fused_crop=args.fused_crop,
+                      **pipeline_options)
+    elif args.target and args.elide_static:
+        upscale_video_elided(args.target, args.model, image_model=args.image_model,
+                             min_static_seconds=args.elide_static, jobs=args.jobs, **pipeline_options)
+    elif args.target and args.segment_seconds:
+        upscale_video_segmented(args.target, args.model, segment_seconds=args.segment_seconds,
+                                jobs=args.jobs, **pipeline_options)
+    elif args.target:
+        upscale_video(args.target, args.model, fused_crop=args.fused_crop, **pipeline_options)
     else:
-        video_path = sys.argv[1]
-        model = sys.argv[2] if len(sys.argv) > 2 else "bytedance"
-        upscale_video(video_path, model)
+        print_usage()
+        sys.exit(1)
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,203 @@
+#!/usr/bin/env python3
+"""
+Pool of Veo backends (Vertex AI regions / projects and Gemini API keys)
+
+One region's quota caps a batch, so submissions can be spread over
+several backends, configured with --backends or VEO_BACKENDS as a comma
+separated list:
+
+  vertex:PROJECT            Vertex AI in us-central1
+  vertex:PROJECT/LOCATION   Vertex AI in another region
+  gemini                    Gemini API with GOOGLE_API_KEY
+  gemini:ENV_VAR            Gemini API with the key in another variable
+
+e.g. VEO_BACKENDS=vertex:my-proj,vertex:my-proj/europe-west4,gemini
+
+Each backend has its own concurrent-operation limit and requests-per-
+minute token bucket. The next submission goes to the backend with the
+fewest operations in flight relative to its limit, with recent errors
+counting against it. A backend that returns 429 / RESOURCE_EXHAUSTED is
+paused with exponential backoff and the clip fails over to the others;
+a backend error (auth, region without Veo, 5xx, network) pauses it for
+ERROR_COOLDOWN_SECONDS. A rejected request (400, e.g. a filtered prompt)
+fails that clip without blaming the backend.
+"""
+
+import os
+import threading
+import time
+from collections import deque
+from typing import List, Optional
+
+from veo_polling import TokenBucket, quota_backoff
+
+DEFAULT_LOCATION = "us-central1"
+
+# Recent submit / status outcomes kept per backend for its error rate
+ERROR_WINDOW = 20
+
+# How much a backend's error rate counts against it, in units of a full slot load
+ERROR_WEIGHT = 2.0
+
+# Pause after a non-quota submit error (bad credentials, region without Veo, ...)
+ERROR_COOLDOWN_SECONDS = 60.0
+
+
+def is_backend_error(e: Exception) -> bool:
+    """True if an error says more about the backend than about the request"""
+    code = getattr(e, 'code', None)
+    return not isinstance(code, int) or code in (401, 403, 404) or code >= 500
+
+
+class Backend:
+    """
+    One place Veo operations can be submitted to
+
+    Args:
+        mode: 'vertex' or 'gemini'
+        model: Veo model name for this mode
+        project, location: Vertex AI project and region
+        api_key: Gemini API key
+        rpm: Submissions per minute (0 or None for no limit)
+    """
+
+    def __init__(self, mode: str, model: str, project: Optional[str] = None, location: Optional[str] = None,
+                 api_key: Optional[str] = None, key_env: str = "GOOGLE_API_KEY", rpm: Optional[float] = None):
+        self.mode = mode
+        self.model = model
+        self.project = project
+        self.location = location or DEFAULT_LOCATION
+        self.api_key = api_key
+        self.key_env = key_env
+        self.bucket = TokenBucket(rpm)
+        self.in_flight = 0
+        self.outcomes = deque(maxlen=ERROR_WINDOW)
+        self.cooldown_until = 0.0
+        self.quota_errors = 0
+        self._client = None
+        self._lock = threading.Lock()
+
+    @property
+    def name(self) -> str:
+        if self.mode == 'vertex':
+            return f"vertex:{self.project}/{self.location}"
+        return "gemini" if self.key_env == "GOOGLE_API_KEY" else f"gemini:{self.key_env}"
+
+    @property
+    def client(self):
+        """genai client for this backend, created on first use"""
+        with self._lock:
+            if self._client is None:
+                from google import genai
+
+                if self.mode == 'vertex':
+                    # Vertex AI uses application default credentials
+                    self._client = genai.Client(vertexai=True, project=self.project, location=self.location)
+                else:
+                    self._client = genai.Client(api_key=self.api_key)
+            return self._client
+
+    def error_rate(self) -> float:
+        return (sum(1 for ok in self.outcomes if not ok) / len(self.outcomes)) if self.outcomes else 0.0
+
+    def ready_at(self) -> float:
+        """Earliest time this backend accepts another submission"""
+        return max(self.cooldown_until, time.time() + self.bucket.delay())
+
+    def succeeded(self):
+        """Record a successful submission or status check"""
+        self.quota_errors = 0
+        self.outcomes.append(True)
+
+    def throttled(self) -> float:
+        """Record a quota error; returns the seconds this backend is paused for"""
+        self.quota_errors += 1
+        self.outcomes.append(False)
+        self.bucket.drain()
+        delay = quota_backoff(self.quota_errors)
+        self.cooldown_until = max(self.cooldown_until, time.time() + delay)
+        return delay
+
+    def failed(self, cooldown: float = ERROR_COOLDOWN_SECONDS):
+        """Record a non-quota error; a submit error also pauses the backend"""
+        self.outcomes.append(False)
+        if cooldown:
+            self.cooldown_until = max(self.cooldown_until, time.time() + cooldown)
+
+
+class BackendPool:
+    """
+    Backends plus the policy for picking one
+
+    Args:
+        backends: Backend list; the first is the primary (used for cost
+            estimates and to re-attach operations with no recorded backend)
+        jobs: Concurrent operations allowed per backend
+    """
+
+    def __init__(self, backends: List[Backend], jobs: int):
+        if not backends:
+            raise ValueError("No Veo backends configured")
+        self.backends = backends
+        self.jobs = jobs
+
+    @property
+    def primary(self) -> Backend:
+        return self.backends[0]
+
+    @property
+    def capacity(self) -> int:
+        return self.jobs * len(self.backends)
+
+    def by_name(self, name: Optional[str]) -> Optional[Backend]:
+        """
+        The backend recorded as holding an operation, or None if it is no
+        longer configured (its operation can't be checked anywhere else)
+        """
+        if name is None:
+            # Recorded before backends were; there was only the one
+            return self.primary
+        return next((b for b in self.backends if b.name == name), None)
+
+    def pick(self) -> Optional[Backend]:
+        """Least-loaded healthy backend with a free slot and a token, or None"""
+        ready = [b for b in self.backends if b.in_flight < self.jobs and b.ready_at() <= time.time()]
+        if not ready:
+            return None
+        return min(ready, key=lambda b: b.in_flight / self.jobs + ERROR_WEIGHT * b.error_rate())
+
+    def next_ready(self) -> Optional[float]:
+        """When a backend with a free slot can next submit; None if every slot is busy"""
+        times = [b.ready_at() for b in self.backends if b.in_flight < self.jobs]
+        return min(times) if times else None
+
+
+def parse_backends(text: str, select_model, use_fast: bool = False, rpm: Optional[float] = None) -> List[Backend]:
+    """
+    Backends from a --backends / VEO_BACKENDS string
+
+    Args:
+        text: Comma separated entries (see module docstring)
+        select_model: (mode, use_fast) -> model name
+    """
+    backends = []
+    for item in (part.strip() for part in text.split(",")):
+        if not item:
+            continue
+        mode, _, rest = item.partition(":")
+        if mode == 'vertex':
+            project, _, location = rest.partition("/")
+            if not project:
+                raise ValueError(f"Vertex backend needs a project: {item}")
+            backends.append(Backend('vertex', select_model('vertex', use_fast), project=project,
+                                    location=location or None, rpm=rpm))
+        elif mode == 'gemini':
+            key_env = rest or "GOOGLE_API_KEY"
+            api_key = os.environ.get(key_env)
+            if not api_key:
+                raise ValueError(f"Gemini backend {item}: {key_env} is not set")
+            backends.append(Backend('gemini', select_model('gemini', use_fast), api_key=api_key,
+                                    key_env=key_env, rpm=rpm))
+        else:
+            raise ValueError(f"Unknown backend '{item}' (use vertex:PROJECT[/LOCATION] or gemini[:ENV_VAR])")
+    return backends
@@ -13,12 +13,18 @@ METHOD 1: Vertex AI (Google Cloud - recommended, higher quotas)
   3. Set variables:
      export GOOGLE_CLOUD_PROJECT=your-project-id
      export GOOGLE_GENAI_USE_VERTEXAI=True
+  4. Optional - have Veo write clips to a bucket (downloaded in-process,
+     see gcs_download.py):
+     export VEO_OUTPUT_GCS_URI=gs://your-bucket/veo
 
 METHOD 2: Gemini API (AI Ultra subscription)
   1. Get API key from: https://aistudio.google.com/apikey
   2. Set variable:
      export GOOGLE_API_KEY=your-api-key-here
 
+SEVERAL BACKENDS: spread a batch over regions, projects and keys (see veo_backends.py)
+     export VEO_BACKENDS=vertex:my-proj,vertex:my-proj/europe-west4,gemini
+
 PRICING (Vertex AI):
 - Veo 3.1: $0.20/second
 - Veo 3.1 Fast: $0.15/second
@@ -29,13 +35,48 @@ USAGE:
   python veo_generator.py -p H01_data_flow_neural  # Generate one clip
   python veo_generator.py --batch --section HOOK   # Generate section
   python veo_generator.py --batch             # Generate all clips
+  python veo_generator.py --batch --jobs 8    # 8 clips rendering at once
+  python veo_generator.py --batch --rpm 5     # At most 5 submissions a minute (per backend)
+  python veo_generator.py --batch --dry-run   # What would render, cost and take
+
+Batches are incremental: each clip's render spec (prompt text, duration,
+aspect ratio, model, resolution) is fingerprinted in the output folder's
+manifest, and only new or changed clips are rendered again.
 """
 
 import time
 import os
 import argparse
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
+from veo_backends import Backend, BackendPool, is_backend_error, parse_backends
+from veo_manifest import MANIFEST_NAME, VeoManifest, changed_fields, fingerprint
+from veo_polling import RenderTimes, is_lost_operation_error, is_quota_error
+
+# Seconds between batch status lines (operation polls follow veo_polling)
+STATUS_SECONDS = 30
+
+# Consecutive failed status checks (other than quota) before an operation is given up on
+MAX_STATUS_FAILURES = 5
+
+# Operations rendering at once per backend in batch mode, and threads saving finished clips
+DEFAULT_JOBS = 4
+DOWNLOAD_WORKERS = 4
+
+# Submissions per minute per backend (Veo's per-project default quota is around 10)
+DEFAULT_RPM = 10
+
+# Edit order of sections; batches render earlier sections first
+SECTION_ORDER = ["HOOK", "INTRO", "MAIN1", "MAIN2", "MAIN3", "MAIN4", "CTA"]
+
+# Output resolution requested for every clip
+RESOLUTION = "1080p"
+
+# Plan line per clip state
+STATE_ICONS = {"clean": "✅", "adopt": "📁", "pending": "🔗", "new": "🆕", "changed": "🔄",
+               "failed": "❗", "missing": "❗", "fresh": "🆕"}
+
 # Predefined prompts for E1 - The Vibe Coding Revolution
 # Organized by section with both ABSTRACT and REALISTIC styles
 PROMPTS = {
@@ -437,11 +478,23 @@ def get_auth_mode():
         return None, None
 
 
-def setup_check():
+def setup_check(backends_spec: str = None):
     """Check if environment is properly configured."""
     mode, credential = get_auth_mode()
 
-    if mode == 'vertex':
+    spec = backends_spec or os.environ.get('VEO_BACKENDS')
+    if spec:
+        try:
+            backends = parse_backends(spec, select_model)
+        except ValueError as e:
+            print(f"❌ {e}")
+            return False
+        if not backends:
+            print("❌ No backends listed")
+            return False
+        for backend in backends:
+            print(f"✅ Backend {backend.name}")
+    elif mode == 'vertex':
         print(f"✅ Vertex AI mode (project: {credential})")
         print("   Using Google Cloud billing ($0.15-0.20/second)")
     elif mode == 'gemini':
@@ -468,111 +521,649 @@ def setup_check():
     return True
 
 
-def generate_video(prompt_key: str, output_dir: str, use_fast: bool = False):
-    """Generate a single video clip using Vertex AI or Gemini API."""
-    from google import genai
+def select_model(mode: str, use_fast: bool = False):
+    """Veo model name for the auth mode"""
+    if mode == 'vertex':
+        model = "veo-3.1-fast-generate-001" if use_fast else "veo-3.1-generate-001"
+    else:
+        model = "veo-3.1-fast-generate-preview" if use_fast else "veo-3.1-generate-preview"
+    return model
+
+
+def render_cost(mode: str, prompt_data: dict, use_fast: bool = False) -> float:
+    """Dollars on Vertex AI, AI Ultra credits on the Gemini API"""
+    if mode == 'vertex':
+        return prompt_data['duration'] * (0.15 if use_fast else 0.20)
+    return 50 if use_fast else 100
+
+
+def format_cost(mode: str, amount: float) -> str:
+    return f"~${amount:.2f}" if mode == 'vertex' else f"~{amount:.0f} credits"
+
+
+def estimate_cost(mode: str, prompt_data: dict, use_fast: bool = False) -> str:
+    return format_cost(mode, render_cost(mode, prompt_data, use_fast))
+
+
+def format_duration(seconds: float) -> str:
+    minutes, seconds = divmod(int(round(seconds)), 60)
+    hours, minutes = divmod(minutes, 60)
+    if hours:
+        return f"{hours}h{minutes:02d}m"
+    return f"{minutes}m{seconds:02d}s" if minutes else f"{seconds}s"
+
+
+def render_order(prompt_keys):
+    """Clips the edit needs first: by section, then shortest first, then as defined"""
+    def priority(key):
+        section = PROMPTS[key]["section"]
+        rank = SECTION_ORDER.index(section) if section in SECTION_ORDER else len(SECTION_ORDER)
+        return rank, PROMPTS[key]["duration"]
+    return sorted(prompt_keys, key=priority)
+
+
+def model_family(model: str) -> str:
+    """'veo-3.1-fast-generate-001' -> 'veo-3.1-fast': Vertex AI and the Gemini API name the same model differently"""
+    return model.split("-generate")[0]
+
+
+def family_spec(spec: dict) -> dict:
+    """Render spec with the model reduced to its family, for comparing specs across backends"""
+    return dict(spec, model=model_family(spec['model'])) if 'model' in spec else spec
+
+
+def spec_fingerprints(spec: dict) -> set:
+    """Fingerprints of this spec rendered by any model of the same family (on any backend)"""
+    family = model_family(spec['model'])
+    models = {select_model(mode, family.endswith("-fast")) for mode in ('vertex', 'gemini')}
+    return {fingerprint(dict(spec, model=model)) for model in models | {spec['model']}
+            if model_family(model) == family}
+
+
+def clip_spec(prompt_key: str, model: str) -> dict:
+    """Everything that changes what Veo renders for a clip (section is just filing)"""
+    prompt_data = PROMPTS[prompt_key]
+    return {
+        "prompt": prompt_data["prompt"],
+        "duration": prompt_data["duration"],
+        "aspect_ratio": prompt_data["aspect_ratio"],
+        "model": model,
+        "resolution": RESOLUTION,
+    }
+
+
+def load_backends(use_fast: bool = False, rpm: float = DEFAULT_RPM, spec: str = None):
+    """
+    Backends to render on: --backends / VEO_BACKENDS (see veo_backends),
+    else the single Vertex AI or Gemini API setup from get_auth_mode
+
+    Raises ValueError for a malformed backend list.
+    """
+    spec = spec or os.environ.get('VEO_BACKENDS')
+    if spec:
+        return parse_backends(spec, select_model, use_fast, rpm)
+    mode, credential = get_auth_mode()
+    if mode == 'vertex':
+        return [Backend('vertex', select_model(mode, use_fast), project=credential,
+                        location=os.environ.get('GOOGLE_CLOUD_LOCATION'), rpm=rpm)]
+    if mode == 'gemini':
+        return [Backend('gemini', select_model(mode, use_fast), api_key=credential, rpm=rpm)]
+    return []
+
+
+def start_generation(client, model: str, prompt_key: str):
+    """Submit one prompt; returns the long-running operation"""
     from google.genai.types import GenerateVideosConfig
 
+    prompt_data = PROMPTS[prompt_key]
+    # Vertex AI can write clips to a bucket instead of returning them inline
+    output_gcs_uri = os.environ.get('VEO_OUTPUT_GCS_URI')
+    return client.models.generate_videos(
+        model=model,
+        prompt=prompt_data["prompt"],
+        config=GenerateVideosConfig(
+            aspect_ratio=prompt_data["aspect_ratio"],
+            resolution=RESOLUTION,
+            number_of_videos=1,
+            output_gcs_uri=f"{output_gcs_uri.rstrip('/')}/{prompt_key}/" if output_gcs_uri else None,
+        ),
+    )
+
+
+def submit(pool: BackendPool, prompt_key: str, indent: str = "   "):
+    """
+    Submit one prompt to the best available backend, failing over on errors
+
+    Waits while every backend is paused; raises once the prompt has failed
+    (other than by quota) on every backend.
+
+    Returns:
+        (operation, backend)
+    """
+    failed = set()
+    while True:
+        backend = pool.pick()
+        if backend is None:
+            time.sleep(max(0.0, (pool.next_ready() or time.time()) - time.time()))
+            continue
+        backend.bucket.take()
+        try:
+            operation = start_generation(backend.client, backend.model, prompt_key)
+        except Exception as e:
+            if is_quota_error(e):
+                delay = backend.throttled()
+                print(f"{indent}⚠️ {backend.name} quota limit hit; pausing it for {delay:.0f}s")
+                continue
+            if not is_backend_error(e):
+                raise
+            backend.failed()
+            failed.add(backend.name)
+            if len(failed) == len(pool.backends):
+                raise
+            print(f"{indent}⚠️ {backend.name} failed ({e}); trying another backend")
+            continue
+        backend.succeeded()
+        return operation, backend
+
+
+def save_result(operation, output_file: Path, indent: str = "   "):
+    """
+    Save the video from a finished operation
+
+    Returns the local path, a remote URI if it couldn't be downloaded,
+    or None if generation failed.
+    """
+    if operation.response and operation.result.generated_videos:
+        video = operation.result.generated_videos[0]
+
+        # Try to save video to local file
+        # Write next to the target and rename, so a crash never leaves a partial clip
+        temp_file = output_file.with_name(output_file.name + ".part")
+        if hasattr(video, 'video') and hasattr(video.video, 'video_bytes') and video.video.video_bytes:
+            with open(temp_file, 'wb') as f:
+                f.write(video.video.video_bytes)
+            # Don't keep the clip in memory while the rest of the batch renders
+            video.video.video_bytes = None
+            temp_file.replace(output_file)
+            print(f"{indent}✅ Saved to: {output_file}")
+            return str(output_file)
+        elif hasattr(video, 'video') and hasattr(video.video, 'uri') and video.video.uri:
+            uri = video.video.uri
+            print(f"{indent}✅ Complete! Video URI: {uri}")
+            # Try to download from GCS if it's a gs:// URI
+            if uri.startswith("gs://"):
+                print(f"{indent}📥 Downloading from GCS...")
+                import gcs_download
+                try:
+                    gcs_download.download(uri, output_file)
+                except Exception as e:
+                    print(f"{indent}⚠️ GCS download failed: {e}")
+                    return uri
+                print(f"{indent}✅ Saved to: {output_file}")
+                return str(output_file)
+            return uri
+        else:
+            print(f"{indent}⚠️ Video generated but format unexpected")
+            print(f"{indent}Response: {video}")
+            return str(video)
+    else:
+        print(f"{indent}❌ Generation failed or no videos returned")
+        if hasattr(operation, 'error'):
+            print(f"{indent}Error: {operation.error}")
+        return None
+
+
+def clip_state(manifest: VeoManifest, key: str, spec: dict, output_file: Path):
+    """
+    Where one clip stands against the manifest, without changing anything
+
+    Returns (state, entry, changed fields) with state one of:
+    clean (rendered from this spec, file verified), adopt (on disk but not
+    in the manifest), pending (submitted, never saved), new, changed (spec
+    differs from the last render), failed, missing (file gone or modified).
+    A clip rendered by the same model family on another backend counts as
+    rendered from this spec.
+    """
+    digests = spec_fingerprints(spec)
+    entry = manifest.lookup(key)
+    if entry is None:
+        return ("adopt" if output_file.exists() else "new"), None, []
+    if manifest.verified(key, digests, output_file):
+        return "clean", entry, []
+    pending = manifest.pending(key, digests)
+    if pending:
+        return "pending", pending, []
+    if not manifest.matches(entry, digests):
+        return "changed", entry, changed_fields(family_spec(entry.get('spec', {})), family_spec(spec))
+    if entry.get('event') == 'failed':
+        return "failed", entry, []
+    return "missing", entry, []
+
+
+def check_manifest(manifest: VeoManifest, key: str, spec: dict, output_file: Path, fresh: bool = False,
+                   indent: str = "   "):
+    """
+    What to do with one clip given the manifest
+
+    Returns ("done", None) to skip it, ("pending", entry) to re-attach to
+    its operation, or (None, None) to submit it.
+    """
+    if fresh:
+        return None, None
+    state, entry, changed = clip_state(manifest, key, spec, output_file)
+    if state == "clean":
+        print(f"{indent}⏭️  {key}: already rendered and verified")
+        return "done", None
+    if state == "adopt":
+        # Rendered before the manifest existed; adopt it rather than pay again
+        manifest.done(key, spec, output_file)
+        print(f"{indent}⏭️  {key}: already on disk (now recorded in the manifest)")
+        return "done", None
+    if state == "pending":
+        print(f"{indent}🔗 {key}: re-attaching to {entry['operation']}")
+        return "pending", entry
+    if state == "changed":
+        print(f"{indent}🔄 {key}: definition changed ({', '.join(changed) or 'unknown fields'})")
+    return None, None
+
+
+def reattach(entry: dict):
+    """Operation handle for a manifest entry, to pass to client.operations.get"""
+    from google.genai.types import GenerateVideosOperation
+
+    return GenerateVideosOperation(name=entry['operation'])
+
+
+def finish_clip(manifest: VeoManifest, key: str, spec: dict, operation, output_file: Path,
+                indent: str = "   "):
+    """Save a finished operation's clip and record the outcome in the manifest"""
+    result = save_result(operation, output_file, indent=indent)
+    if result == str(output_file):
+        manifest.done(key, spec, output_file)
+    elif result is None:
+        manifest.failed(key, spec, str(getattr(operation, 'error', None) or "no videos returned"))
+    # Anything else is a URI we couldn't download; the next run re-attaches and retries
+    return result
+
+
+def generate_video(prompt_key: str, output_dir: str, use_fast: bool = False, fresh: bool = False,
+                   backends=None):
+    """
+    Generate a single video clip using Vertex AI or Gemini API.
+
+    A clip already rendered and verified (see veo_manifest) is skipped and a
+    render left running by an interrupted run is re-attached to, unless
+    fresh is set. With several backends the clip goes to the first one
+    that accepts it.
+    """
     if prompt_key not in PROMPTS:
         print(f"❌ Unknown prompt key: {prompt_key}")
         print(f"   Available: {', '.join(PROMPTS.keys())}")
         return None
 
     prompt_data = PROMPTS[prompt_key]
-    mode, credential = get_auth_mode()
-
-    # Select model based on mode
-    if mode == 'vertex':
-        model = "veo-3.1-fast-generate-001" if use_fast else "veo-3.1-generate-001"
-        cost_per_sec = 0.15 if use_fast else 0.20
-        cost_estimate = prompt_data["duration"] * cost_per_sec
-        cost_str = f"~${cost_estimate:.2f}"
-    else:
-        model = "veo-3.1-fast-generate-preview" if use_fast else "veo-3.1-generate-preview"
-        cost_str = "~50-100 credits"
+    pool = BackendPool(backends if backends is not None else load_backends(use_fast), 1)
+    mode, model = pool.primary.mode, pool.primary.model
 
     print(f"\n🎬 Generating: {prompt_key}")
     print(f"   Section: {prompt_data['section']}")
     print(f"   Duration: {prompt_data['duration']}s")
     print(f"   Model: {model}")
-    print(f"   Cost: {cost_str}")
+    print(f"   Cost: {estimate_cost(mode, prompt_data, use_fast)}")
     print(f"   Prompt: {prompt_data['prompt'][:80]}...")
 
-    # Initialize client based on mode
-    if mode == 'vertex':
-        # Vertex AI uses application default credentials
-        client = genai.Client(vertexai=True, project=credential, location="us-central1")
-    else:
-        # Gemini API uses API key
-        client = genai.Client(api_key=credential)
-
     # Ensure output directory exists
     output_path = Path(output_dir)
     output_path.mkdir(parents=True, exist_ok=True)
     output_file = output_path / f"{prompt_key}.mp4"
 
+    manifest = VeoManifest.for_output(output_path)
+    spec = clip_spec(prompt_key, model)
+    state, entry = check_manifest(manifest, prompt_key, spec, output_file, fresh)
+    if state == "done":
+        manifest.close()
+        return str(output_file)
+
+    render_times = RenderTimes()
     try:
-        operation = client.models.generate_videos(
-            model=model,
-            prompt=prompt_data["prompt"],
-            config=GenerateVideosConfig(
-                aspect_ratio=prompt_data["aspect_ratio"],
-                resolution="1080p",
-                number_of_videos=1,
-            ),
-        )
-
-        print("   ⏳ Generating (this may take 2-5 minutes)...")
+        backend = pool.by_name(entry.get('backend')) if entry else None
+        if entry and backend is None:
+            print(f"   ⚠️ Was rendering on {entry['backend']}, which isn't configured now; submitting again")
+            entry = None
+        if entry:
+            operation = reattach(entry)
+            spec = clip_spec(prompt_key, backend.model)
+            schedule = render_times.schedule(backend.model, prompt_data["duration"])
+            schedule.started = entry['submitted_at']
+            delay = 0
+        else:
+            operation, backend = submit(pool, prompt_key)
+            # Record the model of the backend that took it, not the primary's
+            spec = clip_spec(prompt_key, backend.model)
+            manifest.submitted(prompt_key, spec, operation.name, backend=backend.name)
+            schedule = render_times.schedule(backend.model, prompt_data["duration"])
+            delay = schedule.next_delay()
+        client = backend.client
+        if len(pool.backends) > 1:
+            print(f"   Backend: {backend.name}")
+
+        print(f"   ⏳ Generating (expected ~{schedule.expected:.0f}s)...")
 
         while not operation.done:
-            time.sleep(15)
-            operation = client.operations.get(operation)
-            print("   ⏳ Still processing...")
-
-        if operation.response and operation.result.generated_videos:
-            video = operation.result.generated_videos[0]
-
-            # Try to save video to local file
-            if hasattr(video, 'video') and hasattr(video.video, 'video_bytes') and video.video.video_bytes:
-                with open(output_file, 'wb') as f:
-                    f.write(video.video.video_bytes)
-                print(f"   ✅ Saved to: {output_file}")
-                return str(output_file)
-            elif hasattr(video, 'video') and hasattr(video.video, 'uri') and video.video.uri:
-                uri = video.video.uri
-                print(f"   ✅ Complete! Video URI: {uri}")
-                # Try to download from GCS if it's a gs:// URI
-                if uri.startswith("gs://"):
-                    print(f"   📥 Downloading from GCS...")
-                    import subprocess
-                    result = subprocess.run(
-                        ["gsutil", "cp", uri, str(output_file)],
-                        capture_output=True, text=True
-                    )
-                    if result.returncode == 0:
-                        print(f"   ✅ Saved to: {output_file}")
-                        return str(output_file)
-                    else:
-                        print(f"   ⚠️ gsutil download failed: {result.stderr}")
-                        return uri
-                return uri
-            else:
-                print(f"   ⚠️ Video generated but format unexpected")
-                print(f"   Response: {video}")
-                return str(video)
-        else:
-            print(f"   ❌ Generation failed or no videos returned")
-            if hasattr(operation, 'error'):
-                print(f"   Error: {operation.error}")
-            return None
+            time.sleep(delay)
+            try:
+                operation = client.operations.get(operation)
+            except Exception as e:
+                if is_lost_operation_error(e):
+                    # Don't re-attach to it on the next run; submit it again instead
+                    manifest.failed(prompt_key, spec, f"status check failed: {e}")
+                    raise
+                if not is_quota_error(e):
+                    raise
+                delay = schedule.quota_delay()
+                print(f"   ⚠️ Quota limit hit; next check in {delay:.0f}s")
+                continue
+            delay = schedule.next_delay()
+            print(f"   ⏳ Still processing... ({schedule.elapsed():.0f}s)")
+
+        # A re-attached render's time includes however long we were away
+        if not entry and operation.response and not getattr(operation, 'error', None):
+            render_times.record(backend.model, prompt_data["duration"], schedule.elapsed())
+        return finish_clip(manifest, prompt_key, spec, operation, output_file)
 
     except Exception as e:
         print(f"   ❌ Error: {e}")
         return None
+    finally:
+        manifest.close()
+
+
+def run_concurrent(prompt_keys, output_dir: str, use_fast: bool = False, jobs: int = DEFAULT_JOBS,
+                   fresh: bool = False, rpm: float = DEFAULT_RPM, backends=None):
+    """
+    Render many clips with up to `jobs` operations in flight and at most
+    `rpm` submissions a minute (0 for no limit) on each backend
+
+    One loop owns every pending operation. Each operation is checked on its
+    own adaptive schedule (see veo_polling), the loop sleeping until the
+    next one is due; finished clips go to a download thread and the next
+    prompts are submitted into the freed slots, so clips download while
+    others are still rendering. Each submission goes to the least loaded,
+    least error-prone backend (see veo_backends). A quota error pauses that
+    backend's checks and submissions, and the throttled clip goes back to
+    the front of the queue for the other backends. Clips are submitted in
+    render_order, so the sections the edit needs first land first. Clips
+    the manifest shows as done are skipped and renders left running by an
+    interrupted run are re-attached to (see veo_manifest) unless fresh is set.
+
+    Returns:
+        {prompt_key: saved path / URI, or None on failure}
+    """
+    pool = BackendPool(backends if backends is not None else load_backends(use_fast, rpm), jobs)
+    render_times = RenderTimes()
 
+    output_path = Path(output_dir)
+    output_path.mkdir(parents=True, exist_ok=True)
+    manifest = VeoManifest.for_output(output_path)
+    # Any model of the family matches the manifest; each clip's spec is replaced by
+    # that of the backend it goes to
+    specs = {key: clip_spec(key, pool.primary.model) for key in prompt_keys}
+
+    waiting = []
+    in_flight = {}  # prompt_key -> [operation, schedule, next check time, backend, failed checks]
+    reattached = set()
+    failed_on = {}  # prompt_key -> backends that rejected it (other than by quota)
+    downloads = {}  # prompt_key -> Future
+    results = {}
+    for key in prompt_keys:
+        output_file = output_path / f"{key}.mp4"
+        state, entry = check_manifest(manifest, key, specs[key], output_file, fresh)
+        if state == "done":
+            results[key] = str(output_file)
+        elif state == "pending":
+            backend = pool.by_name(entry.get('backend'))
+            if backend is None:
+                print(f"   ⚠️ {key}: was rendering on {entry['backend']}, which isn't configured now; "
+                      f"submitting again")
+                waiting.append(key)
+                continue
+            specs[key] = clip_spec(key, backend.model)
+            schedule = render_times.schedule(backend.model, PROMPTS[key]["duration"])
+            schedule.started = entry['submitted_at']
+            in_flight[key] = [reattach(entry), schedule, time.time(), backend, 0]
+            backend.in_flight += 1
+            reattached.add(key)
+        else:
+            waiting.append(key)
+    waiting = render_order(waiting)
+    batch_start = time.time()
+    next_status = batch_start + STATUS_SECONDS
+    if len(pool.backends) > 1:
+        print(f"   Backends: {', '.join(b.name for b in pool.backends)}")
+
+    def finish(key, operation, schedule, backend):
+        print(f"   ✨ {key} rendered in {schedule.elapsed():.0f}s (expected ~{schedule.expected:.0f}s)")
+        if key not in reattached and operation.response and not getattr(operation, 'error', None):
+            render_times.record(backend.model, PROMPTS[key]["duration"], schedule.elapsed())
+        return finish_clip(manifest, key, specs[key], operation, output_path / f"{key}.mp4",
+                           indent=f"   [{key}] ")
+
+    def give_up(key, error):
+        backend = in_flight.pop(key)[3]
+        backend.in_flight -= 1
+        manifest.failed(key, specs[key], error)
+        results[key] = None
+        print(f"   ❌ {key}: {error}")
+
+    def hold(backend, until):
+        for entry in in_flight.values():
+            if entry[3] is backend:
+                entry[2] = max(entry[2], until)
+
+    with ThreadPoolExecutor(max_workers=DOWNLOAD_WORKERS) as downloader:
+        while waiting or in_flight:
+            # Fill free slots
+            while waiting:
+                backend = pool.pick()
+                if backend is None:
+                    break
+                backend.bucket.take()
+                key = waiting[0]
+                try:
+                    operation = start_generation(backend.client, backend.model, key)
+                except Exception as e:
+                    if is_quota_error(e):
+                        # Keep the clip at the front of the queue for the other backends
+                        delay = backend.throttled()
+                        print(f"   ⚠️ Quota limit hit on {backend.name} submitting {key}; "
+                              f"pausing it for {delay:.0f}s")
+                        hold(backend, backend.cooldown_until)
+                        continue
+                    if is_backend_error(e):
+                        backend.failed()
+                        failed_on.setdefault(key, set()).add(backend.name)
+                        if len(failed_on[key]) < len(pool.backends):
+                            print(f"   ⚠️ {key}: {backend.name} failed ({e}); trying another backend")
+                            continue
+                    print(f"   ❌ {key}: {e}")
+                    results[waiting.pop(0)] = None
+                    continue
+                waiting.pop(0)
+                backend.succeeded()
+                backend.in_flight += 1
+                # Record the model of the backend that took it, not the primary's
+                specs[key] = clip_spec(key, backend.model)
+                manifest.submitted(key, specs[key], operation.name, backend=backend.name)
+                schedule = render_times.schedule(backend.model, PROMPTS[key]["duration"])
+                in_flight[key] = [operation, schedule, time.time() + schedule.next_delay(), backend, 0]
+                where = f" on {backend.name}" if len(pool.backends) > 1 else ""
+                print(f"   🚀 Submitted {key}{where} (expected ~{schedule.expected:.0f}s)")
+
+            # Sleep until the next check (or the next submission) is due
+            wake = [entry[2] for entry in in_flight.values()]
+            submit_at = pool.next_ready() if waiting else None
+            if submit_at is not None:
+                wake.append(submit_at)
+            if not wake:
+                continue
+            time.sleep(max(0.0, min(wake) - time.time()))
+
+            for key, entry in list(in_flight.items()):
+                operation, schedule, due, backend, _ = entry
+                if due > time.time():
+                    continue
+                try:
+                    operation = backend.client.operations.get(operation)
+                except Exception as e:
+                    if is_quota_error(e):
+                        delay = backend.throttled()
+                        print(f"   ⚠️ Quota limit hit on {backend.name}; pausing it for {delay:.0f}s")
+                        hold(backend, backend.cooldown_until)
+                        continue
+                    backend.failed(cooldown=0)
+                    entry[4] += 1
+                    if is_lost_operation_error(e):
+                        give_up(key, f"operation lost ({e})")
+                    elif entry[4] >= MAX_STATUS_FAILURES:
+                        give_up(key, f"status check failed {entry[4]} times ({e})")
+                    else:
+                        print(f"   ⚠️ {key}: status check failed ({e}); retrying")
+                        entry[2] = time.time() + schedule.next_delay()
+                    continue
+                backend.succeeded()
+                entry[4] = 0
+                if operation.done:
+                    del in_flight[key]
+                    backend.in_flight -= 1
+                    downloads[key] = downloader.submit(finish, key, operation, schedule, backend)
+                else:
+                    entry[0] = operation
+                    entry[2] = time.time() + schedule.next_delay()
+
+            if time.time() >= next_status:
+                next_status = time.time() + STATUS_SECONDS
+                finished = len(results) + sum(1 for f in downloads.values() if f.done())
+                load = ""
+                if len(pool.backends) > 1:
+                    load = "; " + ", ".join(
+                        f"{b.name} {b.in_flight}{' (paused)' if b.cooldown_until > time.time() else ''}"
+                        for b in pool.backends)
+                print(f"   ⏳ {len(in_flight)} rendering, {len(waiting)} waiting, "
+                      f"{finished}/{len(prompt_keys)} done ({time.time() - batch_start:.0f}s){load}")
+
+    for key, future in downloads.items():
+        try:
+            results[key] = future.result()
+        except Exception as e:
+            print(f"   ❌ {key}: {e}")
+            results[key] = None
+    manifest.close()
+    return {key: results.get(key) for key in prompt_keys}
+
+
+def show_plan(prompt_keys, output_dir: str, use_fast: bool = False, jobs: int = DEFAULT_JOBS,
+              fresh: bool = False, rpm: float = DEFAULT_RPM, backends=None) -> int:
+    """
+    Print which clips a run would render, what they cost and roughly how long it takes
+
+    Reads the manifest but changes nothing, so it works as a dry run.
+    Clips are listed in render_order. The time estimate packs the
+    expected render times (see veo_polling) into `jobs` slots per backend,
+    after the remaining time of renders already in flight, with
+    submissions paced at `rpm` per backend; downloads are not counted.
+
+    Returns:
+        Number of clips that would be submitted or re-attached to
+    """
+    if backends is None:
+        backends = load_backends(use_fast, rpm)
+    # No credentials needed to plan; price as Vertex AI when none are set
+    backends = backends or [Backend('vertex', select_model('vertex', use_fast))]
+    pool = BackendPool(backends, max(1, jobs))
+    render_times = RenderTimes()
+    output_path = Path(output_dir)
+    manifest = VeoManifest.for_output(output_path) if (output_path / MANIFEST_NAME).exists() else None
+
+    # [free at, backend]; interleaved so renders spread over backends like pool.pick does
+    slots = [[0.0, backend] for _ in range(pool.jobs) for backend in backends]
+    to_render = []
+    clean = 0
+    for key in render_order(prompt_keys):
+        spec = clip_spec(key, pool.primary.model)
+        output_file = output_path / f"{key}.mp4"
+        if fresh:
+            state, entry, changed = "fresh", None, []
+        elif manifest is None:
+            state, entry, changed = ("adopt" if output_file.exists() else "new"), None, []
+        else:
+            state, entry, changed = clip_state(manifest, key, spec, output_file)
 
-def generate_batch(output_dir: str, section: str = None, use_fast: bool = False):
-    """Generate multiple videos, optionally filtered by section."""
+        if state in ("clean", "adopt"):
+            clean += 1
+            if state == "adopt":
+                print(f"   {STATE_ICONS[state]} {key}: on disk, will be recorded without rendering")
+            continue
+        if state == "pending":
+            backend = pool.by_name(entry.get('backend'))
+            if backend is not None:
+                expected = render_times.expected(backend.model, spec["duration"])[0]
+                remaining = max(0.0, expected - (time.time() - entry['submitted_at']))
+                slot = min((slot for slot in slots if slot[1] is backend), key=lambda slot: slot[0])
+                slot[0] += remaining
+                print(f"   {STATE_ICONS[state]} {key}: rendering, re-attach (~{format_duration(remaining)} left)")
+                continue
+            changed = [f"was on {entry['backend']}, no longer configured"]
+        to_render.append((key, state, changed))
+
+    # Each clip goes to the slot that frees up first, so it's priced on that slot's backend
+    interval = 60.0 / (rpm * len(backends)) if rpm else 0.0
+    costs = {}  # mode -> total
+    models = set()
+    footage = 0
+    for index, (key, state, changed) in enumerate(to_render):
+        slot = min(slots, key=lambda slot: slot[0])
+        backend = slot[1]
+        duration = PROMPTS[key]["duration"]
+        slot[0] = max(slot[0], index * interval) + render_times.expected(backend.model, duration)[0]
+        cost = render_cost(backend.mode, PROMPTS[key], use_fast)
+        costs[backend.mode] = costs.get(backend.mode, 0) + cost
+        models.add(backend.model)
+        footage += duration
+        detail = {
+            "new": "new",
+            "fresh": "forced (--fresh)",
+            "changed": f"changed: {', '.join(changed) or 'unknown fields'}",
+            "pending": ', '.join(changed),
+            "failed": "failed last run",
+            "missing": "file missing or modified",
+        }[state]
+        where = f", {backend.name}" if len(backends) > 1 else ""
+        print(f"   {STATE_ICONS[state]} {key}: {detail} ({duration}s, {format_cost(backend.mode, cost)}{where})")
+    if manifest is not None:
+        manifest.close()
+
+    pending = len(prompt_keys) - clean - len(to_render)
+    cost = " + ".join(format_cost(mode, amount) for mode, amount in sorted(costs.items(), reverse=True))
+    print(f"\n   Up to date: {clean}/{len(prompt_keys)} clip(s)")
+    print(f"   To render: {len(to_render)} clip(s), {footage}s of footage, "
+          f"{cost or format_cost(pool.primary.mode, 0)} ({', '.join(sorted(models)) or pool.primary.model})")
+    if pending:
+        print(f"   Re-attaching: {pending} render(s) already paid for")
+    if to_render or pending:
+        per_backend = f" on each of {len(backends)} backends" if len(backends) > 1 else ""
+        print(f"   Est. time: ~{format_duration(max(slot[0] for slot in slots))} "
+              f"with {jobs} concurrent render(s){per_backend}")
+    return len(to_render) + pending
+
+
+def generate_batch(output_dir: str, section: str = None, use_fast: bool = False, jobs: int = DEFAULT_JOBS,
+                   fresh: bool = False, dry_run: bool = False, rpm: float = DEFAULT_RPM, backends=None):
+    """
+    Generate multiple videos concurrently, optionally filtered by section.
+
+    Only clips that are new or whose definition changed since they were
+    rendered are submitted; dry_run just prints that plan.
+    """
     prompts_to_generate = PROMPTS
 
     if section:
@@ -582,25 +1173,32 @@ def generate_batch(output_dir: str, section: str = None, use_fast: bool = False)
         print(f"❌ No prompts found for section: {section}")
         return
 
-    # Calculate total credits estimate
-    total_clips = len(prompts_to_generate)
-    credits_per_clip = 50 if use_fast else 100
-    total_credits = total_clips * credits_per_clip
-
-    print(f"\n📦 Batch Generation")
-    print(f"   Clips: {total_clips}")
-    print(f"   Est. credits: ~{total_credits} (you have ~12,500/month with AI Ultra)")
-    print(f"   Output: {output_dir}")
+    if backends is None:
+        backends = load_backends(use_fast, rpm)
+
+    print(f"\n📦 Batch Generation{' (dry run)' if dry_run else ''}")
+    print(f"   Clips: {len(prompts_to_generate)}")
+    if len(backends) > 1:
+        print(f"   Backends: {', '.join(b.name for b in backends)}")
+    print(f"   Concurrent renders: {jobs}{' per backend' if len(backends) > 1 else ''}")
+    print(f"   Submissions/min: {rpm if rpm else 'unlimited'}{' per backend' if len(backends) > 1 else ''}")
+    print(f"   Output: {output_dir}\n")
+    work = show_plan(list(prompts_to_generate), output_dir, use_fast, jobs, fresh, rpm, backends)
+    if any(b.mode == 'gemini' for b in backends):
+        print("   (you have ~12,500 credits/month with AI Ultra)")
+
+    if dry_run:
+        return
+    if not work:
+        print("\n   ✅ Everything is up to date.")
+        return
 
     confirm = input("\n   Continue? (y/n): ")
     if confirm.lower() != 'y':
         print("   Cancelled.")
         return
 
-    results = {}
-    for key in prompts_to_generate:
-        result = generate_video(key, output_dir, use_fast)
-        results[key] = result
+    results = run_concurrent(list(prompts_to_generate), output_dir, use_fast, jobs, fresh, rpm, backends)
 
     print("\n📊 Results:")
     for key, result in results.items():
@@ -636,7 +1234,7 @@ def list_prompts():
     print("\n📋 Available Prompts for E1 - The Vibe Coding Revolution")
     print("=" * 60 + "\n")
 
-    for section in ["HOOK", "INTRO", "MAIN1", "MAIN2", "MAIN3", "MAIN4", "CTA"]:
+    for section in SECTION_ORDER:
         if section not in sections:
             continue
         section_total = sum(d["duration"] for _, d in sections[section])
@@ -661,27 +1259,16 @@ def list_prompts():
 
 
 def download_from_gcs(bucket_uri: str, local_dir: str):
-    """Download generated videos from GCS to local directory."""
-    import subprocess
-
-    local_path = Path(local_dir)
-    local_path.mkdir(parents=True, exist_ok=True)
+    """Download generated videos from GCS to local directory (skipping ones already there)."""
+    import gcs_download
 
     print(f"\n📥 Downloading from {bucket_uri} to {local_dir}")
-
-    result = subprocess.run(
-        ["gsutil", "-m", "cp", "-r", f"{bucket_uri}/*", str(local_path)],
-        capture_output=True,
-        text=True
-    )
-
-    if result.returncode == 0:
-        print("✅ Download complete!")
-        # List downloaded files
-        for f in local_path.glob("**/*.mp4"):
-            print(f"   📁 {f.name}")
+    stats = gcs_download.sync(bucket_uri, local_dir)
+    if stats["failed"]:
+        print(f"❌ {stats['failed']} download(s) failed")
     else:
-        print(f"❌ Download failed: {result.stderr}")
+        print("✅ Download complete!")
+    return stats
 
 
 def main():
@@ -696,24 +1283,53 @@ def main():
     parser.add_argument("--output", "-o", default=default_output, help="Output directory for videos")
     parser.add_argument("--fast", "-f", action="store_true", help="Use Veo 3.1 Fast (faster, fewer credits)")
     parser.add_argument("--check", "-c", action="store_true", help="Check setup/configuration")
+    parser.add_argument("--jobs", "-j", type=int, default=DEFAULT_JOBS,
+                        help=f"Clips rendering at once per backend in batch mode (default: {DEFAULT_JOBS})")
+    parser.add_argument("--rpm", type=float, default=DEFAULT_RPM,
+                        help=f"Max submissions per minute per backend, 0 for no limit (default: {DEFAULT_RPM})")
+    parser.add_argument("--backends",
+                        help="Comma separated backends to spread renders over, e.g. "
+                             "vertex:PROJECT,vertex:PROJECT/europe-west4,gemini (default: $VEO_BACKENDS)")
+    parser.add_argument("--fresh", action="store_true",
+                        help="Ignore the manifest: re-render clips already on disk or in flight")
+    parser.add_argument("--dry-run", "-n", action="store_true",
+                        help="Show which clips would render, their cost and rough time, then exit")
 
     args = parser.parse_args()
 
     if args.check:
-        setup_check()
+        setup_check(args.backends)
         return
 
     if args.list:
         list_prompts()
         return
 
-    if not setup_check():
+    try:
+        backends = load_backends(args.fast, args.rpm, args.backends)
+    except ValueError as e:
+        print(f"❌ {e}")
+        return
+
+    if args.dry_run and (args.prompt or args.batch):
+        if args.prompt:
+            if args.prompt not in PROMPTS:
+                print(f"❌ Unknown prompt key: {args.prompt}")
+                return
+            show_plan([args.prompt], args.output, args.fast, 1, args.fresh, backends=backends)
+        else:
+            generate_batch(args.output, args.section, args.fast, max(1, args.jobs), fresh=args.fresh,
+                           dry_run=True, rpm=args.rpm, backends=backends)
+        return
+
+    if not setup_check(args.backends):
         return
 
     if args.prompt:
-        generate_video(args.prompt, args.output, args.fast)
+        generate_video(args.prompt, args.output, args.fast, fresh=args.fresh, backends=backends)
     elif args.batch:
-        generate_batch(args.output, args.section, args.fast)
+        generate_batch(args.output, args.section, args.fast, max(1, args.jobs), fresh=args.fresh,
+                       rpm=args.rpm, backends=backends)
     else:
         parser.print_help()
 
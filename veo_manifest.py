@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""
+On-disk manifest of Veo generations
+Lets a crashed or interrupted run re-attach to renders it already paid for
+
+Every submitted operation name, finished clip (with its SHA-256) and
+failure is appended as one JSON line and fsynced, to .veo_manifest.jsonl
+in the output folder. On the next run the manifest is replayed into a dict:
+
+- a clip whose file is still on disk with the recorded checksum is skipped
+- a clip whose operation was submitted but never saved is re-attached to
+  through client.operations.get instead of being submitted (and paid for)
+  again
+- a clip whose render spec (prompt text, duration, aspect ratio, model,
+  resolution) changed gets a new fingerprint and is rendered afresh; the
+  spec is stored too, so a dry run can say which fields changed
+"""
+
+import hashlib
+import json
+import os
+import time
+from pathlib import Path
+from typing import Optional
+
+from batch_journal import JsonlJournal
+
+MANIFEST_NAME = ".veo_manifest.jsonl"
+
+HASH_CHUNK_SIZE = 1024 * 1024
+
+
+def fingerprint(spec: dict) -> str:
+    """Identity of one render spec (everything that changes the clip Veo returns)"""
+    payload = json.dumps(spec, sort_keys=True)
+    return hashlib.sha256(payload.encode()).hexdigest()[:16]
+
+
+def changed_fields(old_spec: dict, spec: dict) -> list:
+    return sorted(name for name in set(old_spec) | set(spec) if old_spec.get(name) != spec.get(name))
+
+
+def file_sha256(path) -> str:
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class VeoManifest(JsonlJournal):
+    """
+    Replayed state plus an append handle for one output folder
+
+    Args:
+        path: JSONL manifest file (created if missing)
+    """
+
+    @classmethod
+    def for_output(cls, output_dir) -> "VeoManifest":
+        return cls(Path(output_dir) / MANIFEST_NAME)
+
+    @staticmethod
+    def matches(entry: dict, digests) -> bool:
+        """
+        True if entry was recorded for one of digests (a fingerprint, or a
+        set of fingerprints that all describe the same clip)
+        """
+        return entry.get('fingerprint') in ({digests} if isinstance(digests, str) else digests)
+
+    def verified(self, key: str, digests, output_file) -> bool:
+        """Rendered from this fingerprint and the file on disk still matches its checksum"""
+        entry = self.lookup(key)
+        if not entry or entry.get('event') != 'done' or not self.matches(entry, digests):
+            return False
+        try:
+            if os.path.getsize(output_file) != entry.get('size'):
+                return False
+        except OSError:
+            return False
+        return file_sha256(output_file) == entry.get('sha256')
+
+    def pending(self, key: str, digests) -> Optional[dict]:
+        """The submitted-but-unsaved operation for this fingerprint, if any"""
+        entry = self.lookup(key)
+        if entry and entry.get('event') == 'submitted' and self.matches(entry, digests):
+            return entry
+        return None
+
+    def submitted(self, key: str, spec: dict, operation_name: str, backend: Optional[str] = None):
+        """Record a submitted operation (and which backend holds it, for re-attaching)"""
+        self._append({"key": key, "event": "submitted", "fingerprint": fingerprint(spec), "spec": spec,
+                      "operation": operation_name, "backend": backend, "submitted_at": time.time()})
+
+    def done(self, key: str, spec: dict, output_file):
+        self._append({"key": key, "event": "done", "fingerprint": fingerprint(spec), "spec": spec,
+                      "output": str(output_file), "size": os.path.getsize(output_file),
+                      "sha256": file_sha256(output_file)})
+
+    def failed(self, key: str, spec: dict, error: str):
+        # A failed render is not re-attached to; the next run submits it again
+        self._append({"key": key, "event": "failed", "fingerprint": fingerprint(spec), "spec": spec,
+                      "error": error})
@@ -0,0 +1,221 @@
+#!/usr/bin/env python3
+"""
+Adaptive, jittered polling for Veo operations
+
+Instead of checking every operation every 15 seconds, each operation gets
+a schedule built from how long clips like it (same model and duration)
+have taken before: sparse polls early on, tight polls around the expected
+finish, then gradually sparser again if it runs long. Every delay is
+jittered so a batch's polls don't line up into bursts, and quota errors
+(429 / RESOURCE_EXHAUSTED) back off exponentially. New submissions are
+also paced by a token bucket so a batch stays under the per-minute
+request quota instead of discovering it through 429s.
+
+Observed render times are appended to
+~/.cache/vibe-coding/veo_render_times.jsonl (override with
+VEO_TIMINGS_FILE; empty disables) and the schedule switches from the
+built-in priors to the recorded distribution once a model/duration pair
+has MIN_SAMPLES renders. A render time is measured from submission to the
+poll that saw it finish, so it errs slightly long.
+"""
+
+import json
+import os
+import random
+import threading
+import time
+from pathlib import Path
+from typing import Optional, Tuple
+
+# Poll delay bounds in seconds
+MIN_POLL_SECONDS = 3.0
+MAX_POLL_SECONDS = 30.0
+
+# Relative jitter applied to every delay (+/-)
+JITTER = 0.2
+
+# Recorded renders needed before they replace the priors; most recent kept
+MIN_SAMPLES = 5
+MAX_SAMPLES = 50
+
+# Prior render time: base + per second of clip, for standard and fast models
+PRIOR_SECONDS = {"standard": (60.0, 12.0), "fast": (30.0, 6.0)}
+
+# Quota backoff envelope
+QUOTA_BASE_SECONDS = 15.0
+QUOTA_MAX_SECONDS = 300.0
+
+
+def timings_path() -> Optional[Path]:
+    """JSONL file render times are appended to, or None if disabled"""
+    override = os.getenv('VEO_TIMINGS_FILE')
+    if override is not None:
+        return Path(override) if override else None
+    base = os.getenv('FAL_CACHE_DIR') or Path.home() / ".cache" / "vibe-coding"
+    return Path(base) / "veo_render_times.jsonl"
+
+
+def is_quota_error(e: Exception) -> bool:
+    """429 / RESOURCE_EXHAUSTED from either the Gemini API or Vertex AI"""
+    return getattr(e, 'code', None) == 429 or "RESOURCE_EXHAUSTED" in str(e)
+
+
+def is_lost_operation_error(e: Exception) -> bool:
+    """404 / 401 / 403 on a status check: the operation expired or was purged, or access was revoked"""
+    return getattr(e, 'code', None) in (401, 403, 404)
+
+
+def quota_backoff(attempt: int) -> float:
+    """Jittered exponential delay after the attempt-th consecutive quota error (1-based)"""
+    ceiling = min(QUOTA_MAX_SECONDS, QUOTA_BASE_SECONDS * 2 ** (attempt - 1))
+    return random.uniform(ceiling / 2, ceiling)
+
+
+class TokenBucket:
+    """
+    Requests-per-minute limiter
+
+    Args:
+        per_minute: Sustained request rate; 0 or None disables the limit
+        burst: Requests allowed back to back before pacing kicks in
+    """
+
+    def __init__(self, per_minute: Optional[float], burst: int = 1):
+        self.rate = (per_minute or 0) / 60.0
+        self.capacity = float(max(1, burst))
+        self.tokens = self.capacity
+        self.updated = time.time()
+
+    def _refill(self):
+        now = time.time()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def delay(self) -> float:
+        """Seconds until a request may be made (0 if one may be made now)"""
+        if not self.rate:
+            return 0.0
+        self._refill()
+        return 0.0 if self.tokens >= 1 else (1 - self.tokens) / self.rate
+
+    def take(self):
+        if self.rate:
+            self._refill()
+            self.tokens -= 1
+
+    def drain(self):
+        """Spend everything after a quota error, so the next request waits a full interval"""
+        if self.rate:
+            self._refill()
+            self.tokens = min(self.tokens, 0.0)
+
+
+def _jitter(delay: float) -> float:
+    return delay * random.uniform(1 - JITTER, 1 + JITTER)
+
+
+def _percentile(values, fraction: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+class PollSchedule:
+    """
+    When to next check one operation
+
+    Args:
+        expected: Expected render seconds
+        early: Render seconds before which a finish is unlikely
+        late: Render seconds after which the render counts as overdue
+    """
+
+    def __init__(self, expected: float, early: float, late: float):
+        self.expected = expected
+        self.early = early
+        self.late = late
+        self.started = time.time()
+        self.quota_errors = 0
+
+    def elapsed(self) -> float:
+        return time.time() - self.started
+
+    def next_delay(self) -> float:
+        """Seconds to wait before the next status check (after a successful one)"""
+        self.quota_errors = 0
+        elapsed = self.elapsed()
+        if elapsed < self.early:
+            # Nothing to see yet: sleep towards the start of the window
+            delay = self.early - elapsed
+        elif elapsed < self.late:
+            delay = MIN_POLL_SECONDS
+        else:
+            # Overdue: back off gradually so a stuck render doesn't burn quota
+            delay = MIN_POLL_SECONDS + (elapsed - self.late) / 4
+        return _jitter(min(MAX_POLL_SECONDS, max(MIN_POLL_SECONDS, delay)))
+
+    def quota_delay(self) -> float:
+        """Seconds to wait after a quota error on this operation"""
+        self.quota_errors += 1
+        return quota_backoff(self.quota_errors)
+
+
+class RenderTimes:
+    """
+    Recorded render times and the poll schedules derived from them
+
+    Args:
+        path: JSONL history file (default: timings_path())
+    """
+
+    def __init__(self, path: Optional[Path] = None):
+        self.path = path if path is not None else timings_path()
+        self.samples = {}
+        self._lock = threading.Lock()
+        self._load()
+
+    def _load(self):
+        if self.path is None:
+            return
+        try:
+            lines = self.path.read_text().splitlines()
+        except OSError:
+            return
+        for line in lines:
+            try:
+                record = json.loads(line)
+                key = (record['model'], int(record['duration']))
+                self.samples.setdefault(key, []).append(float(record['seconds']))
+            except (ValueError, KeyError, TypeError):
+                continue
+        for key, values in self.samples.items():
+            self.samples[key] = values[-MAX_SAMPLES:]
+
+    def expected(self, model: str, duration: int) -> Tuple[float, float, float]:
+        """(expected, early, late) render seconds for a clip"""
+        with self._lock:
+            values = list(self.samples.get((model, int(duration)), []))
+        if len(values) >= MIN_SAMPLES:
+            return _percentile(values, 0.5), _percentile(values, 0.1), _percentile(values, 0.9)
+        base, per_second = PRIOR_SECONDS["fast" if "fast" in model else "standard"]
+        expected = base + per_second * duration
+        return expected, expected * 0.6, expected * 1.5
+
+    def schedule(self, model: str, duration: int) -> PollSchedule:
+        expected, early, late = self.expected(model, duration)
+        return PollSchedule(expected, early, late)
+
+    def record(self, model: str, duration: int, seconds: float):
+        """Add an observed render time to the history"""
+        with self._lock:
+            values = self.samples.setdefault((model, int(duration)), [])
+            values.append(seconds)
+            del values[:-MAX_SAMPLES]
+        if self.path is None:
+            return
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            with self._lock, open(self.path, 'a') as f:
+                f.write(json.dumps({"time": time.time(), "model": model, "duration": int(duration),
+                                    "seconds": round(seconds, 1)}) + "\n")
+        except OSError:
+            pass  # timings are best-effort
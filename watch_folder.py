@@ -0,0 +1,485 @@
+#!/usr/bin/env python3
+"""
+Watch-folder daemon: crop new recordings to 1080p, optionally upscale to 4K
+
+Replaces the fswatch loop in auto_process_videos.sh:
+- New files are noticed with Linux inotify (close-write / moved-in events,
+  so a file is only picked up once its writer has closed it). Elsewhere,
+  e.g. macOS, the folder is polled and a file counts as complete once its
+  size and mtime have stayed the same for a few seconds.
+- Work goes through a persistent SQLite queue in the watched folder, so a
+  restart resumes interrupted jobs and never redoes finished ones. Upscales
+  are recorded in a batch journal (see batch_journal), so a restart
+  re-attaches to fal requests already submitted instead of paying again.
+- The local crop encode and the remote upscale_to_4k step have separate
+  concurrency limits; crops of new files keep running while earlier ones
+  wait on fal.
+
+Usage:
+  python watch_folder.py [directory] [--upscale MODEL] [--crop-jobs N] [--upscale-jobs N]
+"""
+
+import argparse
+import ctypes
+import ctypes.util
+import os
+import select
+import signal
+import sqlite3
+import struct
+import sys
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+
+from chunked_encode import default_workers
+from crop_1080p import crop_to_1080p
+from ffmpeg_utils import FFmpegError, FFmpegInterrupted, require_ffmpeg
+
+# inotify event masks (linux/inotify.h)
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+_EVENT_HEADER = struct.Struct("iIII")
+
+# Polling fallback: seconds between scans, and how long a file must stay
+# unchanged before it is treated as completely written
+POLL_INTERVAL = 2.0
+STABLE_SECONDS = 5.0
+
+VIDEO_EXTENSIONS = {".mp4", ".mov", ".m4v"}
+
+# Queue states, in the order a file moves through them
+PENDING_CROP = "pending_crop"
+CROPPING = "cropping"
+PENDING_UPSCALE = "pending_upscale"
+UPSCALING = "upscaling"
+DONE = "done"
+FAILED = "failed"
+
+_log_lock = threading.Lock()
+_log_file = None
+
+
+def log(message: str):
+    """Print and append to the folder's log file"""
+    line = f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] {message}"
+    with _log_lock:
+        print(line, flush=True)
+        if _log_file:
+            with open(_log_file, "a") as f:
+                f.write(line + "\n")
+
+
+def is_candidate(path: Path) -> bool:
+    """Source recordings only: not our own outputs, temp files or 4K results"""
+    name = path.name
+    return (
+        path.suffix.lower() in VIDEO_EXTENSIONS
+        and not name.startswith(".")
+        and ".part" not in name
+        and "_1080p" not in path.stem
+        and "_4K" not in path.stem
+        and path.parent.name != "4K"
+    )
+
+
+# --- change detection -------------------------------------------------------
+
+class InotifyWatcher:
+    """Reports files in one directory as they are closed after writing or moved in"""
+
+    def __init__(self, directory: Path):
+        self.directory = directory
+        libc_name = ctypes.util.find_library("c") or "libc.so.6"
+        self.libc = ctypes.CDLL(libc_name, use_errno=True)
+        self.fd = self.libc.inotify_init1(os.O_CLOEXEC | os.O_NONBLOCK)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        wd = self.libc.inotify_add_watch(self.fd, os.fsencode(str(directory)),
+                                         IN_CLOSE_WRITE | IN_MOVED_TO)
+        if wd < 0:
+            os.close(self.fd)
+            raise OSError(ctypes.get_errno(), f"inotify_add_watch failed for {directory}")
+
+    def ready(self, timeout: float):
+        """Paths completed since the last call (waits up to timeout seconds)"""
+        readable, _, _ = select.select([self.fd], [], [], timeout)
+        if not readable:
+            return []
+        try:
+            data = os.read(self.fd, 64 * 1024)
+        except BlockingIOError:
+            return []
+        paths, offset = [], 0
+        while offset + _EVENT_HEADER.size <= len(data):
+            _, mask, _, length = _EVENT_HEADER.unpack_from(data, offset)
+            offset += _EVENT_HEADER.size
+            name = data[offset:offset + length].rstrip(b"\0")
+            offset += length
+            if name and mask & (IN_CLOSE_WRITE | IN_MOVED_TO):
+                paths.append(self.directory / os.fsdecode(name))
+        return paths
+
+    def close(self):
+        os.close(self.fd)
+
+
+class PollingWatcher:
+    """Reports files once their size and mtime have been stable for STABLE_SECONDS"""
+
+    def __init__(self, directory: Path, stable_seconds: float = STABLE_SECONDS):
+        self.directory = directory
+        self.stable_seconds = stable_seconds
+        self.seen = {}  # path -> ((size, mtime_ns), unchanged since, reported)
+
+    def ready(self, timeout: float):
+        time.sleep(timeout)
+        now = time.time()
+        paths = []
+        current = set()
+        for path in self.directory.iterdir():
+            if not path.is_file():
+                continue
+            current.add(path)
+            try:
+                stat = path.stat()
+            except OSError:
+                continue
+            signature = (stat.st_size, stat.st_mtime_ns)
+            previous = self.seen.get(path)
+            if previous is None or previous[0] != signature:
+                self.seen[path] = (signature, now, False)
+            elif not previous[2] and now - previous[1] >= self.stable_seconds:
+                self.seen[path] = (signature, previous[1], True)
+                paths.append(path)
+        for path in set(self.seen) - current:
+            del self.seen[path]
+        return paths
+
+    def close(self):
+        pass
+
+
+class StabilityChecker:
+    """
+    Files found at startup that were modified too recently to know they're
+    complete; each is reported once its size and mtime have been stable for
+    STABLE_SECONDS (a close-write that came in meanwhile makes it moot)
+    """
+
+    def __init__(self, stable_seconds: float = STABLE_SECONDS):
+        self.stable_seconds = stable_seconds
+        self.files = {}  # path -> ((size, mtime_ns), unchanged since)
+
+    def add(self, path: Path, stat: os.stat_result):
+        self.files[path] = ((stat.st_size, stat.st_mtime_ns), stat.st_mtime)
+
+    def discard(self, path: Path):
+        self.files.pop(path, None)
+
+    def settled(self):
+        now = time.time()
+        paths = []
+        for path, (signature, since) in list(self.files.items()):
+            try:
+                stat = path.stat()
+            except OSError:
+                del self.files[path]
+                continue
+            current = (stat.st_size, stat.st_mtime_ns)
+            if current != signature:
+                self.files[path] = (current, now)
+            elif now - since >= self.stable_seconds:
+                del self.files[path]
+                paths.append(path)
+        return paths
+
+
+def make_watcher(directory: Path, force_polling: bool = False):
+    if not force_polling and sys.platform.startswith("linux"):
+        try:
+            return InotifyWatcher(directory), "inotify"
+        except (OSError, AttributeError) as e:
+            log(f"inotify unavailable ({e}); polling instead")
+    return PollingWatcher(directory), "polling"
+
+
+# --- persistent queue -------------------------------------------------------
+
+class JobQueue:
+    """SQLite-backed queue of files moving through crop -> upscale"""
+
+    def __init__(self, path: Path):
+        self.path = path
+        self.lock = threading.Lock()
+        self.changed = threading.Condition(self.lock)
+        self.conn = sqlite3.connect(str(path), timeout=30, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS jobs (
+                path TEXT PRIMARY KEY,
+                size INTEGER NOT NULL,
+                mtime_ns INTEGER NOT NULL,
+                state TEXT NOT NULL,
+                output_1080p TEXT,
+                output_4k TEXT,
+                error TEXT,
+                updated_at REAL NOT NULL
+            )
+        """)
+        # Work interrupted by a restart goes back to the front of its stage
+        self.conn.execute("UPDATE jobs SET state = ? WHERE state = ?", (PENDING_CROP, CROPPING))
+        self.conn.execute("UPDATE jobs SET state = ? WHERE state = ?", (PENDING_UPSCALE, UPSCALING))
+        self.conn.commit()
+
+    def add(self, path: Path) -> bool:
+        """Queue a completed file unless this exact version was already queued"""
+        try:
+            stat = path.stat()
+        except OSError:
+            return False
+        with self.changed:
+            row = self.conn.execute("SELECT size, mtime_ns FROM jobs WHERE path = ?",
+                                    (str(path),)).fetchone()
+            if row and tuple(row) == (stat.st_size, stat.st_mtime_ns):
+                return False
+            self.conn.execute(
+                "INSERT OR REPLACE INTO jobs (path, size, mtime_ns, state, updated_at) VALUES (?, ?, ?, ?, ?)",
+                (str(path), stat.st_size, stat.st_mtime_ns, PENDING_CROP, time.time()),
+            )
+            self.conn.commit()
+            self.changed.notify_all()
+            return True
+
+    def claim(self, waiting: str, working: str, stop: threading.Event):
+        """Block until a job is in state waiting, move it to working and return it"""
+        with self.changed:
+            while not stop.is_set():
+                row = self.conn.execute(
+                    "SELECT path, output_1080p FROM jobs WHERE state = ? ORDER BY updated_at LIMIT 1",
+                    (waiting,),
+                ).fetchone()
+                if row:
+                    self.conn.execute("UPDATE jobs SET state = ?, updated_at = ? WHERE path = ?",
+                                      (working, time.time(), row[0]))
+                    self.conn.commit()
+                    return row
+                self.changed.wait(1.0)
+        return None
+
+    def update(self, path: str, state: str, **fields):
+        with self.changed:
+            columns = ", ".join(f"{name} = ?" for name in fields)
+            values = list(fields.values())
+            sql = f"UPDATE jobs SET state = ?, updated_at = ?{', ' + columns if columns else ''} WHERE path = ?"
+            self.conn.execute(sql, [state, time.time()] + values + [path])
+            self.conn.commit()
+            self.changed.notify_all()
+
+    def counts(self) -> dict:
+        with self.lock:
+            return dict(self.conn.execute("SELECT state, COUNT(*) FROM jobs GROUP BY state").fetchall())
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
+
+
+# --- workers ----------------------------------------------------------------
+
+def crop_worker(queue: JobQueue, output_dir: Path, upscale_model, stop: threading.Event, encode_workers: int):
+    while not stop.is_set():
+        row = queue.claim(PENDING_CROP, CROPPING, stop)
+        if row is None:
+            return
+        source = Path(row[0])
+        output = output_dir / f"{source.stem}_1080p.mp4"
+        next_state = PENDING_UPSCALE if upscale_model else DONE
+        if output.exists():
+            log(f"⏭  Already cropped: {output.name}")
+            queue.update(str(source), next_state, output_1080p=str(output))
+            continue
+        log(f"📐 Cropping: {source.name}")
+        start = time.time()
+        try:
+            # Auto mode favours throughput over the manual crop's slow preset
+            method = crop_to_1080p(source, output, preset="medium", workers=encode_workers)
+        except FFmpegInterrupted:
+            # Ctrl+C reaches ffmpeg before the main thread sets stop; that's
+            # an interruption, not a failure, so the crop runs again next time
+            log(f"⏸  Crop interrupted: {source.name}")
+            queue.update(str(source), PENDING_CROP)
+            # Give the main thread a moment to see the same Ctrl+C before claiming again
+            if stop.wait(1.0):
+                return
+            continue
+        except (FFmpegError, OSError) as e:
+            if stop.is_set():
+                queue.update(str(source), PENDING_CROP)
+                return
+            log(f"✗ Crop failed: {source.name} ({e})")
+            queue.update(str(source), FAILED, error=str(e))
+            continue
+        log(f"✓ Cropped in {time.time() - start:.1f}s ({method}): {output.name}")
+        queue.update(str(source), next_state, output_1080p=str(output))
+
+
+def upscale_worker(queue: JobQueue, model: str, stop: threading.Event, pipeline_options: dict):
+    from upscale_to_4k import upscale_video
+
+    while not stop.is_set():
+        row = queue.claim(PENDING_UPSCALE, UPSCALING, stop)
+        if row is None:
+            return
+        source, cropped = row
+        log(f"🚀 Upscaling: {Path(cropped).name} ({model})")
+        output = upscale_video(cropped, model, **pipeline_options)
+        if output:
+            log(f"✓ 4K ready: {Path(output).name}")
+            queue.update(source, DONE, output_4k=output)
+        elif stop.is_set():
+            queue.update(source, PENDING_UPSCALE)
+            return
+        else:
+            log(f"✗ Upscale failed: {Path(cropped).name}")
+            queue.update(source, FAILED, error="upscale failed")
+
+
+# --- main -------------------------------------------------------------------
+
+def run(directory, upscale_model=None, crop_jobs=1, upscale_jobs=2, force_polling=False,
+        once=False, **pipeline_options):
+    """
+    Watch directory and process recordings until interrupted
+
+    Args:
+        directory: Folder to watch (not recursive)
+        upscale_model: upscale_to_4k model for the 4K step; None to only crop
+        crop_jobs: Concurrent local crop encodes
+        upscale_jobs: Concurrent fal upscales
+        force_polling: Poll even where inotify is available
+        once: Process what is already there, then exit
+        pipeline_options: Passed to upscale_to_4k.upscale_video
+    """
+    global _log_file
+    directory = Path(directory).resolve()
+    output_dir = directory / "processed_1080p"
+    output_dir.mkdir(parents=True, exist_ok=True)
+    _log_file = directory / "video_processing.log"
+
+    require_ffmpeg()
+    journal = None
+    if upscale_model:
+        from batch_journal import BatchJournal
+        from fal_jobs import configure_api_key
+        if not configure_api_key():
+            return
+        journal = BatchJournal.for_batch("watch_folder", directory, upscale_model)
+        pipeline_options = dict(pipeline_options, journal=journal)
+
+    queue = JobQueue(directory / ".watch_queue.sqlite")
+    stop = threading.Event()
+    watcher, mode = make_watcher(directory, force_polling)
+
+    log("=" * 40)
+    log(f"Watching: {directory} ({mode})")
+    log(f"Crops -> {output_dir} ({crop_jobs} at a time)")
+    if upscale_model:
+        log(f"Upscale -> {output_dir / '4K'} with {upscale_model} ({upscale_jobs} at a time)")
+    log("=" * 40)
+
+    def enqueue(path: Path):
+        if is_candidate(path) and path.is_file() and queue.add(path):
+            log(f"➕ Queued: {path.name}")
+
+    # Files already present: anything not modified recently is complete;
+    # newer ones may have been closed before the watcher started, so they
+    # are queued once they stop changing
+    settling = StabilityChecker()
+    settled_before = time.time() - STABLE_SECONDS
+    for path in sorted(directory.iterdir()):
+        if not (path.is_file() and is_candidate(path)):
+            continue
+        stat = path.stat()
+        if stat.st_mtime < settled_before:
+            enqueue(path)
+        else:
+            settling.add(path, stat)
+
+    # Each crop worker's re-encodes get an equal share of the cores (see chunked_encode)
+    crop_jobs = max(1, crop_jobs)
+    encode_workers = max(1, default_workers() // crop_jobs)
+    workers = [threading.Thread(target=crop_worker, args=(queue, output_dir, upscale_model, stop, encode_workers),
+                                daemon=True)
+               for _ in range(crop_jobs)]
+    if upscale_model:
+        workers += [threading.Thread(target=upscale_worker, args=(queue, upscale_model, stop, pipeline_options),
+                                     daemon=True)
+                    for _ in range(max(1, upscale_jobs))]
+    for worker in workers:
+        worker.start()
+
+    signal.signal(signal.SIGTERM, lambda *_: stop.set())
+    try:
+        while not stop.is_set():
+            for path in settling.settled():
+                enqueue(path)
+            if once:
+                counts = queue.counts()
+                if not settling.files and not any(
+                        counts.get(state) for state in (PENDING_CROP, CROPPING, PENDING_UPSCALE, UPSCALING)):
+                    break
+                time.sleep(1.0)
+                continue
+            for path in watcher.ready(POLL_INTERVAL):
+                settling.discard(path)
+                enqueue(path)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        log("Stopping; unfinished jobs resume on the next start")
+        stop.set()
+        with queue.changed:
+            queue.changed.notify_all()
+        for worker in workers:
+            worker.join(timeout=1.0)
+        watcher.close()
+        # An upscale still waiting on fal may yet record its result
+        if journal and not any(worker.is_alive() for worker in workers):
+            journal.close()
+
+    counts = queue.counts()
+    log(f"Queue: {counts.get(DONE, 0)} done, {counts.get(FAILED, 0)} failed, "
+        f"{sum(counts.get(s, 0) for s in (PENDING_CROP, CROPPING, PENDING_UPSCALE, UPSCALING))} pending")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Crop (and optionally upscale) recordings dropped in a folder")
+    parser.add_argument("directory", nargs="?", default=str(Path(__file__).parent),
+                        help="Folder to watch (default: this script's folder)")
+    parser.add_argument("--upscale", metavar="MODEL", help="Also upscale to 4K with this upscale_to_4k model")
+    parser.add_argument("--crop-jobs", type=int, default=1, help="Concurrent local crop encodes")
+    parser.add_argument("--upscale-jobs", type=int, default=2, help="Concurrent fal upscales")
+    parser.add_argument("--poll", action="store_true", help="Poll instead of using inotify")
+    parser.add_argument("--once", action="store_true", help="Process existing files, then exit")
+    parser.add_argument("--timeout", type=float, metavar="SECONDS",
+                        help="Cancel a fal request still unfinished after SECONDS")
+    args = parser.parse_args()
+
+    if args.upscale:
+        from upscale_to_4k import MODELS
+        if args.upscale not in MODELS:
+            print(f"Error: Unknown model '{args.upscale}'. Choose from: {', '.join(MODELS.keys())}")
+            sys.exit(1)
+
+    try:
+        run(args.directory, args.upscale, crop_jobs=args.crop_jobs, upscale_jobs=args.upscale_jobs,
+            force_polling=args.poll, once=args.once, job_timeout=args.timeout)
+    except FFmpegError as e:
+        print(f"Error: {e}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()